@@ -0,0 +1,37 @@
+"""append-only JSON Lines 로그 재생 - 매장 저널, 입장 로그, 농담 추가 로그가 함께 사용
+
+한 줄에 레코드 하나를 쓰고 줄바꿈까지 써야 확정된 것으로 본다. 쓰는 도중 죽어서 마지막 줄이
+쓰다 만 상태면 그 줄부터는 재생하지 않고 잘라내서 다음 append 가 깨진 줄 뒤에 붙지 않도록 한다.
+"""
+import json
+import os
+
+
+def replay_log(path, apply, offset=0, read_only=False, name="로그"):
+    """path 의 offset 위치부터 레코드마다 apply(record) 호출, 재생한 줄 수 반환
+
+    read_only 면 깨진 꼬리를 잘라내지 않는다 (다른 프로세스가 쓰는 중일 수 있는 파일을 읽을 때).
+    """
+    if not os.path.exists(path):
+        return 0
+    count = 0
+    good_offset = offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            # 마지막 줄이 쓰다 만 상태면 거기서 재생 중단
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            apply(record)
+            good_offset += len(line)
+            count += 1
+
+    if not read_only and good_offset != os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(good_offset)
+        print(f"[WARN] {name} 끝부분 손상 복구: {path}")
+    return count
@@ -0,0 +1,60 @@
+"""슬래시 명령어 동기화 - 명령어 트리 지문(hash)이 바뀐 경우에만 tree.sync 호출
+
+마지막으로 동기화한 지문을 파일에 저장해 두고, 다음 실행 때 같으면 sync 를 생략한다.
+setup_hook 에서 한 번만 호출하므로 재연결(on_ready 재발생) 때는 다시 동기화하지 않는다.
+"""
+import hashlib
+import json
+import os
+
+
+def tree_fingerprint(tree, guild=None):
+    """명령어 트리 직렬화 결과의 SHA-256 (명령어 순서와 무관)"""
+    commands = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    commands.sort(key=lambda data: (data.get("type", 1), data["name"]))
+    serialized = json.dumps(commands, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def _load(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[ERROR] 명령어 동기화 기록 로드 실패: {e}")
+        return {}
+
+
+def _save(path, fingerprints):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(fingerprints, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+async def sync_commands(tree, path, guild=None, mode="auto"):
+    """mode: "auto" (지문이 다를 때만), "force" (항상), "off" (안 함) - 실제로 sync 했으면 True"""
+    if mode == "off":
+        return False
+    # 봇(애플리케이션)과 대상(글로벌/길드)별로 따로 기록
+    scope = f"{tree.client.application_id}:{guild.id if guild else 'global'}"
+    try:
+        fingerprint = tree_fingerprint(tree, guild)
+    except Exception as e:
+        # 지문을 못 만들면 (discord.py 버전 차이 등) 기록 없이 그냥 동기화
+        print(f"[ERROR] 명령어 트리 지문 계산 실패, 전체 동기화로 대체: {e!r}")
+        await tree.sync(guild=guild)
+        return True
+    fingerprints = _load(path)
+    if mode != "force" and fingerprints.get(scope) == fingerprint:
+        return False
+
+    await tree.sync(guild=guild)
+    fingerprints[scope] = fingerprint
+    try:
+        _save(path, fingerprints)
+    except OSError as e:
+        print(f"[ERROR] 명령어 동기화 기록 저장 실패: {e}")
+    return True
@@ -0,0 +1,265 @@
+"""두 봇이 함께 쓰는 계측 모듈
+
+명령어/저장/REST 호출 지연 시간 히스토그램, 카운터, 게이지를 메모리에 모아
+Prometheus 텍스트 형식으로 내보낸다 (로컬 HTTP 엔드포인트 또는 주기적으로 쓰는 파일).
+
+    METRICS_PORT=9101   → http://127.0.0.1:9101/metrics
+    METRICS_FILE=metrics.prom, METRICS_INTERVAL=15 → 15초마다 파일로 저장
+"""
+import asyncio
+import functools
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# 히스토그램 버킷 상한(초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)  # 버킷별 (누적 아님) 개수, 마지막 버킷 초과는 count 에만 반영
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metrics:
+    """메트릭 저장소 (프로세스당 하나, 이벤트 루프와 저장 스레드에서 함께 기록)"""
+
+    def __init__(self):
+        self.counters = {}    # 이름 → {라벨: 값}
+        self.gauges = {}      # 이름 → {라벨: 값 또는 인자 없는 함수}
+        self.histograms = {}  # 이름 → {라벨: Histogram}
+        self.help = {}
+        self._server = None
+        self._writer_task = None
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        series = self.counters.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        """게이지 값 설정 (함수를 넘기면 내보낼 때마다 호출해서 현재 값을 읽음)"""
+        self.gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name, value, **labels):
+        series = self.histograms.setdefault(name, {})
+        key = _label_key(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """with 블록 실행 시간을 히스토그램에 기록"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name, **labels):
+        """코루틴 함수 실행 시간을 기록하는 데코레이터 (슬래시 명령어 콜백에도 사용 가능)"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def render(self):
+        """Prometheus 텍스트 형식 문자열"""
+        lines = []
+
+        def header(name, kind):
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, series in sorted(self.counters.items()):
+            header(name, "counter")
+            for key, value in list(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {value}")
+
+        for name, series in sorted(self.gauges.items()):
+            header(name, "gauge")
+            for key, value in list(series.items()):
+                if callable(value):
+                    try:
+                        value = value()
+                    except Exception as e:
+                        print(f"[ERROR] 게이지 {name} 읽기 실패: {e}")
+                        continue
+                lines.append(f"{name}{_format_labels(key)} {value}")
+
+        for name, series in sorted(self.histograms.items()):
+            header(name, "histogram")
+            for key, histogram in list(series.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', f'{bound:g}')])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def instrument_http(self, http):
+        """discord.py HTTPClient 의 REST 호출 수/지연 시간 기록 (rate limit 대기 시간 포함)"""
+        request = http.request
+
+        async def timed_request(route, **kwargs):
+            start = time.perf_counter()
+            status = "ok"
+            try:
+                return await request(route, **kwargs)
+            except Exception as e:
+                status = getattr(e, "status", None) or type(e).__name__
+                raise
+            finally:
+                self.observe(
+                    "bot_rest_request_seconds", time.perf_counter() - start,
+                    method=route.method, route=route.path, status=status
+                )
+        http.request = timed_request
+
+    def install_rate_limit_handler(self):
+        """discord.http 의 429 경고 로그에서 rate limit 횟수/대기 시간 집계"""
+        logger = logging.getLogger("discord.http")
+        if not any(isinstance(handler, RateLimitLogHandler) for handler in logger.handlers):
+            logger.addHandler(RateLimitLogHandler(self))
+
+    async def _handle_http(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                body = self.render().encode("utf-8")
+                status = "200 OK"
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                body = b"not found\n"
+                status = "404 Not Found"
+                content_type = "text/plain"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except Exception as e:
+            print(f"[ERROR] 메트릭 요청 처리 실패: {e}")
+        finally:
+            writer.close()
+
+    async def start_http_server(self, port, host="127.0.0.1"):
+        self._server = await asyncio.start_server(self._handle_http, host, port)
+        print(f"[OK] 메트릭 엔드포인트: http://{host}:{port}/metrics")
+
+    async def _write_file_loop(self, path, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(_write_text_atomic, path, self.render())
+            except Exception as e:
+                print(f"[ERROR] 메트릭 파일 저장 실패: {e}")
+
+    def start_file_writer(self, path, interval=15.0):
+        self._writer_task = asyncio.get_running_loop().create_task(self._write_file_loop(path, interval))
+
+    async def start_from_env(self, client=None):
+        """setup_hook 에서 호출 - 환경 변수에 따라 엔드포인트/파일 저장 시작
+
+        METRICS_PORT, METRICS_HOST (기본 127.0.0.1), METRICS_FILE, METRICS_INTERVAL (기본 15초)
+        """
+        if client is not None:
+            self.instrument_http(client.http)
+            self.install_rate_limit_handler()
+        port = os.getenv("METRICS_PORT")
+        if port:
+            try:
+                await self.start_http_server(int(port), os.getenv("METRICS_HOST", "127.0.0.1"))
+            except OSError as e:
+                print(f"[ERROR] 메트릭 엔드포인트 시작 실패: {e}")
+        path = os.getenv("METRICS_FILE")
+        if path:
+            self.start_file_writer(path, float(os.getenv("METRICS_INTERVAL", "15")))
+
+    async def close(self):
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            self._writer_task = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+class RateLimitLogHandler(logging.Handler):
+    """'... Retrying in N seconds.' 형태의 429 로그를 카운터로 변환"""
+
+    def __init__(self, registry):
+        super().__init__(level=logging.WARNING)
+        self.registry = registry
+
+    def emit(self, record):
+        message = record.msg if isinstance(record.msg, str) else ""
+        if "rate limit" not in message or "Retrying in" not in message:
+            return
+        scope = "global" if message.startswith("Global") else "route"
+        retry_after = record.args[-1] if record.args else 0.0
+        self.registry.inc("bot_rate_limited_total", scope=scope)
+        self.registry.inc("bot_rate_limit_wait_seconds_total", float(retry_after), scope=scope)
+
+
+def _write_text_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# 프로세스 공용 저장소
+metrics = Metrics()
+metrics.describe("bot_command_seconds", "슬래시 명령어 처리 시간")
+metrics.describe("bot_save_seconds", "데이터 파일 저장 시간")
+metrics.describe("bot_rest_request_seconds", "Discord REST 호출 시간 (rate limit 대기 포함)")
+metrics.describe("bot_rate_limited_total", "429 응답 횟수")
+metrics.describe("bot_rate_limit_wait_seconds_total", "429 로 기다린 시간 합계")
+metrics.describe("bot_gateway_events_total", "게이트웨이 이벤트 수")
+metrics.describe("bot_errors_total", "처리 중 발생한 오류 수")
@@ -0,0 +1,157 @@
+import asyncio
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """초당 rate 개씩 채워지고 최대 burst 개까지 쌓이는 토큰 버킷"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready(self, now):
+        self._refill(now)
+        return self.tokens >= 1
+
+    def take(self):
+        self.tokens -= 1
+
+    def wait_time(self, now):
+        """토큰 1개가 생길 때까지 남은 시간(초)"""
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class AdmissionController:
+    """/입장 처리량 제어
+
+    매장별/길드별 토큰 버킷으로 처리 속도를 제한하고, 동시에 처리하는 요청 수를
+    max_workers 로 묶는다. 여유가 있으면 바로 처리하고, 몰리면 매장별 큐에 넣어
+    매장을 번갈아 가며(라운드 로빈) 꺼내므로 한 매장이 다른 매장을 굶기지 않는다.
+    """
+
+    def __init__(self, store_rate=5.0, store_burst=10, guild_rate=20.0, guild_burst=40,
+                 max_workers=8, max_queue=1000):
+        self.store_rate = store_rate
+        self.store_burst = store_burst
+        self.guild_rate = guild_rate
+        self.guild_burst = guild_burst
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.store_buckets = {}
+        self.guild_buckets = {}
+        self.queues = {}       # 매장코드 → deque[(guild_id, job)]
+        self.ready = deque()   # 대기 작업이 있는 매장코드 (라운드 로빈 순서)
+        self.queued = 0
+        self.active = 0
+        self._wakeup = None
+        self._dispatcher = None
+        self._tasks = set()
+
+    def _buckets(self, store_code, guild_id):
+        store_bucket = self.store_buckets.get(store_code)
+        if store_bucket is None:
+            store_bucket = self.store_buckets[store_code] = TokenBucket(self.store_rate, self.store_burst)
+        guild_bucket = self.guild_buckets.get(guild_id)
+        if guild_bucket is None:
+            guild_bucket = self.guild_buckets[guild_id] = TokenBucket(self.guild_rate, self.guild_burst)
+        return store_bucket, guild_bucket
+
+    def try_enter(self, store_code, guild_id):
+        """지금 바로 처리해도 되면 자리를 잡고 True (끝나면 leave 호출)"""
+        if self.queued or self.active >= self.max_workers:
+            return False
+        store_bucket, guild_bucket = self._buckets(store_code, guild_id)
+        now = time.monotonic()
+        if not (store_bucket.ready(now) and guild_bucket.ready(now)):
+            return False
+        store_bucket.take()
+        guild_bucket.take()
+        self.active += 1
+        return True
+
+    def leave(self):
+        self.active -= 1
+        self._wakeup.set()
+
+    def enqueue(self, store_code, guild_id, job):
+        """대기열에 추가 (job: 인자 없는 코루틴 함수), 가득 차면 False"""
+        if self.queued >= self.max_queue:
+            return False
+        queue = self.queues.get(store_code)
+        if queue is None:
+            queue = self.queues[store_code] = deque()
+            self.ready.append(store_code)
+        queue.append((guild_id, job))
+        self.queued += 1
+        self._wakeup.set()
+        return True
+
+    def _next(self, now):
+        """토큰이 있는 다음 매장의 작업 꺼내기, 없으면 (None, 가장 짧은 대기 시간)"""
+        shortest = None
+        for _ in range(len(self.ready)):
+            store_code = self.ready[0]
+            self.ready.rotate(-1)
+            queue = self.queues[store_code]
+            guild_id, job = queue[0]
+            store_bucket, guild_bucket = self._buckets(store_code, guild_id)
+            if store_bucket.ready(now) and guild_bucket.ready(now):
+                store_bucket.take()
+                guild_bucket.take()
+                queue.popleft()
+                self.queued -= 1
+                if not queue:
+                    del self.queues[store_code]
+                    self.ready.remove(store_code)
+                return job, None
+            wait = max(store_bucket.wait_time(now), guild_bucket.wait_time(now))
+            shortest = wait if shortest is None else min(shortest, wait)
+        return None, shortest
+
+    async def _dispatch(self):
+        while True:
+            if not self.queued or self.active >= self.max_workers:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            job, wait = self._next(time.monotonic())
+            if job is None:
+                # 토큰이 생길 때까지 (또는 새 요청이 올 때까지) 대기
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self.active += 1
+            task = asyncio.get_running_loop().create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job):
+        try:
+            await job()
+        except Exception as e:
+            print(f"[ERROR] 대기열 입장 처리 실패: {e}")
+        finally:
+            self.leave()
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def close(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,70 @@
+import random
+from collections import deque
+
+
+class CodeSpaceExhausted(Exception):
+    """더 이상 발급할 매장 코드가 없음"""
+
+
+def format_code(number, digits):
+    """2자리는 01~99, 그 이상은 100~999, 1000~9999 ... 형태"""
+    return f"{number:0{digits}d}"
+
+
+class CodeAllocator:
+    """매장 코드 할당기
+
+    자릿수별로 섞어 둔 free list 에서 O(1) 로 꺼내고, 삭제된 코드는 같은 자릿수 목록에
+    반납한다. 짧은 코드가 모두 쓰이면 자동으로 다음 자릿수로 넘어간다.
+    """
+
+    def __init__(self, used_codes=(), min_digits=2, max_digits=4):
+        self.min_digits = min_digits
+        self.max_digits = max_digits
+        self.used = set(used_codes)
+        self.pools = {}  # 자릿수 → deque (필요해질 때 생성)
+
+    def _tier_range(self, digits):
+        if digits == self.min_digits:
+            return range(1, 10 ** digits)
+        return range(10 ** (digits - 1), 10 ** digits)
+
+    def _pool(self, digits):
+        pool = self.pools.get(digits)
+        if pool is None:
+            codes = [format_code(n, digits) for n in self._tier_range(digits)]
+            codes = [code for code in codes if code not in self.used]
+            random.shuffle(codes)
+            pool = self.pools[digits] = deque(codes)
+        return pool
+
+    def allocate(self):
+        """미사용 코드 하나 발급 (가장 짧은 자릿수 우선)"""
+        for digits in range(self.min_digits, self.max_digits + 1):
+            pool = self._pool(digits)
+            while pool:
+                code = pool.pop()
+                # 다른 경로로 사용 처리된 코드는 건너뜀
+                if code not in self.used:
+                    self.used.add(code)
+                    return code
+        raise CodeSpaceExhausted(f"{self.max_digits}자리까지의 매장 코드가 모두 사용 중입니다")
+
+    def reset(self, used_codes):
+        """사용 중 코드 목록을 다시 받아 처음부터 구성 (다른 프로세스와 함께 발급할 때)"""
+        self.used = set(used_codes)
+        self.pools = {}
+
+    def reserve(self, code):
+        """외부에서 생성된 코드를 사용 중으로 표시"""
+        self.used.add(code)
+
+    def release(self, code):
+        """삭제된 매장 코드 반납 (같은 자릿수에서 가장 나중에 재사용)"""
+        if code not in self.used:
+            return
+        self.used.discard(code)
+        digits = len(code)
+        pool = self.pools.get(digits)
+        if pool is not None and code.isdigit() and int(code) in self._tier_range(digits):
+            pool.appendleft(code)
@@ -0,0 +1,121 @@
+import os
+import struct
+import sys
+from array import array
+
+from journal import write_atomic
+
+# 승인 목록 파일: 리틀엔디언 64비트 ID 를 이어 붙인 바이너리 (전체 저장 시 정렬)
+APPROVAL_RECORD = struct.Struct('<Q')
+
+_EMPTY = 0  # 디스코드 ID 는 0 이 될 수 없으므로 빈 칸 표시로 사용
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15  # 곱셈 해시 상수 (스노플레이크 하위 비트 편중 완화)
+
+
+class ApprovalSet:
+    """승인된 방문자 ID 집합 - array('Q') 위의 open addressing 해시 테이블
+
+    조회/추가는 평균 O(1) 이고, 적재율 0.35~0.7 사이를 유지하므로 방문자당 약 11~23 바이트만 쓴다.
+    """
+
+    __slots__ = ("_table", "_bits", "_size")
+
+    def __init__(self, ids=()):
+        self._bits = 4
+        self._table = array('Q', bytes(8 << self._bits))
+        self._size = 0
+        for user_id in ids:
+            self.add(user_id)
+
+    def _index(self, user_id):
+        return ((user_id * _GOLDEN) & _MASK64) >> (64 - self._bits)
+
+    def __contains__(self, user_id):
+        table = self._table
+        mask = len(table) - 1
+        i = self._index(user_id)
+        while True:
+            slot = table[i]
+            if slot == user_id:
+                return True
+            if slot == _EMPTY:
+                return False
+            i = (i + 1) & mask
+
+    def add(self, user_id):
+        """새로 추가되면 True, 이미 있으면 False"""
+        if user_id in self:
+            return False
+        if (self._size + 1) * 10 > len(self._table) * 7:
+            self._grow()
+        self._insert(user_id)
+        self._size += 1
+        return True
+
+    def _insert(self, user_id):
+        table = self._table
+        mask = len(table) - 1
+        i = self._index(user_id)
+        while table[i] != _EMPTY:
+            i = (i + 1) & mask
+        table[i] = user_id
+
+    def _grow(self):
+        old = self._table
+        self._bits += 1
+        self._table = array('Q', bytes(8 << self._bits))
+        for slot in old:
+            if slot != _EMPTY:
+                self._insert(slot)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return (slot for slot in self._table if slot != _EMPTY)
+
+    def copy(self):
+        """다른 스레드에서 직렬화할 수 있도록 테이블 복사"""
+        clone = ApprovalSet.__new__(ApprovalSet)
+        clone._table = array('Q', self._table)
+        clone._bits = self._bits
+        clone._size = self._size
+        return clone
+
+    def to_bytes(self):
+        """정렬된 packed 64비트 리틀엔디언 인코딩"""
+        packed = array('Q', sorted(self))
+        if sys.byteorder != 'little':
+            packed.byteswap()
+        return packed.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        packed = array('Q')
+        packed.frombytes(data[:len(data) - len(data) % 8])
+        if sys.byteorder != 'little':
+            packed.byteswap()
+        approvals = cls()
+        for user_id in packed:
+            approvals.add(user_id)
+        return approvals
+
+
+def load_approvals(path):
+    """승인 파일 로드 (없으면 빈 집합)"""
+    if not os.path.exists(path):
+        return ApprovalSet()
+    with open(path, 'rb') as f:
+        return ApprovalSet.from_bytes(f.read())
+
+
+def save_approvals(path, approvals):
+    """승인 파일 전체를 정렬된 상태로 다시 쓰기"""
+    write_atomic(path, approvals.to_bytes())
+
+
+def append_approval(path, user_id):
+    """승인 1건을 8바이트로 이어 쓰기"""
+    with open(path, 'ab') as f:
+        f.write(APPROVAL_RECORD.pack(user_id))
@@ -0,0 +1,107 @@
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime
+
+
+class StoreArchive:
+    """만료된 매장 보관 파일 (gzip 압축 JSON lines)
+
+    정리 한 번에 gzip 멤버 하나를 파일 끝에 이어 붙인다. gzip 은 여러 멤버를 이어 붙인 파일도
+    하나의 스트림으로 읽으므로 read() 로 전체를 순서대로 꺼낼 수 있다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, entries):
+        """매장 기록 여러 건 저장 (블로킹 - 이벤트 루프 밖에서 호출)"""
+        lines = [json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n" for entry in entries]
+        data = gzip.compress("".join(lines).encode('utf-8'))
+        with open(self.path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self):
+        """보관된 매장 기록 전체 (오래된 순)"""
+        if not os.path.exists(self.path):
+            return
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+
+class StoreSweeper:
+    """만료된 매장을 주기적으로 보관 파일로 옮기고 저장소에서 삭제
+
+    보관 파일 저장이 끝난 뒤에만 삭제하므로 중간에 죽어도 매장이 사라지지 않는다
+    (다음 정리 때 다시 보관되어 같은 매장이 두 번 기록될 수는 있음).
+    on_removed(코드, 매장) 는 삭제 후 캐시/코드 반환 등 나머지 정리에 사용한다.
+    lease 가 주어지면 (샤드 여러 프로세스 실행) 임대를 가진 프로세스 하나만 정리한다.
+    """
+
+    def __init__(self, repo, archive, on_removed, interval=60.0, lease=None):
+        self.repo = repo
+        self.archive = archive
+        self.on_removed = on_removed
+        self.interval = interval
+        self.lease = lease
+        self._task = None
+
+    async def sweep(self, now=None):
+        """만료된 매장 정리, 정리한 매장 수 반환"""
+        now = now or datetime.now().isoformat(timespec="seconds")
+        codes = self.repo.expired(now)
+        if not codes:
+            return 0
+
+        archived_at = datetime.now().isoformat(timespec="seconds")
+        entries = []
+        for code in codes:
+            store = self.repo.get(code)
+            entries.append({
+                "code": code,
+                "store": dict(store),
+                "approved_users": list(self.repo.approved_users(code)),
+                "archived_at": archived_at,
+            })
+        await asyncio.to_thread(self.archive.append, entries)
+
+        removed = 0
+        for entry in entries:
+            code = entry["code"]
+            store = self.repo.get(code)
+            # 보관하는 동안 만료 시각이 연장됐거나 삭제된 매장은 건너뜀
+            if store is None or not store.get('expires_at') or store['expires_at'] > now:
+                continue
+            self.repo.delete(code)
+            self.on_removed(code, store)
+            removed += 1
+        return removed
+
+    async def _run(self):
+        while True:
+            try:
+                # 다른 프로세스가 정리를 맡고 있으면 이번 차례는 건너뜀
+                if self.lease is not None and not self.lease.acquire():
+                    await asyncio.sleep(self.interval)
+                    continue
+                removed = await self.sweep()
+                if removed:
+                    print(f"🗄️ 만료된 매장 {removed}개 보관 완료")
+            except Exception as e:
+                print(f"[ERROR] 만료 매장 정리 실패: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.lease is not None:
+            self.lease.close()
+            self.lease = None
@@ -0,0 +1,221 @@
+"""discord.py 객체 대역 (네트워크 없이 핸들러를 돌리기 위한 최소 구현)"""
+import asyncio
+import time
+from collections import Counter
+
+import discord
+
+
+class FakeRest:
+    """REST 호출 흉내 - 호출마다 latency 만큼 기다리고, 경로별 토큰 버킷으로 rate limit 적용"""
+
+    def __init__(self, latency=0.05, limits=None):
+        self.latency = latency
+        self.limits = limits or {}  # 경로 → (초당 횟수, 버스트)
+        self.buckets = {}           # (경로, 범위) → [토큰, 마지막 갱신]
+        self.calls = Counter()
+        self.rate_limited = Counter()
+        self.wait_time = 0.0
+
+    async def call(self, route, scope=None):
+        self.calls[route] += 1
+        limit = self.limits.get(route)
+        if limit is not None:
+            rate, burst = limit
+            bucket = self.buckets.setdefault((route, scope), [float(burst), time.monotonic()])
+            now = time.monotonic()
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                # 429 를 받고 retry_after 만큼 기다린 상황
+                wait = (1 - bucket[0]) / rate
+                self.rate_limited[route] += 1
+                self.wait_time += wait
+                bucket[0] -= 1
+                await asyncio.sleep(wait)
+            else:
+                bucket[0] -= 1
+        await asyncio.sleep(self.latency)
+
+
+class _NotFoundResponse:
+    status = 404
+    reason = "Not Found"
+
+
+class FakeRole:
+    def __init__(self, id, name, position):
+        self.id = id
+        self.name = name
+        self.position = position
+
+    @property
+    def mention(self):
+        return f"<@&{self.id}>"
+
+    def is_default(self):
+        return self.position == 0
+
+    def _key(self):
+        return (self.position, -self.id)
+
+    def __lt__(self, other):
+        return self._key() < other._key()
+
+    def __le__(self, other):
+        return self._key() <= other._key()
+
+    def __gt__(self, other):
+        return self._key() > other._key()
+
+    def __ge__(self, other):
+        return self._key() >= other._key()
+
+
+class FakeChannel:
+    def __init__(self, rest, scope):
+        self.rest = rest
+        self.scope = scope
+
+    async def send(self, content=None, **kwargs):
+        await self.rest.call("dm", self.scope)
+
+
+class FakeUser:
+    bot = False
+
+    def __init__(self, rest, id, name):
+        self.rest = rest
+        self.id = id
+        self.name = name
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+    async def create_dm(self):
+        await self.rest.call("create_dm")
+        return FakeChannel(self.rest, self.id)
+
+    async def send(self, content=None, **kwargs):
+        await self.rest.call("create_dm")
+        await self.rest.call("dm", self.id)
+
+
+class FakeMember(FakeUser):
+    def __init__(self, rest, id, name, guild, roles):
+        super().__init__(rest, id, name)
+        self.guild = guild
+        self._roles = {role.id: role for role in roles}
+
+    @property
+    def roles(self):
+        return sorted([self.guild.default_role, *self._roles.values()])
+
+    @property
+    def top_role(self):
+        return max(self._roles.values(), default=self.guild.default_role)
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+    async def add_roles(self, *roles, reason=None):
+        for role in roles:
+            await self.rest.call("add_roles", self.guild.id)
+            self._roles[role.id] = role
+
+
+class FakeGuild:
+    def __init__(self, rest, id, roles, cache_members=True):
+        self.rest = rest
+        self.id = id
+        self.cache_members = cache_members  # False 면 멤버 캐시를 끈 봇처럼 get_member 가 항상 None
+        self.default_role = FakeRole(id, "@everyone", 0)
+        self._roles = {role.id: role for role in roles}
+        self._members = {}
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+    def get_member(self, user_id):
+        return self._members.get(user_id) if self.cache_members else None
+
+    async def fetch_member(self, user_id):
+        await self.rest.call("fetch_member", self.id)
+        member = self._members.get(user_id)
+        if member is None:
+            raise discord.NotFound(_NotFoundResponse(), "Unknown Member")
+        return member
+
+    def add_member(self, member):
+        self._members[member.id] = member
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def _ack(self):
+        if self._done:
+            raise RuntimeError("interaction already acknowledged")
+        self._done = True
+        await self.interaction.rest.call("interaction_response")
+        self.interaction.acked_at = time.perf_counter()
+
+    async def send_message(self, content=None, **kwargs):
+        await self._ack()
+        self.interaction.record(content, kwargs)
+
+    async def send_modal(self, modal):
+        await self._ack()
+        self.interaction.modal = modal
+        self.interaction.answered_at = self.interaction.acked_at
+
+    async def defer(self, **kwargs):
+        await self._ack()
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self.interaction.rest.call("followup")
+        self.interaction.record(content, kwargs)
+
+
+class FakeInteraction:
+    def __init__(self, rest, user, guild_id):
+        self.rest = rest
+        self.user = user
+        self.guild_id = guild_id
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.messages = []
+        self.modal = None
+        self.view = None
+        self.created_at = time.perf_counter()
+        self.acked_at = None
+        self.answered_at = None  # 첫 메시지(응답 또는 followup)를 받은 시각
+
+    def record(self, content, kwargs):
+        self.messages.append(kwargs.get("embed") or content)
+        if kwargs.get("view") is not None:
+            self.view = kwargs["view"]
+        if self.answered_at is None:
+            self.answered_at = time.perf_counter()
+
+
+class FakeMessage:
+    def __init__(self, rest, author, content):
+        self.rest = rest
+        self.author = author
+        self.content = content
+        self.guild = None
+
+    async def reply(self, content=None, **kwargs):
+        await self.rest.call("dm", self.author.id)
@@ -0,0 +1,392 @@
+"""entry-bot 오프라인 부하 테스트
+
+가짜 Discord 객체(bench/fakes.py)로 /매장등록, /입장, DM 암구호(on_message) 또는 모달 제출,
+/매장목록 핸들러를 네트워크 없이 실행하고 처리량, 지연 시간(p50/p95/p99),
+저장 쓰기 횟수/바이트를 출력한다.
+
+    python bench/run_bench.py --visitors 1000 --duration 60 --stores 50
+    STORAGE_MODE=sqlite python bench/run_bench.py --json result.json
+
+봇 설정(STORAGE_MODE, WRITE_BEHIND_DELAY, ADMISSION_* 등)은 평소처럼 환경 변수로 바꾼다.
+데이터 파일은 임시 폴더에 만들어지고 끝나면 지워진다 (--workdir 로 위치 지정 가능).
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fakes import FakeGuild, FakeInteraction, FakeMember, FakeMessage, FakeRest, FakeRole, FakeUser
+
+# 길드 역할 (이름, 위치) - 방문자 역할은 최소 역할 후보, "방문 인증"은 부여 역할
+LEVEL_ROLES = [("새싹", 2), ("일반", 3), ("정회원", 4), ("VIP", 5)]
+GRANT_ROLE = ("방문 인증", 1)
+OWNER_ROLE = ("Helper", 10)
+
+
+def percentile(values, p):
+    """최근접 순위 백분위 (values 는 정렬된 상태)"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def read_io():
+    """이 프로세스의 누적 쓰기 (write 시스템 콜 수, 바이트), 지원하지 않는 OS 면 None"""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["syscw"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+class Recorder:
+    """핸들러별 지연 시간 기록"""
+
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, name, seconds):
+        self.samples.setdefault(name, []).append(seconds)
+
+    @contextlib.asynccontextmanager
+    async def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def summary(self):
+        result = {}
+        for name, values in self.samples.items():
+            values = sorted(values)
+            result[name] = {
+                "count": len(values),
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "max_ms": values[-1] * 1000,
+            }
+        return result
+
+
+class Scenario:
+    """길드/매장주/매장/방문자 합성 데이터와 재생"""
+
+    def __init__(self, bot_module, args, rest, rng):
+        self.bm = bot_module
+        self.args = args
+        self.rest = rest
+        self.rng = rng
+        self.recorder = Recorder()
+        self.guilds = {}
+        self.users = {}
+        self.owners = []
+        self.stores = []  # (매장코드, 암구호)
+        self.completed = 0
+        self.next_id = 10 ** 6
+        self._build_guilds()
+
+    def _new_id(self):
+        self.next_id += 1
+        return self.next_id
+
+    def _build_guilds(self):
+        for g in range(self.args.guilds):
+            guild_id = 1000 + g
+            roles = [
+                FakeRole(guild_id * 100 + i, name, position)
+                for i, (name, position) in enumerate([GRANT_ROLE, *LEVEL_ROLES, OWNER_ROLE])
+            ]
+            self.guilds[guild_id] = FakeGuild(
+                self.rest, guild_id, roles, cache_members=self.bm.MEMBER_CACHE != "lazy"
+            )
+
+    def _role(self, guild, name):
+        return next(role for role in guild._roles.values() if role.name == name)
+
+    def _member(self, guild, name, roles):
+        member = FakeMember(self.rest, self._new_id(), name, guild, roles)
+        guild.add_member(member)
+        self.users[member.id] = member
+        return member
+
+    def install(self):
+        """봇이 길드/사용자를 가짜 객체에서 찾도록 연결"""
+        bot = self.bm.bot
+        bot.get_guild = self.guilds.get
+        bot.get_user = self.users.get
+
+        # 게이트웨이에 연결하지 않으므로 바로 준비된 것으로 처리
+        async def wait_until_ready():
+            return None
+        bot.wait_until_ready = wait_until_ready
+
+        async def fetch_user(user_id):
+            await self.rest.call("fetch_user")
+            return self.users[user_id]
+        bot.fetch_user = fetch_user
+
+    async def create_stores(self):
+        guilds = list(self.guilds.values())
+        owner_count = max(1, self.args.stores // self.args.stores_per_owner)
+        for i in range(owner_count):
+            guild = guilds[i % len(guilds)]
+            self.owners.append(self._member(guild, f"owner{i}", [self._role(guild, OWNER_ROLE[0])]))
+
+        for i in range(self.args.stores):
+            owner = self.owners[i % len(self.owners)]
+            guild = owner.guild
+            min_role = self.rng.choice([None, None, "새싹", "일반", "정회원"])
+            passphrase = f"암구호{i}" if self.rng.random() < self.args.passphrase_ratio else None
+            before = set(self.bm.repo.codes())
+            interaction = FakeInteraction(self.rest, owner, guild.id)
+            async with self.recorder.timed("create_store"):
+                await self.bm.create_store.callback(
+                    interaction,
+                    매장명=f"매장{i}",
+                    최소역할=self._role(guild, min_role) if min_role else None,
+                    부여역할=self._role(guild, GRANT_ROLE[0]) if self.rng.random() < self.args.grant_ratio else None,
+                    암구호=passphrase,
+                )
+            code, = set(self.bm.repo.codes()) - before
+            self.stores.append((code, passphrase))
+
+    def _pick_store(self):
+        # 인기 매장에 몰리도록 순위 기반 가중치 (skew=0 이면 균등)
+        weights = [1 / (rank + 1) ** self.args.skew for rank in range(len(self.stores))]
+        return self.rng.choices(self.stores, weights=weights)[0]
+
+    def _visitor(self, guild):
+        if self.rng.random() < self.args.outsider_ratio:
+            # 서버 미가입 방문자
+            user = FakeUser(self.rest, self._new_id(), "outsider")
+            self.users[user.id] = user
+            return user
+        level = self.rng.randrange(len(LEVEL_ROLES) + 1)
+        roles = [self._role(guild, name) for name, _ in LEVEL_ROLES[:level]]
+        return self._member(guild, f"visitor{self.next_id}", roles)
+
+    async def visit(self, delay, user, code, passphrase):
+        await asyncio.sleep(delay)
+        interaction = FakeInteraction(self.rest, user, self.bm.repo.get(code)['guild_id'])
+        async with self.recorder.timed("verify_entry"):
+            await self.bm.verify_entry.callback(interaction, code)
+
+        # 대기열로 넘어간 요청은 followup 을 받을 때까지 기다림
+        deadline = time.perf_counter() + self.args.response_timeout
+        while interaction.answered_at is None:
+            if time.perf_counter() > deadline:
+                self.recorder.add("entry_timeout", self.args.response_timeout)
+                return
+            await asyncio.sleep(0.01)
+        self.recorder.add("entry_response", interaction.answered_at - interaction.created_at)
+
+        modal = interaction.modal or getattr(interaction.view, "modal", None)
+        challenged = modal is not None or self.bm.challenges.get(user.id, code) is not None
+        if challenged:
+            await asyncio.sleep(self.rng.uniform(*self.args.think) / self.args.speed)
+            answer = passphrase if self.rng.random() >= self.args.wrong_ratio else "틀린 암구호"
+            if modal is not None:
+                # 모달 제출 (입력값은 TextInput 내부 값에 직접 넣음)
+                modal.passphrase._value = answer
+                submit = FakeInteraction(self.rest, user, None)
+                async with self.recorder.timed("modal_submit"):
+                    await modal.on_submit(submit)
+            else:
+                async with self.recorder.timed("on_message"):
+                    await self.bm.on_message(FakeMessage(self.rest, user, answer))
+        self.completed += 1
+
+    async def list_stores(self, delay, owner):
+        await asyncio.sleep(delay)
+        interaction = FakeInteraction(self.rest, owner, owner.guild.id)
+        async with self.recorder.timed("list_stores"):
+            await self.bm.list_stores.callback(interaction)
+
+    async def replay(self):
+        window = self.args.duration / self.args.speed
+        tasks = []
+        visitors = []
+        for _ in range(self.args.visitors):
+            code, passphrase = self._pick_store()
+            if visitors and self.rng.random() < self.args.repeat_ratio:
+                # 같은 매장에 다시 /입장 (이미 승인된 경우 등)
+                user, code, passphrase = self.rng.choice(visitors)
+            else:
+                user = self._visitor(self.guilds[self.bm.repo.get(code)['guild_id']])
+                visitors.append((user, code, passphrase))
+            tasks.append(self.visit(self.rng.uniform(0, window), user, code, passphrase))
+        for owner in self.owners:
+            for _ in range(self.args.list_calls):
+                tasks.append(self.list_stores(self.rng.uniform(0, window), owner))
+        await asyncio.gather(*tasks)
+
+
+async def run(args):
+    import bot as bot_module
+
+    rng = random.Random(args.seed)
+    rest = FakeRest(latency=args.latency, limits={
+        "add_roles": (args.role_rate, args.role_burst),
+        "dm": (args.dm_rate, args.dm_burst),
+    })
+    scenario = Scenario(bot_module, args, rest, rng)
+    scenario.install()
+
+    io_start = read_io()
+    await bot_module.bot.setup_hook()
+    await scenario.create_stores()
+    started = time.perf_counter()
+    await scenario.replay()
+    elapsed = time.perf_counter() - started
+    grants_pending = bot_module.role_grants.pending_count()
+    await bot_module.bot.close()
+    io_end = read_io()
+
+    result = {
+        "config": {
+            "storage": bot_module.STORAGE_MODE,
+            "passphrase_mode": bot_module.PASSPHRASE_MODE,
+            "member_cache": bot_module.MEMBER_CACHE,
+            "visitors": args.visitors,
+            "stores": args.stores,
+            "guilds": args.guilds,
+            "duration": args.duration,
+            "speed": args.speed,
+            "latency": args.latency,
+            "seed": args.seed,
+        },
+        "elapsed_s": elapsed,
+        "throughput_per_s": scenario.completed / elapsed if elapsed else 0.0,
+        "handlers": scenario.recorder.summary(),
+        "persistence": {
+            "writes": io_end[0] - io_start[0] if io_start and io_end else None,
+            "bytes": io_end[1] - io_start[1] if io_start and io_end else None,
+            "data_bytes": dir_size("data"),
+        },
+        "rest": {
+            "calls": dict(rest.calls),
+            "rate_limited": dict(rest.rate_limited),
+            "rate_limit_wait_s": rest.wait_time,
+        },
+        "role_grants_pending_at_end": grants_pending,
+    }
+    return result
+
+
+def print_report(result):
+    config = result["config"]
+    print(f"== entry-bot 벤치마크 (저장: {config['storage']}, 암구호: {config['passphrase_mode']}, "
+          f"멤버 캐시: {config['member_cache']}) ==")
+    print(f"방문자 {config['visitors']}명 / 매장 {config['stores']}개 / 길드 {config['guilds']}개 / "
+          f"{config['duration']:.0f}초 (x{config['speed']:g} 가속), REST 지연 {config['latency'] * 1000:.0f}ms")
+    print(f"처리량: {result['throughput_per_s']:.1f} 방문/초 (경과 {result['elapsed_s']:.2f}초)")
+    print()
+    print(f"{'핸들러':<16}{'호출':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}")
+    for name, stats in result["handlers"].items():
+        print(f"{name:<16}{stats['count']:>8}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+              f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    print()
+    persistence = result["persistence"]
+    if persistence["writes"] is None:
+        print("저장 쓰기: 측정 불가 (/proc/self/io 없음)")
+    else:
+        print(f"저장 쓰기: {persistence['writes']}회, {persistence['bytes'] / 1024:.1f} KB")
+    print(f"데이터 폴더 크기: {persistence['data_bytes'] / 1024:.1f} KB")
+    rest = result["rest"]
+    calls = ", ".join(f"{route} {count}" for route, count in sorted(rest["calls"].items()))
+    print(f"REST 호출: {calls}")
+    limited = sum(rest["rate_limited"].values())
+    print(f"rate limit: {limited}회, 대기 {rest['rate_limit_wait_s']:.2f}초")
+    print(f"종료 시 남은 역할 부여: {result['role_grants_pending_at_end']}건")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="entry-bot 오프라인 부하 테스트")
+    parser.add_argument("--visitors", type=int, default=1000, help="방문자(/입장) 수")
+    parser.add_argument("--duration", type=float, default=60.0, help="방문이 분포되는 시간(초)")
+    parser.add_argument("--speed", type=float, default=10.0, help="가속 배율 (도착/생각 시간을 나눔)")
+    parser.add_argument("--stores", type=int, default=50, help="매장 수")
+    parser.add_argument("--guilds", type=int, default=3, help="길드 수")
+    parser.add_argument("--stores-per-owner", type=int, default=5, help="매장주 1명당 매장 수")
+    parser.add_argument("--skew", type=float, default=1.0, help="인기 매장 쏠림 정도 (0 이면 균등)")
+    parser.add_argument("--passphrase-ratio", type=float, default=0.5, help="암구호가 있는 매장 비율")
+    parser.add_argument("--grant-ratio", type=float, default=0.5, help="부여 역할이 있는 매장 비율")
+    parser.add_argument("--outsider-ratio", type=float, default=0.03, help="서버 미가입 방문자 비율")
+    parser.add_argument("--repeat-ratio", type=float, default=0.05, help="같은 매장 재방문 비율")
+    parser.add_argument("--wrong-ratio", type=float, default=0.1, help="암구호를 틀리는 비율")
+    parser.add_argument("--think", type=float, nargs=2, default=(1.0, 5.0), metavar=("MIN", "MAX"),
+                        help="암구호 입력까지 걸리는 시간 범위(초)")
+    parser.add_argument("--list-calls", type=int, default=3, help="매장주 1명당 /매장목록 호출 수")
+    parser.add_argument("--response-timeout", type=float, default=120.0,
+                        help="대기열 요청의 응답을 기다리는 최대 시간(초)")
+    parser.add_argument("--latency", type=float, default=0.05, help="REST 호출 1회 지연(초)")
+    parser.add_argument("--role-rate", type=float, default=1.0, help="길드별 역할 부여 초당 허용 수")
+    parser.add_argument("--role-burst", type=int, default=10, help="길드별 역할 부여 버스트")
+    parser.add_argument("--dm-rate", type=float, default=1.0, help="DM 채널별 초당 허용 수")
+    parser.add_argument("--dm-burst", type=int, default=5, help="DM 채널별 버스트")
+    parser.add_argument("--passphrase-mode", choices=("modal", "dm"), help="PASSPHRASE_MODE 덮어쓰기")
+    parser.add_argument("--storage", choices=("json", "journal", "sqlite"), help="STORAGE_MODE 덮어쓰기")
+    parser.add_argument("--member-cache", choices=("full", "lazy"), help="MEMBER_CACHE 덮어쓰기")
+    parser.add_argument("--seed", type=int, default=1, help="난수 시드")
+    parser.add_argument("--workdir", help="데이터 파일을 만들 폴더 (기본: 임시 폴더, 끝나면 삭제)")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장 (회귀 비교용)")
+    parser.add_argument("--verbose", action="store_true", help="봇 로그 출력")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.passphrase_mode:
+        os.environ["PASSPHRASE_MODE"] = args.passphrase_mode
+    if args.storage:
+        os.environ["STORAGE_MODE"] = args.storage
+    if args.member_cache:
+        os.environ["MEMBER_CACHE"] = args.member_cache
+    # 네트워크 없이 돌리므로 슬래시 명령어 동기화는 끔
+    os.environ["COMMAND_SYNC"] = "off"
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    # bot 모듈은 현재 폴더 기준으로 data/ 를 만들므로 작업 폴더로 이동한 뒤 import
+    workdir = args.workdir or tempfile.mkdtemp(prefix="entry-bot-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        log = sys.stdout if args.verbose else io.StringIO()
+        with contextlib.redirect_stdout(log):
+            result = asyncio.run(run(args))
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(result)
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
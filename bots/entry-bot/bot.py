@@ -3,16 +3,118 @@ from discord.ext import commands
 from discord import app_commands
 import secrets
 import os
-import json
-from datetime import datetime
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+# 두 봇이 함께 쓰는 모듈 (bots/common)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from metrics import metrics
+from command_sync import sync_commands
+from repository import open_repository, StoreCodeTaken
+from allocator import CodeAllocator, CodeSpaceExhausted
+from notifier import OwnerNotifier, OwnerEvent
+from role_grants import RoleGrantWorker
+from challenges import ChallengeStore, SqliteChallengeStore
+from shards import ShardMailbox, Lease, shard_of, parse_shard_ids
+from role_index import RoleIndex, format_roles
+from embeds import EmbedTemplates
+from admission import AdmissionController
+from members import MemberCache
+from qr import QRCache
+from archive import StoreArchive, StoreSweeper
+from entry_events import EntryEventLog, OUTCOME_APPROVED, OUTCOME_ALREADY, OUTCOME_DENIED
+
+# 암구호 입력 방식: "dm" (DM 답장, 기본) 또는 "modal" (/입장 응답으로 입력 창, 메시지 인텐트 불필요)
+PASSPHRASE_MODE = os.getenv("PASSPHRASE_MODE", "dm")
+
+# 멤버 캐시 방식: "full" (시작 시 모든 길드 멤버를 받아 메모리에 보관)
+#               "lazy" (멤버 캐시 끄고 필요할 때만 조회, 최근 조회한 멤버만 LRU+TTL 로 보관)
+MEMBER_CACHE = os.getenv("MEMBER_CACHE", "full")
+MEMBER_CACHE_SIZE = int(os.getenv("MEMBER_CACHE_SIZE", "5000"))
+MEMBER_CACHE_TTL = float(os.getenv("MEMBER_CACHE_TTL", "300"))
+
+# 샤드 설정: SHARD_COUNT 가 0 이면 샤드 없이 실행, 1 이상이면 AutoShardedBot 으로 실행
+#   SHARD_IDS 에 일부 샤드만 적으면 (예: "0-3", "0,2") 이 프로세스는 그 샤드만 맡고
+#   나머지 샤드를 맡은 프로세스와 SQLite 로 상태를 공유 (STORAGE_MODE=sqlite 필수, run_shards.py 참고)
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+SHARD_IDS = parse_shard_ids(os.getenv("SHARD_IDS", ""))
+MULTI_PROCESS = SHARD_COUNT > 0 and 0 < len(SHARD_IDS) < SHARD_COUNT
+# 명령어 동기화처럼 한 곳에서만 할 일은 샤드 0 을 맡은 프로세스가 담당 (만료 매장 정리는 SQLite 임대로 한 곳만)
+PRIMARY_PROCESS = not MULTI_PROCESS or 0 in SHARD_IDS
 
 # 봇 설정
 intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
+if PASSPHRASE_MODE == "modal":
+    # 모달 방식은 메시지 이벤트가 필요 없으므로 게이트웨이 메시지 수신 끄기
+    intents.messages = False
+else:
+    intents.message_content = True
+# lazy 모드는 멤버 목록 수신/청크가 필요 없음 (fetch_member 는 멤버 인텐트 없이도 가능)
+intents.members = MEMBER_CACHE != "lazy"
 intents.guilds = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+class EntryBot(commands.AutoShardedBot if SHARD_COUNT else commands.Bot):
+    async def setup_hook(self):
+        # 이벤트 루프가 뜬 뒤에 지연 저장 시작
+        repo.start_write_behind(WRITE_BEHIND_DELAY)
+        notifier.start()
+        role_grants.start()
+        challenges.start()
+        admission.start()
+        entry_log.start()
+        sweeper.start()
+        if shard_mailbox is not None:
+            shard_mailbox.start()
+        
+        # 계측 (METRICS_PORT / METRICS_FILE 이 설정된 경우 노출)
+        metrics.set_gauge("entry_passphrase_waiting", lambda: len(challenges))
+        metrics.set_gauge("entry_admission_queued", lambda: admission.queued)
+        metrics.set_gauge("entry_admission_active", lambda: admission.active)
+        metrics.set_gauge("entry_role_grants_pending", role_grants.pending_count)
+        metrics.set_gauge("entry_stores", repo.count)
+        metrics.set_gauge("entry_member_cache_size", lambda: len(member_cache))
+        await metrics.start_from_env(self)
+        
+        # 슬래시 명령어는 프로세스당 한 번, 명령어 정의가 바뀐 경우에만 동기화
+        try:
+            if await sync_commands(self.tree, COMMAND_SYNC_FILE, mode=COMMAND_SYNC if PRIMARY_PROCESS else "off"):
+                print("[OK] 슬래시 명령어 동기화 완료")
+        except discord.HTTPException as e:
+            metrics.inc("bot_errors_total", where="sync")
+            print(f"[ERROR] 슬래시 명령어 동기화 실패: {e}")
+
+    def dispatch(self, event_name, /, *args, **kwargs):
+        metrics.inc("bot_gateway_events_total", event=event_name)
+        super().dispatch(event_name, *args, **kwargs)
+
+    async def on_error(self, event_method, /, *args, **kwargs):
+        metrics.inc("bot_errors_total", where=event_method)
+        await super().on_error(event_method, *args, **kwargs)
+
+    async def close(self):
+        await metrics.close()
+        await sweeper.close()
+        if shard_mailbox is not None:
+            await shard_mailbox.close()
+        qr_cache.close()
+        await admission.close()
+        await challenges.close()
+        await entry_log.close()
+        # 남은 역할 부여는 저장해두고 다음 실행 때 재개
+        await role_grants.close()
+        # 연결을 끊기 전에 모아둔 매장주 알림 전송
+        await notifier.close()
+        await super().close()
+        # 종료 전에 미뤄둔 저장 반영
+        await repo.flush()
+
+bot_options = {}
+if MEMBER_CACHE == "lazy":
+    bot_options.update(member_cache_flags=discord.MemberCacheFlags.none(), chunk_guilds_at_startup=False)
+if SHARD_COUNT:
+    bot_options.update(shard_count=SHARD_COUNT, shard_ids=SHARD_IDS or None)
+bot = EntryBot(command_prefix="!", intents=intents, **bot_options)
 
 # 매장 관리 권한이 있는 역할 리스트
 ALLOWED_ROLES = [
@@ -30,31 +132,218 @@ def has_allowed_role(interaction: discord.Interaction) -> bool:
 DATA_DIR = "data"
 QR_DIR = "qr_codes"
 STORES_FILE = os.path.join(DATA_DIR, "stores.json")
+PENDING_GRANTS_FILE = os.path.join(DATA_DIR, "pending_grants.json")
+CHALLENGES_FILE = os.path.join(DATA_DIR, "challenges.json")
+JOURNAL_FILE = os.path.join(DATA_DIR, "stores.journal")
+DB_FILE = os.path.join(DATA_DIR, "stores.db")
+COMMAND_SYNC_FILE = os.path.join(DATA_DIR, "command_sync.json")
+ENTRY_LOG_FILE = os.path.join(DATA_DIR, "entry_events.log")
+ENTRY_STATS_FILE = os.path.join(DATA_DIR, "entry_stats.json")
+ARCHIVE_FILE = os.path.join(DATA_DIR, "stores_archive.jsonl.gz")
+SHARED_STATE_FILE = os.path.join(DATA_DIR, "shared_state.db")
+
+# 슬래시 명령어 동기화: "auto" (명령어 정의가 바뀐 경우만), "force" (매번), "off" (안 함)
+COMMAND_SYNC = os.getenv("COMMAND_SYNC", "auto")
+
+# 저장 방식: "json" (매번 전체 파일 저장), "journal" (변경분만 append, 주기적 압축),
+#           "sqlite" (SQLite WAL, 첫 실행 시 stores.json 자동 이전)
+STORAGE_MODE = os.getenv("STORAGE_MODE", "json")
+JOURNAL_COMPACT_EVERY = int(os.getenv("JOURNAL_COMPACT_EVERY", "500"))
+
+# 지연 저장 간격(초) - 이 시간 동안 모인 변경을 한 번에 루프 밖에서 저장 (0 이면 즉시 저장)
+WRITE_BEHIND_DELAY = float(os.getenv("WRITE_BEHIND_DELAY", "1.0"))
+
+# 매장주 알림을 모아서 보내는 간격(초) - 이 시간 동안의 입장 결과를 DM 하나로 요약
+OWNER_DIGEST_WINDOW = float(os.getenv("OWNER_DIGEST_WINDOW", "5.0"))
+
+# 길드별 역할 부여 간격(초) - 한꺼번에 몰려도 역할 수정 rate limit 에 걸리지 않도록
+ROLE_GRANT_INTERVAL = float(os.getenv("ROLE_GRANT_INTERVAL", "0.5"))
+
+# 암구호 입력 대기 시간(초) / 최대 대기 건수 / 재시작 후에도 유지할지 여부
+CHALLENGE_TTL = float(os.getenv("CHALLENGE_TTL", "600"))
+CHALLENGE_MAX_ENTRIES = int(os.getenv("CHALLENGE_MAX_ENTRIES", "10000"))
+PERSIST_CHALLENGES = os.getenv("PERSIST_CHALLENGES", "0") == "1"
+
+# /입장 처리량 제한 - 매장별/길드별 초당 처리 수와 버스트, 동시 처리 수, 대기열 길이
+ADMISSION_STORE_RATE = float(os.getenv("ADMISSION_STORE_RATE", "5"))
+ADMISSION_STORE_BURST = int(os.getenv("ADMISSION_STORE_BURST", "10"))
+ADMISSION_GUILD_RATE = float(os.getenv("ADMISSION_GUILD_RATE", "20"))
+ADMISSION_GUILD_BURST = int(os.getenv("ADMISSION_GUILD_BURST", "40"))
+ADMISSION_WORKERS = int(os.getenv("ADMISSION_WORKERS", "8"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "1000"))
+
+# QR 코드 내용 ({code} 는 매장 코드로 바뀜) / 캐시 폴더에 남겨둘 최대 이미지 수 / 렌더링 프로세스 수
+QR_PAYLOAD = os.getenv("QR_PAYLOAD", "/입장 {code}")
+QR_CACHE_MAX_FILES = int(os.getenv("QR_CACHE_MAX_FILES", "500"))
+QR_WORKERS = int(os.getenv("QR_WORKERS", "2"))
+
+# 매장 유효 시간 기본값(시간, 0 이면 만료 없음) / 만료 매장 정리 간격(초)
+STORE_DEFAULT_TTL_HOURS = int(os.getenv("STORE_DEFAULT_TTL_HOURS", "0"))
+STORE_SWEEP_INTERVAL = float(os.getenv("STORE_SWEEP_INTERVAL", "60"))
+
+# 매장 코드 최대 자릿수 (2자리 01~99 가 다 차면 3자리, 4자리 순으로 확장)
+STORE_CODE_MAX_DIGITS = int(os.getenv("STORE_CODE_MAX_DIGITS", "4"))
+
+# 여러 프로세스로 실행하면 매장은 SQLite 로만 공유 가능 (json/journal 은 프로세스별 메모리 사본)
+if MULTI_PROCESS and STORAGE_MODE != "sqlite":
+    raise SystemExit("❌ 샤드를 여러 프로세스로 나눠 실행하려면 STORAGE_MODE=sqlite 가 필요합니다.")
+
+# 프로세스마다 따로 쓰는 파일은 맡은 첫 샤드 번호로 구분 (예: pending_grants.shard2.json)
+def process_file(path):
+    if not MULTI_PROCESS:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{SHARD_IDS[0]}{ext}"
+
+PENDING_GRANTS_FILE = process_file(PENDING_GRANTS_FILE)
+ENTRY_LOG_FILE = process_file(ENTRY_LOG_FILE)
+ENTRY_STATS_FILE = process_file(ENTRY_STATS_FILE)
 
 # 디렉토리 생성
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(QR_DIR, exist_ok=True)
 
-# 매장 데이터 로드/저장 함수
-def load_stores():
-    if os.path.exists(STORES_FILE):
-        with open(STORES_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+# 매장 저장소
+repo = open_repository(
+    STORAGE_MODE, STORES_FILE, JOURNAL_FILE, DB_FILE,
+    compact_every=JOURNAL_COMPACT_EVERY
+)
+repo.on_saved = lambda seconds: metrics.observe("bot_save_seconds", seconds, target=STORAGE_MODE)
+code_allocator = CodeAllocator(repo.codes(), max_digits=STORE_CODE_MAX_DIGITS)
+
+# 입장 결과 로그 + 분/시간 단위 통계 (/매장통계)
+entry_log = EntryEventLog(ENTRY_LOG_FILE, ENTRY_STATS_FILE)
 
-def save_stores(stores):
-    with open(STORES_FILE, 'w', encoding='utf-8') as f:
-        json.dump(stores, f, ensure_ascii=False, indent=2)
+# 만료된 매장은 압축 보관 파일로 옮기고 저장소에서 삭제 (setup_hook 에서 시작)
+# 여러 프로세스로 실행하면 공유 SQLite 임대를 가진 프로세스 하나만 정리 (그 프로세스가 죽으면 다른 곳이 이어받음)
+sweeper_lease = None
+if MULTI_PROCESS:
+    sweeper_lease = Lease(SHARED_STATE_FILE, "store_sweeper", ttl=max(3 * STORE_SWEEP_INTERVAL, 60.0))
+sweeper = StoreSweeper(repo, StoreArchive(ARCHIVE_FILE), lambda code, store: forget_store(code, store),
+                       interval=STORE_SWEEP_INTERVAL, lease=sweeper_lease)
 
-# 전역 변수
-stores = load_stores()
+# 매장 QR 이미지 캐시 (qrcode 패키지가 없으면 텍스트로만 안내)
+qr_cache = QRCache(QR_DIR, max_files=QR_CACHE_MAX_FILES, workers=QR_WORKERS)
+
+# 매장별 최소/부여 역할 캐시 (역할 변경 이벤트로 무효화)
+role_index = RoleIndex(bot)
+
+# 매장별 방문자 응답 embed 템플릿 (매장 수정/삭제, 역할 변경 시 무효화)
+store_embeds = EmbedTemplates()
+
+# 멤버 조회 (lazy 모드면 상호작용 payload + fetch_member 결과를 LRU+TTL 로 보관)
+member_cache = MemberCache(lazy=MEMBER_CACHE == "lazy", max_entries=MEMBER_CACHE_SIZE, ttl=MEMBER_CACHE_TTL)
+
+# 백그라운드 작업자 (setup_hook 에서 시작)
+notifier = OwnerNotifier(bot, window=OWNER_DIGEST_WINDOW)
+role_grants = RoleGrantWorker(bot, PENDING_GRANTS_FILE, notifier, interval=ROLE_GRANT_INTERVAL)
+admission = AdmissionController(
+    store_rate=ADMISSION_STORE_RATE, store_burst=ADMISSION_STORE_BURST,
+    guild_rate=ADMISSION_GUILD_RATE, guild_burst=ADMISSION_GUILD_BURST,
+    max_workers=ADMISSION_WORKERS, max_queue=ADMISSION_MAX_QUEUE
+)
+
+# 샤드 프로세스 간 메시지 (DM 으로 받은 암구호, 만료 정리한 매장의 통계/캐시 비우기를 매장 서버의 샤드를 맡은 프로세스로 전달)
+shard_mailbox = None
+if MULTI_PROCESS:
+    shard_mailbox = ShardMailbox(SHARED_STATE_FILE, SHARD_IDS, lambda kind, payload: on_shard_message(kind, payload))
 
 @bot.event
 async def on_ready():
-    await bot.tree.sync()
     print(f'✅ {bot.user} 봇이 준비되었습니다!')
     print(f'서버 수: {len(bot.guilds)}')
-    print(f'로드된 매장 수: {len(stores)}')
+    print(f'로드된 매장 수: {repo.count()}')
+
+# 명령어 처리 중 예외 (오류 수 집계 후 로그)
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    command = interaction.command.name if interaction.command else "unknown"
+    metrics.inc("bot_errors_total", where=f"command:{command}")
+    print(f"[ERROR] /{command} 처리 실패: {error!r}")
+
+# 역할 위치/이름이 바뀌면 해당 길드의 역할 캐시와 embed 템플릿 무효화
+@bot.event
+async def on_guild_role_create(role):
+    role_index.invalidate_guild(role.guild.id)
+    store_embeds.invalidate_guild(role.guild.id)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    role_index.invalidate_guild(after.guild.id)
+    store_embeds.invalidate_guild(after.guild.id)
+
+@bot.event
+async def on_guild_role_delete(role):
+    role_index.invalidate_guild(role.guild.id)
+    store_embeds.invalidate_guild(role.guild.id)
+
+# 매장 QR 이미지 첨부 파일 (qrcode 미설치 또는 생성 실패 시 None)
+async def qr_file(매장코드):
+    try:
+        with metrics.timer("entry_step_seconds", step="qr_render"):
+            path = await qr_cache.get(매장코드, QR_PAYLOAD.format(code=매장코드))
+    except Exception as e:
+        metrics.inc("bot_errors_total", where="qr_render")
+        print(f"[ERROR] QR 생성 실패 ({매장코드}): {e}")
+        return None
+    if path is None:
+        return None
+    return discord.File(path, filename=f"store_{매장코드}.png")
+
+# 매장 만료 시각 (ISO 문자열, 로컬 시간)
+def expiry_after(hours):
+    return (datetime.now() + timedelta(hours=hours)).isoformat(timespec="seconds")
+
+def is_expired(store):
+    return bool(store.get('expires_at')) and store['expires_at'] <= datetime.now().isoformat(timespec="seconds")
+
+def format_expiry(store):
+    """만료 시각 표시 (디스코드 타임스탬프, 만료 없음이면 None)"""
+    if not store.get('expires_at'):
+        return None
+    timestamp = int(datetime.fromisoformat(store['expires_at']).timestamp())
+    return f"<t:{timestamp}:f> (<t:{timestamp}:R>)"
+
+# 매장 삭제 후 정리 (/매장삭제, 만료 정리 공통)
+def forget_store(매장코드, store):
+    qr_cache.remove_code(매장코드)
+    code_allocator.release(매장코드)
+    # 입장 통계/역할/embed 캐시는 매장 서버의 샤드를 맡은 프로세스 메모리에 있으므로
+    # 만료 정리를 다른 프로세스가 했으면 그쪽으로 전달해서 비우게 함
+    shard_id = shard_of(store['guild_id'], SHARD_COUNT) if shard_mailbox is not None else None
+    if shard_id is not None and shard_id not in SHARD_IDS:
+        try:
+            shard_mailbox.post(shard_id, "forget_store", {"store_code": 매장코드, "guild_id": store['guild_id']})
+        except sqlite3.Error as e:
+            print(f"[ERROR] 매장 정리 전달 실패 ({매장코드}): {e}")
+        return
+    forget_store_state(매장코드, store['guild_id'])
+
+# 이 프로세스 메모리에 있는 매장별 통계/캐시 비우기
+def forget_store_state(매장코드, guild_id):
+    entry_log.reset(매장코드)
+    role_index.invalidate_store(매장코드, guild_id)
+    store_embeds.invalidate_store(매장코드, guild_id)
+
+# 새 코드로 매장 저장 후 코드 반환 (발급 가능한 코드가 없으면 None)
+# 다른 샤드 프로세스가 같은 코드를 먼저 등록했으면 다른 코드로 다시 시도
+def register_store(store):
+    resynced = False
+    while True:
+        try:
+            code = code_allocator.allocate()
+        except CodeSpaceExhausted:
+            # 다른 프로세스에서 삭제/정리된 코드는 이 프로세스 할당기에 반납되지 않으므로 한 번 다시 읽음
+            if not MULTI_PROCESS or resynced:
+                return None
+            code_allocator.reset(repo.codes())
+            resynced = True
+            continue
+        try:
+            repo.create(code, store)
+        except StoreCodeTaken:
+            continue
+        return code
 
 # 1. 매장 등록
 @bot.tree.command(name="매장등록", description="매장 입장용 QR 생성")
@@ -62,14 +351,17 @@ async def on_ready():
     매장명="매장 또는 이벤트 이름",
     최소역할="입장 가능한 최소 역할 (선택사항)",
     부여역할="입장 승인 시 자동 부여할 역할 (선택사항)",
-    암구호="오늘의 암구호 (선택사항)"
+    암구호="오늘의 암구호 (선택사항)",
+    유효시간="매장 유지 시간(시간 단위, 지나면 자동 보관 후 삭제) (선택사항)"
 )
+@metrics.timed("bot_command_seconds", command="매장등록")
 async def create_store(
     interaction: discord.Interaction,
     매장명: str,
     최소역할: discord.Role = None,
     부여역할: discord.Role = None,
-    암구호: str = None
+    암구호: str = None,
+    유효시간: app_commands.Range[int, 1, 24 * 365] = None
 ):
     # 권한 확인
     if not has_allowed_role(interaction):
@@ -78,19 +370,13 @@ async def create_store(
             ephemeral=True
         )
         return
-    # 세션 ID 생성 (숫자 2자리: 01~99)
-    import random
-    
-    # 중복 방지를 위해 기존 코드와 겹치지 않을 때까지 생성
-    while True:
-        session_id = f"{random.randint(1, 99):02d}"  # 01, 02, ..., 99
-        
-        # 중복 확인
-        if session_id not in stores:
-            break
+    # QR 생성(프로세스 풀 기동 포함)이 3초 응답 제한을 넘을 수 있으므로 먼저 응답 보류
+    # - 매장이 저장된 뒤 응답이 실패해 코드를 못 보는 일이 없도록
+    await interaction.response.defer(ephemeral=True, thinking=True)
     
-    # 매장 정보 저장
-    stores[session_id] = {
+    # 매장 정보 저장 (세션 ID 는 01~99 우선, 모두 사용 중이면 더 긴 코드)
+    ttl_hours = 유효시간 or STORE_DEFAULT_TTL_HOURS
+    session_id = register_store({
         "store_name": 매장명,
         "min_role_id": 최소역할.id if 최소역할 else None,
         "grant_role_id": 부여역할.id if 부여역할 else None,
@@ -98,11 +384,16 @@ async def create_store(
         "owner_id": interaction.user.id,
         "guild_id": interaction.guild_id,
         "created_at": datetime.now().isoformat(),
-        "approved_users": []  # 승인된 사용자 목록
-    }
-    save_stores(stores)
+        "expires_at": expiry_after(ttl_hours) if ttl_hours else None
+    })
+    if session_id is None:
+        await interaction.followup.send(
+            "❌ 발급 가능한 매장 코드가 없습니다. 사용하지 않는 매장을 삭제한 뒤 다시 시도해주세요.",
+            ephemeral=True
+        )
+        return
     
-    # 응답 메시지 (QR 없이 텍스트만)
+    # 응답 메시지 (QR 이미지를 만들 수 있으면 첨부)
     embed = discord.Embed(
         title=f"🏪 {매장명} - 매장 등록 완료",
         description=f"## 매장 코드\n# **`{session_id}`**\n\n방문자는 `/입장 {session_id}` 명령어를 사용하세요.",
@@ -118,14 +409,22 @@ async def create_store(
         embed.add_field(name="암구호 설정", value="✅ 설정됨", inline=True)
     else:
         embed.add_field(name="암구호 설정", value="❌ 없음", inline=True)
+    expiry = format_expiry(repo.get(session_id))
+    if expiry:
+        embed.add_field(name="만료", value=expiry, inline=False)
     
     embed.add_field(
         name="💡 사용 방법",
-        value="• 매장 코드를 방문자에게 공유하세요\n• 방문자가 `/입장 코드`를 입력하면 자동 검증됩니다\n• `/매장수정`으로 조건 변경 가능",
+        value="• 매장 코드를 방문자에게 공유하세요\n• 방문자가 `/입장 코드`를 입력하면 자동 검증됩니다\n• `/매장수정`으로 조건 변경 가능\n• `/매장qr`로 QR 코드를 다시 볼 수 있습니다",
         inline=False
     )
     
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    file = await qr_file(session_id)
+    if file:
+        embed.set_image(url=f"attachment://{file.filename}")
+        await interaction.followup.send(embed=embed, file=file, ephemeral=True)
+    else:
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
 # 2. 매장 수정
 @bot.tree.command(name="매장수정", description="매장 정보 수정")
@@ -134,15 +433,18 @@ async def create_store(
     매장명="새 매장명 (선택사항)",
     최소역할="새 최소 역할 (선택사항)",
     부여역할="새 부여 역할 (선택사항)",
-    암구호="새 암구호 (선택사항)"
+    암구호="새 암구호 (선택사항)",
+    유효시간="지금부터 매장 유지 시간(시간 단위, 0 이면 만료 없음) (선택사항)"
 )
+@metrics.timed("bot_command_seconds", command="매장수정")
 async def update_store(
     interaction: discord.Interaction,
     매장코드: str,
     매장명: str = None,
     최소역할: discord.Role = None,
     부여역할: discord.Role = None,
-    암구호: str = None
+    암구호: str = None,
+    유효시간: app_commands.Range[int, 0, 24 * 365] = None
 ):
     # 권한 확인
     if not has_allowed_role(interaction):
@@ -152,45 +454,57 @@ async def update_store(
         )
         return
     # 매장 존재 확인
-    if 매장코드 not in stores:
+    store = repo.get(매장코드)
+    if store is None:
         await interaction.response.send_message("❌ 존재하지 않는 매장 코드입니다.", ephemeral=True)
         return
     
     # 권한 확인
-    if stores[매장코드]['owner_id'] != interaction.user.id:
+    if store['owner_id'] != interaction.user.id:
         await interaction.response.send_message("❌ 본인이 생성한 매장만 수정할 수 있습니다.", ephemeral=True)
         return
     
-    store = stores[매장코드]
     changes = []
+    fields = {}
     
     # 변경사항 적용
     if 매장명:
-        store['store_name'] = 매장명
+        fields['store_name'] = 매장명
         changes.append(f"매장명: {매장명}")
     
     if 최소역할:
-        store['min_role_id'] = 최소역할.id
+        fields['min_role_id'] = 최소역할.id
         changes.append(f"최소역할: {최소역할.mention}")
     
     if 부여역할:
-        store['grant_role_id'] = 부여역할.id
+        fields['grant_role_id'] = 부여역할.id
         changes.append(f"부여역할: {부여역할.mention}")
     
     if 암구호 is not None:
         if 암구호 == "":
-            store['passphrase'] = None
+            fields['passphrase'] = None
             changes.append("암구호: 제거됨")
         else:
-            store['passphrase'] = 암구호
+            fields['passphrase'] = 암구호
             changes.append("암구호: 변경됨")
     
+    if 유효시간 is not None:
+        if 유효시간 == 0:
+            fields['expires_at'] = None
+            changes.append("만료: 없음")
+        else:
+            fields['expires_at'] = expiry_after(유효시간)
+            changes.append(f"만료: {format_expiry(fields)}")
+    
     if not changes:
         await interaction.response.send_message("❌ 변경할 내용이 없습니다.", ephemeral=True)
         return
     
-    store['updated_at'] = datetime.now().isoformat()
-    save_stores(stores)
+    fields['updated_at'] = datetime.now().isoformat()
+    repo.update(매장코드, fields)
+    role_index.invalidate_store(매장코드, store['guild_id'])
+    store_embeds.invalidate_store(매장코드, store['guild_id'])
+    store.update(fields)
     
     embed = discord.Embed(
         title="✅ 매장 정보 수정 완료",
@@ -202,15 +516,66 @@ async def update_store(
     
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
-# 암구호 대기 상태 저장
-passphrase_waiting = {}
+# 암구호 대기 상태 저장 ((사용자, 매장코드) 별, TTL 만료)
+# 여러 프로세스로 실행하면 DM 을 받는 샤드 0 프로세스도 볼 수 있도록 SQLite 에 저장
+if MULTI_PROCESS:
+    challenges = SqliteChallengeStore(SHARED_STATE_FILE, ttl=CHALLENGE_TTL, max_entries=CHALLENGE_MAX_ENTRIES)
+else:
+    challenges = ChallengeStore(
+        ttl=CHALLENGE_TTL, max_entries=CHALLENGE_MAX_ENTRIES,
+        path=CHALLENGES_FILE if PERSIST_CHALLENGES else None
+    )
+
+# 암구호 입력 모달
+class PassphraseModal(discord.ui.Modal):
+    passphrase = discord.ui.TextInput(label="암구호", placeholder="오늘의 암구호를 입력하세요", max_length=100)
+
+    def __init__(self, store_code, store_name, member):
+        super().__init__(title=f"🔐 {store_name} - 암구호 입력"[:45], timeout=CHALLENGE_TTL)
+        self.store_code = store_code
+        self.member = member
+
+    @metrics.timed("bot_command_seconds", command="암구호_모달")
+    async def on_submit(self, interaction: discord.Interaction):
+        member_cache.remember(interaction.user)
+        store = repo.get(self.store_code)
+        if store is None:
+            await interaction.response.send_message("❌ 매장 정보를 찾을 수 없습니다. 다시 시도해주세요.", ephemeral=True)
+            return
+        await check_passphrase(
+            interaction.user, self.store_code, store, self.passphrase.value,
+            lambda: format_roles(self.member),
+            lambda embed: interaction.response.send_message(embed=embed, ephemeral=True)
+        )
+
+# 대기열을 거친 요청에서 모달을 여는 버튼
+class PassphraseButton(discord.ui.View):
+    def __init__(self, modal):
+        super().__init__(timeout=CHALLENGE_TTL)
+        self.modal = modal
+
+    @discord.ui.button(label="암구호 입력", emoji="🔐", style=discord.ButtonStyle.primary)
+    async def open_modal(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(self.modal)
+
+# 보류(defer)된 요청이면 followup, 아니면 첫 응답으로 전송
+async def reply(interaction, **kwargs):
+    if interaction.response.is_done():
+        await interaction.followup.send(ephemeral=True, **kwargs)
+    else:
+        await interaction.response.send_message(ephemeral=True, **kwargs)
 
 # 3. 입장 인증 (방문자용)
 @bot.tree.command(name="입장", description="매장 입장 인증")
 @app_commands.describe(매장코드="QR 코드의 매장 코드")
+@metrics.timed("bot_command_seconds", command="입장")
 async def verify_entry(interaction: discord.Interaction, 매장코드: str):
-    # 매장 존재 확인
-    if 매장코드 not in stores:
+    # 상호작용에 들어있는 최신 멤버 정보 보관 (lazy 모드에서 fetch_member 대신 사용)
+    member_cache.remember(interaction.user)
+    
+    # 매장 존재 확인 (만료됐지만 아직 정리되지 않은 매장 포함)
+    store = repo.get(매장코드)
+    if store is None or is_expired(store):
         embed = discord.Embed(
             title="❌ 입장 불가",
             description="유효하지 않은 매장 코드입니다.",
@@ -219,91 +584,116 @@ async def verify_entry(interaction: discord.Interaction, 매장코드: str):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    store = stores[매장코드]
+    # 매장 서버를 이 봇(프로세스)이 맡고 있지 않으면 처리 불가 (다른 샤드 프로세스 담당 또는 서버에서 나감)
+    if bot.get_guild(store['guild_id']) is None:
+        embed = discord.Embed(
+            title="❌ 입장 불가",
+            description="매장이 등록된 디스코드 서버에서 다시 시도해주세요.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    # 여유가 있으면 바로 처리, 몰리면 응답을 보류하고 대기열에서 순서대로 처리
+    if admission.try_enter(매장코드, store['guild_id']):
+        try:
+            await process_entry(interaction, 매장코드, store)
+        finally:
+            admission.leave()
+        return
+    
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    if not admission.enqueue(매장코드, store['guild_id'], lambda: process_queued_entry(interaction, 매장코드)):
+        await interaction.followup.send("❌ 지금은 입장 요청이 너무 많습니다. 잠시 후 다시 시도해주세요.", ephemeral=True)
+
+# 대기열에서 꺼낸 요청 처리 (기다리는 동안 매장이 바뀌었을 수 있으므로 다시 조회)
+async def process_queued_entry(interaction, 매장코드):
+    store = repo.get(매장코드)
+    if store is None or is_expired(store):
+        await interaction.followup.send("❌ 대기 중에 매장이 삭제되었습니다.", ephemeral=True)
+        return
+    await process_entry(interaction, 매장코드, store)
+
+# 입장 처리 본체 (바로 처리 / 대기열 처리 공통)
+@metrics.timed("entry_step_seconds", step="process_entry")
+async def process_entry(interaction, 매장코드, store):
     guild = bot.get_guild(store['guild_id'])
     
     # 중복 입장 체크
-    if 'approved_users' not in store:
-        store['approved_users'] = []
-    
-    if interaction.user.id in store['approved_users']:
-        embed = discord.Embed(
+    if repo.is_approved(매장코드, interaction.user.id):
+        embed = store_embeds.get(매장코드, store, "already", lambda: discord.Embed(
             title="✅ 이미 입장 처리가 완료되었습니다",
             description=f"**{store['store_name']}**\n\n이미 입장 승인을 받으셨습니다.",
             color=discord.Color.green()
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        ))
+        await reply(interaction, embed=embed)
+        entry_log.record(매장코드, interaction.user.id, OUTCOME_ALREADY)
         return
     
     # 서버 가입 확인
-    member = guild.get_member(interaction.user.id)
+    member = await member_cache.resolve(guild, interaction.user.id)
     if not member:
-        embed = discord.Embed(
+        embed = store_embeds.get(매장코드, store, "not_member", lambda: discord.Embed(
             title="❌ 입장 불가",
             description=f"**{store['store_name']}**\n\n디스코드 서버에 먼저 가입해주세요.",
             color=discord.Color.red()
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        ))
+        await reply(interaction, embed=embed)
+        entry_log.record(매장코드, interaction.user.id, OUTCOME_DENIED, "not_member")
         
         # 매장주에게 알림
-        try:
-            owner = await bot.fetch_user(store['owner_id'])
-            notify_embed = discord.Embed(
-                title="⚠️ 입장 거부",
-                description=f"**매장**: {store['store_name']}\n**시도자**: {interaction.user.name}",
-                color=discord.Color.orange()
-            )
-            notify_embed.add_field(name="사유", value="서버 미가입")
-            await owner.send(embed=notify_embed)
-        except:
-            pass
+        notifier.notify(store['owner_id'], OwnerEvent(
+            False, store['store_name'], interaction.user.name,
+            [("사유", "서버 미가입")]
+        ))
         
         return
     
-    # 역할 확인
-    if store['min_role_id']:
-        min_role = guild.get_role(store['min_role_id'])
-        has_role = any(role >= min_role for role in member.roles)
-    else:
-        # 최소 역할이 없으면 모두 통과
-        has_role = True
-        min_role = None
+    # 역할 확인 (미리 찾아둔 최소 역할과 멤버 최상위 역할 비교, 최소 역할이 없으면 모두 통과)
+    roles = role_index.resolve(매장코드, store, guild)
+    
+    # 설정된 최소 역할이 삭제됐으면 누구도 통과시키지 않음
+    if roles.min_missing:
+        embed = store_embeds.get(매장코드, store, "min_role_missing", lambda: discord.Embed(
+            title="❌ 입장 불가",
+            description=f"**{store['store_name']}**\n\n매장의 최소 역할 설정에 문제가 있어 지금은 입장할 수 없습니다.\n매장 관리자에게 문의해주세요.",
+            color=discord.Color.red()
+        ))
+        await reply(interaction, embed=embed)
+        entry_log.record(매장코드, interaction.user.id, OUTCOME_DENIED, "role")
+        
+        # 매장주에게 알림
+        notifier.notify(store['owner_id'], OwnerEvent(
+            False, store['store_name'], interaction.user.name,
+            [("거부 사유", "최소 역할을 찾을 수 없음 (삭제됨)"), ("조치", "/매장수정 으로 최소 역할을 다시 설정해주세요")]
+        ))
+        
+        return
     
-    # 사용자 역할 목록
-    user_roles = [role.name for role in member.roles if role.name != "@everyone"]
+    has_role = roles.eligible(member)
     
     # 역할 미달이면 무조건 거부 (최소 역할이 설정된 경우만)
-    if store['min_role_id'] and not has_role:
-        embed = discord.Embed(
+    if not has_role:
+        user_roles = format_roles(member) or "없음"
+        embed = store_embeds.get(매장코드, store, "denied_role", lambda: discord.Embed(
             title="❌ 입장 거부",
             description=f"**{store['store_name']}**\n\n입장이 거부되었습니다.",
             color=discord.Color.red()
-        )
-        embed.add_field(name="거부 사유", value="역할 미달", inline=False)
-        embed.add_field(name="필요 조건", value=f"{min_role.name} 이상 역할 필수", inline=False)
-        if user_roles:
-            embed.add_field(name="현재 보유 역할", value=", ".join(user_roles), inline=False)
-        else:
-            embed.add_field(name="현재 보유 역할", value="없음", inline=False)
+        ).add_field(
+            name="거부 사유", value="역할 미달", inline=False
+        ).add_field(
+            name="필요 조건", value=f"{roles.min_role.name} 이상 역할 필수", inline=False
+        ))
+        embed.add_field(name="현재 보유 역할", value=user_roles, inline=False)
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await reply(interaction, embed=embed)
+        entry_log.record(매장코드, interaction.user.id, OUTCOME_DENIED, "role")
         
         # 매장주에게 알림
-        try:
-            owner = await bot.fetch_user(store['owner_id'])
-            notify_embed = discord.Embed(
-                title="⚠️ 입장 거부",
-                description=f"**매장**: {store['store_name']}\n**시도자**: {interaction.user.name}",
-                color=discord.Color.orange()
-            )
-            notify_embed.add_field(name="거부 사유", value="역할 미달", inline=False)
-            if user_roles:
-                notify_embed.add_field(name="보유 역할", value=", ".join(user_roles), inline=False)
-            else:
-                notify_embed.add_field(name="보유 역할", value="없음", inline=False)
-            await owner.send(embed=notify_embed)
-        except:
-            pass
+        notifier.notify(store['owner_id'], OwnerEvent(
+            False, store['store_name'], interaction.user.name,
+            [("거부 사유", "역할 미달"), ("보유 역할", user_roles)]
+        ))
         
         return
     
@@ -311,75 +701,91 @@ async def verify_entry(interaction: discord.Interaction, 매장코드: str):
     # 암구호 없으면 바로 승인
     if not store['passphrase']:
         # ✅ 바로 승인
-        role_granted = False
-        if store['grant_role_id']:
-            grant_role = guild.get_role(store['grant_role_id'])
-            if grant_role and grant_role not in member.roles:
-                try:
-                    await member.add_roles(grant_role)
-                    role_granted = True
-                except:
-                    pass
+        role_pending = False
+        grant_role = roles.grant_role
+        if grant_role and member.get_role(grant_role.id) is None:
+            # 역할 부여는 길드별 큐에서 처리 (응답은 바로 보냄)
+            role_grants.submit(
+                guild.id, interaction.user.id, grant_role.id,
+                매장코드, store['store_name'], store['owner_id'], interaction.user.name
+            )
+            role_pending = True
         
-        embed = discord.Embed(
-            title="✅ 입장 승인",
-            description=f"**{store['store_name']}**\n\n입장이 승인되었습니다!",
-            color=discord.Color.green()
-        )
-        embed.add_field(name="승인 사유", value="역할 조건 충족", inline=False)
-        if role_granted:
-            embed.add_field(name="역할 부여", value=f"{grant_role.mention} 역할이 부여되었습니다", inline=False)
+        def build_approved():
+            embed = discord.Embed(
+                title="✅ 입장 승인",
+                description=f"**{store['store_name']}**\n\n입장이 승인되었습니다!",
+                color=discord.Color.green()
+            )
+            embed.add_field(name="승인 사유", value="역할 조건 충족", inline=False)
+            if role_pending:
+                embed.add_field(name="역할 부여", value=f"{grant_role.mention} 역할 부여 대기 중 (잠시 후 자동 부여됩니다)", inline=False)
+            return embed
+        embed = store_embeds.get(매장코드, store, "approved_role_pending" if role_pending else "approved_role", build_approved)
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await reply(interaction, embed=embed)
         
         # 승인된 사용자 목록에 추가
-        if 'approved_users' not in store:
-            store['approved_users'] = []
-        store['approved_users'].append(interaction.user.id)
-        save_stores(stores)
+        repo.approve(매장코드, interaction.user.id)
+        entry_log.record(매장코드, interaction.user.id, OUTCOME_APPROVED, "role")
         
         # 매장주에게 알림
-        try:
-            owner = await bot.fetch_user(store['owner_id'])
-            notify_embed = discord.Embed(
-                title="✅ 입장 승인",
-                description=f"**매장**: {store['store_name']}\n**방문자**: {interaction.user.name}",
-                color=discord.Color.green()
-            )
-            notify_embed.add_field(name="승인 경로", value="역할 조건 충족 (암구호 없음)", inline=False)
-            if user_roles:
-                notify_embed.add_field(name="보유 역할", value=", ".join(user_roles), inline=False)
-            if role_granted:
-                notify_embed.add_field(name="역할 부여", value=f"{grant_role.name} 부여됨", inline=False)
-            await owner.send(embed=notify_embed)
-        except:
-            pass
+        notify_fields = [("승인 경로", "역할 조건 충족 (암구호 없음)"), ("보유 역할", lambda: format_roles(member))]
+        if role_pending:
+            notify_fields.append(("역할 부여", f"{grant_role.name} 부여 대기 중"))
+        notifier.notify(store['owner_id'], OwnerEvent(
+            True, store['store_name'], interaction.user.name, notify_fields
+        ))
         
         return
     
-    # 역할 있고 + 암구호 설정됨 → DM으로 암구호 요청
+    # 역할 있고 + 암구호 설정됨
+    if PASSPHRASE_MODE == "modal":
+        # 모달로 바로 암구호 입력 (DM 왕복 없음)
+        modal = PassphraseModal(매장코드, store['store_name'], member)
+        if not interaction.response.is_done():
+            await interaction.response.send_modal(modal)
+        else:
+            # 대기열을 거쳐 응답이 보류된 경우 모달을 바로 띄울 수 없으므로 버튼으로 연결
+            embed = store_embeds.get(매장코드, store, "passphrase_button", lambda: discord.Embed(
+                title="🔐 암구호 입력 필요",
+                description=f"**{store['store_name']}**\n\n아래 버튼을 눌러 암구호를 입력해주세요.",
+                color=discord.Color.blue()
+            ))
+            await reply(interaction, embed=embed, view=PassphraseButton(modal))
+        return
+    
+    # DM으로 암구호 요청
     # 대기 상태 저장
-    passphrase_waiting[interaction.user.id] = {
-        'store_code': 매장코드,
-        'has_role': has_role,
-        'user_roles': user_roles
-    }
+    user_roles = [role.name for role in member.roles if not role.is_default()]
+    challenges.add(interaction.user.id, 매장코드, has_role, user_roles)
+    pending_count = len(challenges.for_user(interaction.user.id))
     
     # 서버 채널에 응답
-    embed = discord.Embed(
+    embed = store_embeds.get(매장코드, store, "dm_requested", lambda: discord.Embed(
         title="🔐 암구호 입력 필요",
         description=f"**{store['store_name']}**\n\nDM으로 암구호 입력 요청을 보냈습니다.\nDM을 확인해주세요.",
         color=discord.Color.blue()
-    )
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    ))
+    await reply(interaction, embed=embed)
     
     # DM 전송
     try:
-        dm_embed = discord.Embed(
-            title=f"🔐 {store['store_name']} - 암구호 입력",
-            description="역할 조건을 충족했습니다.\n\n마지막으로 암구호를 입력해주세요.\n암구호를 일반 메시지로 보내주시면 됩니다.",
-            color=discord.Color.blue()
-        )
+        def build_prompt():
+            dm_embed = discord.Embed(
+                title=f"🔐 {store['store_name']} - 암구호 입력",
+                description="역할 조건을 충족했습니다.\n\n마지막으로 암구호를 입력해주세요.\n암구호를 일반 메시지로 보내주시면 됩니다.",
+                color=discord.Color.blue()
+            )
+            dm_embed.add_field(name="입력 제한 시간", value=f"{int(CHALLENGE_TTL // 60)}분", inline=False)
+            if pending_count > 1:
+                dm_embed.add_field(
+                    name="여러 매장 대기 중",
+                    value=f"`{매장코드} 암구호` 처럼 매장 코드를 앞에 붙여 보내주세요.",
+                    inline=False
+                )
+            return dm_embed
+        dm_embed = store_embeds.get(매장코드, store, "dm_prompt_multi" if pending_count > 1 else "dm_prompt", build_prompt)
         
         await interaction.user.send(embed=dm_embed)
     except discord.Forbidden:
@@ -389,11 +795,12 @@ async def verify_entry(interaction: discord.Interaction, 매장코드: str):
             description="DM이 차단되어 있습니다.\n디스코드 설정에서 DM을 허용해주세요.",
             color=discord.Color.red()
         )
-        await interaction.followup.send(embed=error_embed, ephemeral=True)
-        del passphrase_waiting[interaction.user.id]
+        await reply(interaction, embed=error_embed)
+        challenges.remove(interaction.user.id, 매장코드)
 
 # DM 메시지 처리
 @bot.event
+@metrics.timed("bot_command_seconds", command="dm_message")
 async def on_message(message):
     # 봇 자신의 메시지 무시
     if message.author.bot:
@@ -404,107 +811,154 @@ async def on_message(message):
         return
     
     # 암구호 대기 중인 사용자인지 확인
-    if message.author.id not in passphrase_waiting:
+    pending = challenges.for_user(message.author.id)
+    if not pending:
         return
     
-    waiting_data = passphrase_waiting[message.author.id]
-    store_code = waiting_data['store_code']
-    has_role = waiting_data['has_role']
-    user_roles = waiting_data['user_roles']
+    if len(pending) == 1:
+        challenge = pending[0]
+        passphrase = message.content
+    else:
+        # 여러 매장 대기 중이면 "매장코드 암구호" 형식
+        code, _, passphrase = message.content.strip().partition(" ")
+        challenge = challenges.get(message.author.id, code)
+        if challenge is None:
+            codes = ", ".join(f"`{c.store_code}`" for c in pending)
+            await message.reply(
+                f"❌ 여러 매장의 암구호를 기다리는 중입니다 ({codes}).\n"
+                f"`매장코드 암구호` 형식으로 보내주세요."
+            )
+            return
+    
+    store_code = challenge.store_code
+    has_role = challenge.has_role
+    user_roles = challenge.user_roles
     
     # 매장 정보 가져오기
-    if store_code not in stores:
+    store = repo.get(store_code)
+    if store is None:
         await message.reply("❌ 매장 정보를 찾을 수 없습니다. 다시 시도해주세요.")
-        del passphrase_waiting[message.author.id]
+        challenges.remove(message.author.id, store_code)
         return
     
-    store = stores[store_code]
+    # DM 은 샤드 0 으로만 들어오므로, 매장 서버를 다른 프로세스가 맡고 있으면 그쪽에서 확인
+    if shard_mailbox is not None and bot.get_guild(store['guild_id']) is None:
+        challenges.remove(message.author.id, store_code)
+        shard_mailbox.post(shard_of(store['guild_id'], SHARD_COUNT), "passphrase", {
+            "user_id": message.author.id,
+            "store_code": store_code,
+            "passphrase": passphrase,
+            "user_roles": user_roles,
+            "channel_id": message.channel.id,
+            "message_id": message.id
+        })
+        return
+    
+    await check_passphrase(
+        message.author, store_code, store, passphrase,
+        lambda: ", ".join(user_roles) or None,
+        lambda embed: message.reply(embed=embed)
+    )
+    
+    # 대기 상태 제거
+    challenges.remove(message.author.id, store_code)
+
+# 다른 샤드 프로세스에서 전달받은 메시지 처리
+async def on_shard_message(kind, payload):
+    if kind == "forget_store":
+        forget_store_state(payload['store_code'], payload['guild_id'])
+        return
+    if kind != "passphrase":
+        print(f"[ERROR] 알 수 없는 샤드 메시지: {kind}")
+        return
+    # 원래 DM 에 답장 (DM 채널은 어느 샤드에서든 REST 로 보낼 수 있음)
+    dm = bot.get_partial_messageable(payload['channel_id']).get_partial_message(payload['message_id'])
+    store = repo.get(payload['store_code'])
+    if store is None:
+        await dm.reply("❌ 매장 정보를 찾을 수 없습니다. 다시 시도해주세요.")
+        return
+    user = bot.get_user(payload['user_id']) or await bot.fetch_user(payload['user_id'])
+    await check_passphrase(
+        user, payload['store_code'], store, payload['passphrase'],
+        lambda: ", ".join(payload['user_roles']) or None,
+        lambda embed: dm.reply(embed=embed)
+    )
+
+# 암구호 확인 후 승인/거부 처리 (DM 답장, 모달 제출 공통)
+@metrics.timed("entry_step_seconds", step="check_passphrase")
+async def check_passphrase(user, store_code, store, passphrase, roles_text, respond):
     guild = bot.get_guild(store['guild_id'])
-    member = guild.get_member(message.author.id)
+    member = await member_cache.resolve(guild, user.id)
     
     # 암구호 확인 (역할 있는 경우만 이 단계까지 옴)
-    passphrase_correct = (message.content == store['passphrase'])
+    passphrase_correct = (passphrase == store['passphrase'])
     
     if passphrase_correct:
         # ✅ 승인 (역할 있고 암구호 일치)
         # 부여 역할 처리
-        role_granted = False
-        if store['grant_role_id']:
-            grant_role = guild.get_role(store['grant_role_id'])
-            if grant_role and grant_role not in member.roles:
-                try:
-                    await member.add_roles(grant_role)
-                    role_granted = True
-                except:
-                    pass
+        role_pending = False
+        grant_role = role_index.resolve(store_code, store, guild).grant_role
+        # 그 사이 서버를 나갔으면 역할 부여는 건너뜀
+        if grant_role and member is not None and member.get_role(grant_role.id) is None:
+            role_grants.submit(
+                guild.id, user.id, grant_role.id,
+                store_code, store['store_name'], store['owner_id'], user.name
+            )
+            role_pending = True
         
         # 방문자에게 메시지
-        embed = discord.Embed(
-            title="✅ 입장 승인",
-            description=f"**{store['store_name']}**\n\n입장이 승인되었습니다!",
-            color=discord.Color.green()
+        def build_approved():
+            embed = discord.Embed(
+                title="✅ 입장 승인",
+                description=f"**{store['store_name']}**\n\n입장이 승인되었습니다!",
+                color=discord.Color.green()
+            )
+            embed.add_field(name="승인 사유", value="역할 조건 충족 & 암구호 정답", inline=False)
+            if role_pending:
+                embed.add_field(name="역할 부여", value=f"{grant_role.name} 역할 부여 대기 중 (잠시 후 자동 부여됩니다)", inline=False)
+            return embed
+        embed = store_embeds.get(
+            store_code, store, "approved_passphrase_pending" if role_pending else "approved_passphrase", build_approved
         )
-        embed.add_field(name="승인 사유", value="역할 조건 충족 & 암구호 정답", inline=False)
-        if role_granted:
-            embed.add_field(name="역할 부여", value=f"{grant_role.name} 역할이 부여되었습니다", inline=False)
         
-        await message.reply(embed=embed)
+        await respond(embed)
         
         # 승인된 사용자 목록에 추가
-        if 'approved_users' not in store:
-            store['approved_users'] = []
-        store['approved_users'].append(message.author.id)
-        save_stores(stores)
+        repo.approve(store_code, user.id)
+        entry_log.record(store_code, user.id, OUTCOME_APPROVED, "passphrase")
         
         # 매장주에게 알림
-        try:
-            owner = await bot.fetch_user(store['owner_id'])
-            notify_embed = discord.Embed(
-                title="✅ 입장 승인",
-                description=f"**매장**: {store['store_name']}\n**방문자**: {message.author.name}",
-                color=discord.Color.green()
-            )
-            notify_embed.add_field(name="승인 경로", value="역할 조건 충족 & 암구호 정답", inline=False)
-            if user_roles:
-                notify_embed.add_field(name="보유 역할", value=", ".join(user_roles), inline=False)
-            if role_granted:
-                notify_embed.add_field(name="역할 부여", value=f"{grant_role.name} 부여됨", inline=False)
-            await owner.send(embed=notify_embed)
-        except:
-            pass
+        notify_fields = [("승인 경로", "역할 조건 충족 & 암구호 정답"), ("보유 역할", roles_text)]
+        if role_pending:
+            notify_fields.append(("역할 부여", f"{grant_role.name} 부여 대기 중"))
+        notifier.notify(store['owner_id'], OwnerEvent(
+            True, store['store_name'], user.name, notify_fields
+        ))
         
     else:
         # ❌ 거부 (역할 있지만 암구호 불일치)
-        embed = discord.Embed(
+        embed = store_embeds.get(store_code, store, "denied_passphrase", lambda: discord.Embed(
             title="❌ 입장 거부",
             description=f"**{store['store_name']}**\n\n입장이 거부되었습니다.",
             color=discord.Color.red()
-        )
-        embed.add_field(name="거부 사유", value="암구호 불일치", inline=False)
-        embed.add_field(name="참고", value="역할 조건은 충족했으나 암구호가 일치하지 않습니다.", inline=False)
+        ).add_field(
+            name="거부 사유", value="암구호 불일치", inline=False
+        ).add_field(
+            name="참고", value="역할 조건은 충족했으나 암구호가 일치하지 않습니다.", inline=False
+        ))
         
-        await message.reply(embed=embed)
+        await respond(embed)
+        entry_log.record(store_code, user.id, OUTCOME_DENIED, "passphrase")
         
         # 매장주에게 알림
-        try:
-            owner = await bot.fetch_user(store['owner_id'])
-            notify_embed = discord.Embed(
-                title="⚠️ 입장 거부",
-                description=f"**매장**: {store['store_name']}\n**시도자**: {message.author.name}",
-                color=discord.Color.orange()
-            )
-            notify_embed.add_field(name="거부 사유", value="암구호 불일치", inline=False)
-            if user_roles:
-                notify_embed.add_field(name="보유 역할", value=", ".join(user_roles), inline=False)
-            await owner.send(embed=notify_embed)
-        except:
-            pass
-    
-    # 대기 상태 제거
-    del passphrase_waiting[message.author.id]
+        notify_fields = [("거부 사유", "암구호 불일치"), ("보유 역할", roles_text)]
+        notifier.notify(store['owner_id'], OwnerEvent(
+            False, store['store_name'], user.name, notify_fields
+        ))
 
 # 4. 매장 목록
 @bot.tree.command(name="매장목록", description="내가 생성한 매장 목록 보기")
+@metrics.timed("bot_command_seconds", command="매장목록")
 async def list_stores(interaction: discord.Interaction):
     # 권한 확인
     if not has_allowed_role(interaction):
@@ -513,7 +967,7 @@ async def list_stores(interaction: discord.Interaction):
             ephemeral=True
         )
         return
-    my_stores = {k: v for k, v in stores.items() if v['owner_id'] == interaction.user.id}
+    my_stores = repo.list_by_owner(interaction.user.id)
     
     if not my_stores:
         await interaction.response.send_message("생성한 매장이 없습니다.", ephemeral=True)
@@ -524,20 +978,25 @@ async def list_stores(interaction: discord.Interaction):
         color=discord.Color.blue()
     )
     
-    for code, store in my_stores.items():
-        guild = bot.get_guild(store['guild_id'])
-        min_role = guild.get_role(store['min_role_id']) if guild and store['min_role_id'] else None
-        grant_role = guild.get_role(store['grant_role_id']) if guild and store['grant_role_id'] else None
+    for code, store in my_stores:
+        roles = role_index.resolve(code, store)
+        min_role = roles.min_role
+        grant_role = roles.grant_role
         
         value_text = f"**코드**: `{code}`\n"
         if min_role:
             value_text += f"**최소역할**: {min_role.name}\n"
+        elif roles.min_missing:
+            value_text += f"**최소역할**: ⚠️ 삭제됨 (입장 불가 - /매장수정 으로 다시 설정)\n"
         else:
             value_text += f"**최소역할**: 없음 (모두 입장 가능)\n"
         if grant_role:
             value_text += f"**부여역할**: {grant_role.name}\n"
         if store['passphrase']:
             value_text += f"**암구호**: 설정됨\n"
+        expiry = format_expiry(store)
+        if expiry:
+            value_text += f"**만료**: {expiry}\n"
         
         embed.add_field(
             name=f"🏪 {store['store_name']}",
@@ -547,9 +1006,110 @@ async def list_stores(interaction: discord.Interaction):
     
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
-# 5. 매장 삭제
+# 5. 매장 QR 보기
+@bot.tree.command(name="매장qr", description="매장 입장 QR 코드 보기")
+@app_commands.describe(매장코드="QR 코드를 볼 매장의 코드")
+@metrics.timed("bot_command_seconds", command="매장qr")
+async def show_store_qr(interaction: discord.Interaction, 매장코드: str):
+    # 권한 확인
+    if not has_allowed_role(interaction):
+        await interaction.response.send_message(
+            "❌ 권한이 없습니다.\n**허용된 역할:** Helper, 비트코인 기업, 비트코인 경제매장",
+            ephemeral=True
+        )
+        return
+    store = repo.get(매장코드)
+    if store is None:
+        await interaction.response.send_message("❌ 존재하지 않는 매장 코드입니다.", ephemeral=True)
+        return
+    
+    if store['owner_id'] != interaction.user.id:
+        await interaction.response.send_message("❌ 본인이 생성한 매장의 QR 코드만 볼 수 있습니다.", ephemeral=True)
+        return
+    
+    # QR 생성이 3초 응답 제한을 넘을 수 있으므로 먼저 응답 보류
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    file = await qr_file(매장코드)
+    if file is None:
+        await interaction.followup.send(
+            f"❌ QR 코드를 만들 수 없습니다. 매장 코드 `{매장코드}`를 직접 안내해주세요.", ephemeral=True
+        )
+        return
+    
+    embed = discord.Embed(
+        title=f"🏪 {store['store_name']} - 입장 QR",
+        description=f"방문자는 QR을 스캔하거나 `/입장 {매장코드}` 명령어를 사용하세요.",
+        color=discord.Color.blue()
+    )
+    embed.set_image(url=f"attachment://{file.filename}")
+    await interaction.followup.send(embed=embed, file=file, ephemeral=True)
+
+# 6. 매장 통계
+@bot.tree.command(name="매장통계", description="매장 입장 통계 보기")
+@app_commands.describe(매장코드="통계를 볼 매장의 코드", 기간="집계 기간 (기본: 최근 24시간)")
+@app_commands.choices(기간=[
+    app_commands.Choice(name="최근 1시간", value=1),
+    app_commands.Choice(name="최근 24시간", value=24),
+    app_commands.Choice(name="최근 7일", value=24 * 7),
+    app_commands.Choice(name="최근 30일", value=24 * 30),
+])
+@metrics.timed("bot_command_seconds", command="매장통계")
+async def store_stats(interaction: discord.Interaction, 매장코드: str, 기간: app_commands.Choice[int] = None):
+    # 권한 확인
+    if not has_allowed_role(interaction):
+        await interaction.response.send_message(
+            "❌ 권한이 없습니다.\n**허용된 역할:** Helper, 비트코인 기업, 비트코인 경제매장",
+            ephemeral=True
+        )
+        return
+    store = repo.get(매장코드)
+    if store is None:
+        await interaction.response.send_message("❌ 존재하지 않는 매장 코드입니다.", ephemeral=True)
+        return
+    
+    if store['owner_id'] != interaction.user.id:
+        await interaction.response.send_message("❌ 본인이 생성한 매장의 통계만 볼 수 있습니다.", ephemeral=True)
+        return
+    
+    hours = 기간.value if 기간 else 24
+    label = 기간.name if 기간 else "최근 24시간"
+    stats = entry_log.summary(매장코드, hours)
+    counts = stats['counts']
+    total = stats['total']
+    
+    embed = discord.Embed(
+        title=f"📊 {store['store_name']} - 입장 통계",
+        description=f"**기간**: {label}\n**코드**: `{매장코드}`",
+        color=discord.Color.blue()
+    )
+    if total == 0:
+        embed.add_field(name="입장 시도", value="기록이 없습니다.", inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    denied = counts['not_member'] + counts['role'] + counts['passphrase']
+    embed.add_field(name="입장 시도", value=f"{total}건 (시간당 평균 {total / hours:.1f}건)", inline=False)
+    embed.add_field(name="✅ 승인", value=f"{counts['approved']}건 ({counts['approved'] / total:.0%})", inline=True)
+    embed.add_field(name="❌ 거부", value=f"{denied}건 ({denied / total:.0%})", inline=True)
+    embed.add_field(name="🔁 재시도", value=f"{counts['already']}건 (이미 승인됨)", inline=True)
+    if denied:
+        embed.add_field(
+            name="거부 사유",
+            value=f"서버 미가입 {counts['not_member']}건\n역할 미달 {counts['role']}건\n암구호 불일치 {counts['passphrase']}건",
+            inline=False
+        )
+    peak_start, peak_count = stats['peak']
+    unit = "분" if stats['bucket_seconds'] == 60 else "시간"
+    embed.add_field(name=f"가장 붐빈 {unit}", value=f"<t:{peak_start}:f> ({peak_count}건)", inline=False)
+    if stats['busiest_hour'] is not None:
+        embed.add_field(name="가장 붐비는 시간대", value=f"{stats['busiest_hour']}시 (서버 시간 기준)", inline=False)
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# 7. 매장 삭제
 @bot.tree.command(name="매장삭제", description="매장 QR 삭제")
 @app_commands.describe(매장코드="삭제할 매장의 코드")
+@metrics.timed("bot_command_seconds", command="매장삭제")
 async def delete_store(interaction: discord.Interaction, 매장코드: str):
     # 권한 확인
     if not has_allowed_role(interaction):
@@ -558,24 +1118,20 @@ async def delete_store(interaction: discord.Interaction, 매장코드: str):
             ephemeral=True
         )
         return
-    if 매장코드 not in stores:
+    store = repo.get(매장코드)
+    if store is None:
         await interaction.response.send_message("❌ 존재하지 않는 매장 코드입니다.", ephemeral=True)
         return
     
-    if stores[매장코드]['owner_id'] != interaction.user.id:
+    if store['owner_id'] != interaction.user.id:
         await interaction.response.send_message("❌ 본인이 생성한 매장만 삭제할 수 있습니다.", ephemeral=True)
         return
     
-    store_name = stores[매장코드]['store_name']
-    
-    # QR 이미지 삭제
-    qr_path = os.path.join(QR_DIR, f"store_{매장코드}.png")
-    if os.path.exists(qr_path):
-        os.remove(qr_path)
+    store_name = store['store_name']
     
     # 데이터 삭제
-    del stores[매장코드]
-    save_stores(stores)
+    repo.delete(매장코드)
+    forget_store(매장코드, store)
     
     await interaction.response.send_message(f"✅ '{store_name}' 매장이 삭제되었습니다.", ephemeral=True)
 
@@ -592,3 +1148,4 @@ if __name__ == "__main__":
         sys.exit(1)
     
     bot.run(TOKEN)
+    repo.close()
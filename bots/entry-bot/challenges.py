@@ -0,0 +1,304 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+from journal import write_atomic
+from persistence import WriteBehindWriter
+
+
+class TimingWheel:
+    """해시 타이밍 휠
+
+    만료 시각을 tick 단위로 잘라 slots 개의 슬롯 중 하나에 넣어 두고, 매 tick 마다
+    현재 슬롯만 확인한다. 한 바퀴보다 먼 만료는 다음 바퀴에 다시 확인된다.
+    """
+
+    def __init__(self, tick=1.0, slots=512):
+        self.tick = tick
+        self.slots = [{} for _ in range(slots)]  # 슬롯별 key → (만료 시각, 항목)
+        self.current = None  # 마지막으로 처리한 tick 번호
+
+    def _tick_of(self, when):
+        return int(when // self.tick)
+
+    def schedule(self, key, item, expires_at):
+        """항목 등록 후 슬롯 번호 반환 (cancel 에 사용)"""
+        # 만료 시각 이후 첫 tick 에 넣어야 그 tick 을 처리할 때 이미 만료된 상태임
+        # (만료 시각이 속한 tick 에 넣으면 tick 중간에 만료되는 항목을 한 바퀴 늦게 정리)
+        tick = -int(-expires_at // self.tick)
+        # 이미 지나간 tick 이면 다음 처리 대상 슬롯에 넣음
+        if self.current is not None and tick <= self.current:
+            tick = self.current + 1
+        slot = tick % len(self.slots)
+        self.slots[slot][key] = (expires_at, item)
+        return slot
+
+    def cancel(self, key, slot):
+        self.slots[slot].pop(key, None)
+
+    def advance(self, now):
+        """now 까지 지난 슬롯을 돌며 만료된 항목 반환"""
+        target = self._tick_of(now)
+        if self.current is None:
+            # 처음에는 이전에 등록된 항목이 어느 슬롯에 있을지 모르므로 전체 확인
+            self.current = target - len(self.slots)
+        expired = []
+        # 오래 멈춰 있었더라도 슬롯 수만큼만 돌면 전부 확인됨
+        start = max(self.current + 1, target - len(self.slots) + 1)
+        for tick in range(start, target + 1):
+            slot = self.slots[tick % len(self.slots)]
+            for key, (expires_at, item) in list(slot.items()):
+                if expires_at <= now:
+                    del slot[key]
+                    expired.append(item)
+        self.current = target
+        return expired
+
+
+class Challenge:
+    """암구호 입력 대기 1건"""
+
+    __slots__ = ("user_id", "store_code", "has_role", "user_roles", "expires_at", "slot")
+
+    def __init__(self, user_id, store_code, has_role, user_roles, expires_at):
+        self.user_id = user_id
+        self.store_code = store_code
+        self.has_role = has_role
+        self.user_roles = user_roles
+        self.expires_at = expires_at
+        self.slot = None  # 타이밍 휠 슬롯 번호
+
+    def key(self):
+        return (self.user_id, self.store_code)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name != "slot"}
+
+
+class ChallengeStore:
+    """암구호 대기 상태 저장소
+
+    (사용자, 매장코드) 별로 대기 상태를 두어 한 사용자가 여러 매장을 동시에 진행할 수 있다.
+    각 항목은 ttl 초 뒤 타이밍 휠로 만료되고, max_entries 를 넘으면 가장 오래된 것부터 버린다.
+    path 가 주어지면 파일에 저장해서 재시작 후에도 대기 상태를 유지한다.
+    """
+
+    def __init__(self, ttl=600.0, max_entries=10000, tick=1.0, path=None, save_delay=1.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.save_delay = save_delay
+        self.entries = OrderedDict()  # (user_id, 매장코드) → Challenge (생성 순)
+        self.by_user = {}             # user_id → {매장코드}
+        self.wheel = TimingWheel(tick=tick)
+        self.writer = None
+        self._task = None
+        if path:
+            self._load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+        except Exception as e:
+            print(f"[ERROR] 암구호 대기 상태 로드 실패: {e}")
+            return
+        now = time.time()
+        for item in items:
+            if item['expires_at'] > now:
+                self._put(Challenge(**item))
+
+    def _collect(self):
+        items = [challenge.to_dict() for challenge in self.entries.values()]
+
+        def job():
+            write_atomic(self.path, json.dumps(items, ensure_ascii=False).encode('utf-8'))
+        return job
+
+    def _changed(self):
+        if self.writer is not None:
+            self.writer.mark_dirty()
+
+    def _put(self, challenge):
+        key = challenge.key()
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.wheel.cancel(key, previous.slot)
+        self.entries[key] = challenge
+        self.by_user.setdefault(challenge.user_id, set()).add(challenge.store_code)
+        challenge.slot = self.wheel.schedule(key, challenge, challenge.expires_at)
+        while len(self.entries) > self.max_entries:
+            _, oldest = self.entries.popitem(last=False)
+            self._unlink(oldest)
+
+    def _unlink(self, challenge):
+        """보조 인덱스와 타이밍 휠에서 제거 (entries 에서는 이미 빠진 상태)"""
+        self.wheel.cancel(challenge.key(), challenge.slot)
+        codes = self.by_user.get(challenge.user_id)
+        if codes is not None:
+            codes.discard(challenge.store_code)
+            if not codes:
+                del self.by_user[challenge.user_id]
+
+    def add(self, user_id, store_code, has_role, user_roles):
+        """대기 상태 등록 (같은 사용자/매장이면 새로 덮어씀)"""
+        challenge = Challenge(user_id, store_code, has_role, user_roles, time.time() + self.ttl)
+        self._put(challenge)
+        self._changed()
+        return challenge
+
+    def get(self, user_id, store_code):
+        challenge = self.entries.get((user_id, store_code))
+        if challenge is not None and challenge.expires_at <= time.time():
+            return None
+        return challenge
+
+    def for_user(self, user_id):
+        """사용자의 유효한 대기 상태 목록"""
+        codes = self.by_user.get(user_id, ())
+        challenges = [self.get(user_id, code) for code in sorted(codes)]
+        return [challenge for challenge in challenges if challenge is not None]
+
+    def remove(self, user_id, store_code):
+        challenge = self.entries.pop((user_id, store_code), None)
+        if challenge is not None:
+            self._unlink(challenge)
+            self._changed()
+
+    def expire(self, now=None):
+        """타이밍 휠에서 만료된 항목 제거, 제거된 수 반환"""
+        removed = 0
+        for challenge in self.wheel.advance(time.time() if now is None else now):
+            if self.entries.get(challenge.key()) is challenge:
+                del self.entries[challenge.key()]
+                self._unlink(challenge)
+                removed += 1
+        if removed:
+            self._changed()
+        return removed
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            self.expire()
+
+    def start(self):
+        """이벤트 루프 시작 후 호출 - 만료 처리/저장 작업 시작"""
+        if self.path:
+            self.writer = WriteBehindWriter(self._collect, self.save_delay)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self.writer is not None:
+            self.writer.mark_dirty()
+            await self.writer.close()
+
+
+CHALLENGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS challenges (
+    user_id INTEGER NOT NULL,
+    store_code TEXT NOT NULL,
+    has_role INTEGER NOT NULL,
+    user_roles TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (user_id, store_code)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_challenges_expires ON challenges(expires_at);
+"""
+
+
+class SqliteChallengeStore:
+    """여러 프로세스가 함께 쓰는 암구호 대기 상태 (SQLite WAL)
+
+    샤드를 여러 프로세스로 나눠 실행할 때 ChallengeStore 대신 사용한다. /입장 을 처리한
+    프로세스와 DM 을 받는 프로세스(샤드 0)가 달라도 같은 대기 상태를 본다.
+    조회할 때 expires_at 으로 만료를 거르고, tick 마다 만료된 행과 max_entries 를 넘는 행을 지운다.
+    """
+
+    def __init__(self, db_path, ttl=600.0, max_entries=10000, tick=5.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.tick = tick
+        self.conn = sqlite3.connect(db_path, isolation_level=None, timeout=5.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(CHALLENGE_SCHEMA)
+        self._task = None
+
+    def __len__(self):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM challenges WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+    @staticmethod
+    def _challenge(row):
+        user_id, store_code, has_role, user_roles, expires_at = row
+        return Challenge(user_id, store_code, bool(has_role), json.loads(user_roles), expires_at)
+
+    def add(self, user_id, store_code, has_role, user_roles):
+        """대기 상태 등록 (같은 사용자/매장이면 새로 덮어씀)"""
+        challenge = Challenge(user_id, store_code, has_role, user_roles, time.time() + self.ttl)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO challenges (user_id, store_code, has_role, user_roles, expires_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (user_id, store_code, int(has_role), json.dumps(user_roles, ensure_ascii=False), challenge.expires_at),
+        )
+        return challenge
+
+    def get(self, user_id, store_code):
+        row = self.conn.execute(
+            "SELECT * FROM challenges WHERE user_id = ? AND store_code = ? AND expires_at > ?",
+            (user_id, store_code, time.time()),
+        ).fetchone()
+        return self._challenge(row) if row else None
+
+    def for_user(self, user_id):
+        """사용자의 유효한 대기 상태 목록"""
+        rows = self.conn.execute(
+            "SELECT * FROM challenges WHERE user_id = ? AND expires_at > ? ORDER BY store_code",
+            (user_id, time.time()),
+        )
+        return [self._challenge(row) for row in rows]
+
+    def remove(self, user_id, store_code):
+        self.conn.execute("DELETE FROM challenges WHERE user_id = ? AND store_code = ?", (user_id, store_code))
+
+    def expire(self, now=None):
+        """만료된 항목과 최대 건수를 넘는 오래된 항목 제거, 제거된 수 반환"""
+        now = time.time() if now is None else now
+        removed = self.conn.execute("DELETE FROM challenges WHERE expires_at <= ?", (now,)).rowcount
+        excess = self.conn.execute("SELECT COUNT(*) FROM challenges").fetchone()[0] - self.max_entries
+        if excess > 0:
+            removed += self.conn.execute(
+                "DELETE FROM challenges WHERE (user_id, store_code) IN "
+                "(SELECT user_id, store_code FROM challenges ORDER BY expires_at LIMIT ?)",
+                (excess,),
+            ).rowcount
+        return removed
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                self.expire()
+            except sqlite3.Error as e:
+                print(f"[ERROR] 암구호 대기 상태 정리 실패: {e}")
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.conn.close()
@@ -0,0 +1,35 @@
+import copy
+
+import discord
+
+
+class EmbedTemplates:
+    """매장별 응답 embed 템플릿 캐시
+
+    매장 이름, 역할 이름처럼 매장마다 정해진 부분은 (매장코드, 종류) 별로 한 번만 만들어
+    payload(dict) 로 보관하고, 응답할 때는 payload 깊은 복사본으로 만든 embed 에 방문자별 필드만 덧붙인다.
+    매장이 수정/삭제되거나 길드 역할이 바뀌면 비우고, 다른 프로세스가 매장을 고친 경우에 대비해
+    created_at/updated_at 이 달라져도 다시 만든다.
+    """
+
+    def __init__(self):
+        self.guilds = {}  # guild_id → {매장코드: ((created_at, updated_at), {종류: payload})}
+
+    def get(self, code, store, kind, build):
+        """종류별 템플릿으로 만든 새 embed (없으면 build() 로 만든 embed 의 payload 를 저장)"""
+        version = (store.get('created_at'), store.get('updated_at'))
+        stores = self.guilds.setdefault(store['guild_id'], {})
+        entry = stores.get(code)
+        if entry is None or entry[0] != version:
+            entry = stores[code] = (version, {})
+        payload = entry[1].get(kind)
+        if payload is None:
+            payload = entry[1][kind] = build().to_dict()
+        # Embed.copy() 는 얕은 복사라 add_field 가 저장된 필드 목록까지 바꾸므로 payload 를 깊게 복사
+        return discord.Embed.from_dict(copy.deepcopy(payload))
+
+    def invalidate_store(self, code, guild_id):
+        self.guilds.get(guild_id, {}).pop(code, None)
+
+    def invalidate_guild(self, guild_id):
+        self.guilds.pop(guild_id, None)
@@ -0,0 +1,224 @@
+import json
+import os
+import time
+
+from journal import replay_log, write_atomic
+from persistence import WriteBehindWriter
+
+# 입장 결과
+OUTCOME_APPROVED = "approved"  # 승인
+OUTCOME_ALREADY = "already"    # 이미 승인된 사용자의 재시도
+OUTCOME_DENIED = "denied"      # 거부 (reason: not_member / role / passphrase)
+OUTCOME_RESET = "reset"        # 매장 삭제 - 같은 코드가 재사용되어도 이전 집계가 섞이지 않도록 초기화
+
+# 집계 칸 순서 (분/시간 버킷 배열의 인덱스)
+COLUMNS = ("approved", "already", "not_member", "role", "passphrase")
+
+
+def column_of(outcome, reason):
+    if outcome == OUTCOME_APPROVED:
+        return 0
+    if outcome == OUTCOME_ALREADY:
+        return 1
+    return COLUMNS.index(reason)
+
+
+class Rollup:
+    """매장 하나의 분/시간 단위 집계 (버킷 시작 번호 → 칸별 건수)"""
+
+    __slots__ = ("minutes", "hours")
+
+    def __init__(self, minutes=None, hours=None):
+        self.minutes = minutes or {}
+        self.hours = hours or {}
+
+    @staticmethod
+    def _bump(buckets, index, column, keep):
+        row = buckets.get(index)
+        if row is None:
+            row = buckets[index] = [0] * len(COLUMNS)
+            # 새 버킷이 생길 때만 오래된 버킷 정리 (대부분 시간 순으로 들어오므로 앞에서부터)
+            cutoff = index - keep
+            while buckets:
+                oldest = next(iter(buckets))
+                if oldest > cutoff:
+                    break
+                del buckets[oldest]
+        row[column] += 1
+
+    def add(self, ts, column, minute_keep, hour_keep):
+        self._bump(self.minutes, int(ts // 60), column, minute_keep)
+        self._bump(self.hours, int(ts // 3600), column, hour_keep)
+
+    def to_dict(self):
+        return {
+            "minutes": {str(k): list(v) for k, v in self.minutes.items()},
+            "hours": {str(k): list(v) for k, v in self.hours.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            {int(k): v for k, v in data["minutes"].items()},
+            {int(k): v for k, v in data["hours"].items()},
+        )
+
+
+class EntryEventLog:
+    """입장 결과 append-only 로그 + 분/시간 집계
+
+    결과 1건마다 로그에 한 줄을 추가하고, 메모리의 매장별 집계를 바로 갱신한다.
+    /매장통계 는 집계만 읽으므로 원본 로그를 다시 훑지 않는다. 집계는 snapshot_every 건마다
+    (그리고 종료 시) 로그 위치와 함께 스냅샷으로 저장되며, 기동 시 스냅샷 이후 로그만 재생한다.
+    스냅샷을 저장한 뒤에는 이미 집계에 들어간 로그를 비워서 로그가 끝없이 커지지 않도록 한다.
+    """
+
+    def __init__(self, path, snapshot_path, minute_keep=1440, hour_keep=24 * 30,
+                 snapshot_every=1000, save_delay=1.0):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.minute_keep = minute_keep
+        self.hour_keep = hour_keep
+        self.snapshot_every = snapshot_every
+        self.save_delay = save_delay
+        self.rollups = {}     # 매장코드 → Rollup
+        self.pending = []     # 아직 파일에 쓰지 않은 줄 (bytes)
+        self.unsnapshotted = 0
+        self.writer = None
+        self._load()
+
+    def _load(self):
+        offset = 0
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+                self.rollups = {code: Rollup.from_dict(data) for code, data in snapshot["rollups"].items()}
+                offset = snapshot["offset"]
+            except Exception as e:
+                print(f"[ERROR] 입장 통계 스냅샷 로드 실패 (로그 전체 재생): {e}")
+                self.rollups = {}
+                offset = 0
+
+        log_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if offset > log_size:
+            # 스냅샷 저장 후 로그를 비우고 위치 0 을 기록하기 전에 죽은 경우 - 로그에는 스냅샷 이후 것만 있음
+            offset = 0
+            self._write_snapshot(0, {code: rollup.to_dict() for code, rollup in self.rollups.items()})
+
+        def apply(event):
+            self._apply(event["t"], event["c"], event["o"], event.get("r"))
+            self.unsnapshotted += 1
+        replay_log(self.path, apply, offset=offset, name="입장 로그")
+
+    def _write_snapshot(self, offset, rollups):
+        data = json.dumps({"offset": offset, "rollups": rollups}, separators=(',', ':'))
+        write_atomic(self.snapshot_path, data.encode('utf-8'))
+
+    def _apply(self, ts, code, outcome, reason):
+        if outcome == OUTCOME_RESET:
+            self.rollups.pop(code, None)
+            return
+        rollup = self.rollups.get(code)
+        if rollup is None:
+            rollup = self.rollups[code] = Rollup()
+        rollup.add(ts, column_of(outcome, reason), self.minute_keep, self.hour_keep)
+
+    def record(self, code, user_id, outcome, reason=None):
+        """입장 결과 1건 기록 (집계는 즉시 반영, 파일 쓰기는 지연)"""
+        ts = round(time.time(), 3)
+        self._apply(ts, code, outcome, reason)
+        event = {"t": ts, "c": code, "u": user_id, "o": outcome}
+        if reason:
+            event["r"] = reason
+        self.pending.append(json.dumps(event, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b"\n")
+        self.unsnapshotted += 1
+        if self.writer is not None:
+            self.writer.mark_dirty()
+        else:
+            self._collect()()
+
+    def reset(self, code):
+        """매장 삭제 시 집계 초기화"""
+        self.record(code, None, OUTCOME_RESET)
+
+    def _collect(self, force_snapshot=False):
+        lines, self.pending = self.pending, []
+        snapshot = None
+        if force_snapshot or self.unsnapshotted >= self.snapshot_every:
+            snapshot = {code: rollup.to_dict() for code, rollup in self.rollups.items()}
+            self.unsnapshotted = 0
+        start = None
+        end = None
+        compacted = False
+
+        def job():
+            # 실패 시 같은 job 이 다시 실행되므로 끝낸 단계는 건너뜀
+            nonlocal start, end, compacted
+            if end is None:
+                with open(self.path, 'ab') as f:
+                    # 재시도 시 이전 시도에서 일부 쓴 내용을 잘라내고 다시 씀
+                    if start is None:
+                        start = f.tell()
+                    else:
+                        f.truncate(start)
+                    f.write(b"".join(lines))
+                    f.flush()
+                    os.fsync(f.fileno())
+                    end = f.tell()
+            if snapshot is None:
+                return
+            if not compacted:
+                self._write_snapshot(end, snapshot)
+                # 스냅샷에 들어간 로그 비우기 (여기서 죽으면 기동 시 스냅샷 위치가 로그보다 뒤라 0 부터 재생)
+                with open(self.path, 'r+b') as f:
+                    f.truncate(0)
+                    os.fsync(f.fileno())
+                compacted = True
+            self._write_snapshot(0, snapshot)
+        return job
+
+    def summary(self, code, hours, now=None):
+        """최근 hours 시간 집계 (2시간 이하는 분 단위, 그 이상은 시간 단위 버킷 사용)"""
+        now = time.time() if now is None else now
+        rollup = self.rollups.get(code)
+        by_minute = hours <= 2
+        if by_minute:
+            size, buckets = 60, rollup.minutes if rollup else {}
+        else:
+            size, buckets = 3600, rollup.hours if rollup else {}
+        first = int((now - hours * 3600) // size) + 1
+        last = int(now // size)
+
+        totals = [0] * len(COLUMNS)
+        peak = None  # (버킷 시작 시각, 건수)
+        by_hour_of_day = [0] * 24
+        for index, row in buckets.items():
+            if not first <= index <= last:
+                continue
+            count = sum(row)
+            for i, value in enumerate(row):
+                totals[i] += value
+            if peak is None or count > peak[1]:
+                peak = (index * size, count)
+            if not by_minute:
+                by_hour_of_day[time.localtime(index * size).tm_hour] += count
+
+        return {
+            "counts": dict(zip(COLUMNS, totals)),
+            "total": sum(totals),
+            "bucket_seconds": size,
+            "peak": peak,
+            "busiest_hour": max(range(24), key=by_hour_of_day.__getitem__) if any(by_hour_of_day) else None,
+        }
+
+    def start(self):
+        """이벤트 루프 시작 후 호출 - 로그 쓰기를 루프 밖으로 미룸"""
+        self.writer = WriteBehindWriter(self._collect, self.save_delay)
+
+    async def close(self):
+        """남은 로그와 집계 스냅샷 저장"""
+        if self.writer is not None:
+            writer, self.writer = self.writer, None
+            await writer.close()
+        self._collect(force_snapshot=True)()
@@ -0,0 +1,106 @@
+import json
+import os
+
+from append_log import replay_log
+
+# 저널 레코드 종류
+OP_CREATE = "create"    # 매장 생성 (승인 목록 제외 전체 정보)
+OP_UPDATE = "update"    # 매장 수정 (변경된 필드만)
+OP_DELETE = "delete"    # 매장 삭제
+OP_APPROVE = "approve"  # 방문자 승인
+
+
+def write_atomic(path, data):
+    """임시 파일에 쓴 뒤 rename 으로 교체 (쓰는 도중 죽어도 기존 파일 유지)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def apply_record(stores, record):
+    """저널 레코드 하나를 매장 데이터에 반영 (여러 번 적용해도 결과가 같음)"""
+    op = record['op']
+    code = record['code']
+
+    if op == OP_CREATE:
+        store = dict(record['store'])
+        store.setdefault('approved_users', [])
+        stores[code] = store
+    elif op == OP_UPDATE:
+        if code in stores:
+            stores[code].update(record['fields'])
+    elif op == OP_DELETE:
+        stores.pop(code, None)
+    elif op == OP_APPROVE:
+        if code in stores:
+            approved = stores[code].setdefault('approved_users', [])
+            if record['user_id'] not in approved:
+                approved.append(record['user_id'])
+
+
+class StoreJournal:
+    """append-only 저널 + 주기적 스냅샷 압축 기반 매장 저장소
+
+    변경 1건마다 한 줄짜리 레코드만 추가하므로 승인 비용이 데이터 크기와 무관하다.
+    기동 시 스냅샷(stores.json)을 읽고 저널을 재생해서 최신 상태를 복원한다.
+    """
+
+    def __init__(self, snapshot_path, journal_path, compact_every=500):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.compact_every = compact_every
+        self.pending = 0
+        self._file = None
+
+    def load(self, read_only=False):
+        """스냅샷 로드 후 저널 재생 (read_only 면 깨진 꼬리를 자르지 않고 파일도 열어두지 않음)"""
+        stores = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                stores = json.load(f)
+
+        # 깨진 꼬리는 잘라내서 다음 append 가 이어 붙지 않도록 함
+        self.pending += replay_log(
+            self.journal_path, lambda record: apply_record(stores, record), read_only=read_only, name="저널"
+        )
+
+        if not read_only:
+            self._file = open(self.journal_path, 'ab')
+        return stores
+
+    @staticmethod
+    def encode(op, code, **payload):
+        """레코드 한 줄을 bytes 로 직렬화"""
+        record = {"op": op, "code": code, **payload}
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        return line.encode('utf-8') + b"\n"
+
+    def append_lines(self, lines):
+        """직렬화된 레코드들을 이어 쓰고 fsync 한 번으로 확정"""
+        if not lines:
+            return
+        self._file.write(b"".join(lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.pending += len(lines)
+
+    def compaction_due(self, extra=0):
+        return self.pending + extra >= self.compact_every
+
+    def compact(self, stores):
+        """현재 상태를 스냅샷으로 저장하고 저널 비우기"""
+        data = json.dumps(stores, ensure_ascii=False, separators=(',', ':'))
+        write_atomic(self.snapshot_path, data.encode('utf-8'))
+
+        # 스냅샷 교체 후 저널 초기화 (중간에 죽어도 재생이 멱등이라 안전)
+        self._file.close()
+        self._file = open(self.journal_path, 'wb')
+        self.pending = 0
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
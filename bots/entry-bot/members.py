@@ -0,0 +1,74 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+
+class MemberCache:
+    """멤버 조회 캐시 (LRU + TTL)
+
+    lazy=False 이면 discord.py 멤버 캐시(guild.get_member)를 그대로 쓴다.
+    lazy=True 이면 전체 멤버를 들고 있지 않고, 상호작용 payload 로 받은 멤버를 기억해 두었다가
+    없으면 fetch_member 로 한 번 조회한다. 최대 max_entries 개, ttl 초까지만 보관한다.
+    """
+
+    def __init__(self, lazy=False, max_entries=5000, ttl=300.0):
+        self.lazy = lazy
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # (guild_id, user_id) → (만료 시각, Member)
+        self._inflight = {}           # (guild_id, user_id) → 진행 중인 fetch Task
+
+    def __len__(self):
+        return len(self.entries)
+
+    def remember(self, member):
+        """상호작용 등으로 받은 최신 멤버 정보 저장 (길드 멤버가 아닌 User 면 무시)"""
+        if not self.lazy or getattr(member, "guild", None) is None:
+            return
+        key = (member.guild.id, member.id)
+        self.entries[key] = (time.monotonic() + self.ttl, member)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def forget(self, guild_id, user_id):
+        self.entries.pop((guild_id, user_id), None)
+
+    def _cached(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, member = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return member
+
+    async def resolve(self, guild, user_id):
+        """길드 멤버 찾기 (서버 미가입이면 None)"""
+        member = guild.get_member(user_id)
+        if member is not None or not self.lazy:
+            return member
+
+        key = (guild.id, user_id)
+        member = self._cached(key)
+        if member is not None:
+            return member
+
+        # 같은 사용자에 대한 동시 조회는 한 번의 REST 호출로 합침
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.get_running_loop().create_task(self._fetch(guild, user_id))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, guild, user_id):
+        try:
+            member = await guild.fetch_member(user_id)
+        except discord.NotFound:
+            return None
+        self.remember(member)
+        return member
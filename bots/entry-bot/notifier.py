@@ -0,0 +1,167 @@
+import asyncio
+
+import discord
+
+# 요약 embed 하나의 설명 길이 / 메시지 하나에 담을 embed 수
+# (메시지당 embed 글자 수 합계 제한 6000 을 넘지 않도록)
+DIGEST_CHUNK_CHARS = 1800
+EMBEDS_PER_MESSAGE = 3
+
+
+class OwnerEvent:
+    """매장주에게 보낼 입장 결과 1건"""
+
+    __slots__ = ("approved", "store_name", "user_name", "fields", "title")
+
+    def __init__(self, approved, store_name, user_name, fields=(), title=None):
+        self.approved = approved
+        self.store_name = store_name
+        self.user_name = user_name
+        self.fields = list(fields)  # (이름, 값) 목록 - 값이 함수면 embed 만들 때 호출, None 이면 생략
+        self.title = title          # 기본 제목(입장 승인/거부) 대신 쓸 제목
+
+    def to_embed(self):
+        """1건일 때 보내는 개별 알림"""
+        if self.approved:
+            embed = discord.Embed(
+                title=self.title or "✅ 입장 승인",
+                description=f"**매장**: {self.store_name}\n**방문자**: {self.user_name}",
+                color=discord.Color.green()
+            )
+        else:
+            embed = discord.Embed(
+                title=self.title or "⚠️ 입장 거부",
+                description=f"**매장**: {self.store_name}\n**시도자**: {self.user_name}",
+                color=discord.Color.orange()
+            )
+        for name, value in self.fields:
+            if callable(value):
+                value = value()
+            if value is not None:
+                embed.add_field(name=name, value=value, inline=False)
+        return embed
+
+    def to_line(self):
+        """요약 알림의 한 줄"""
+        icon = "✅" if self.approved else "⚠️"
+        reason = f" — {self.fields[0][1]}" if self.fields else ""
+        return f"{icon} **{self.store_name}** · {self.user_name}{reason}"
+
+
+def build_digest_embeds(events):
+    """여러 건을 승인/거부 수가 들어간 요약 embed 들로 묶기"""
+    approved = sum(1 for event in events if event.approved)
+    title = f"📋 입장 알림 {len(events)}건 (승인 {approved} / 거부 {len(events) - approved})"
+
+    chunks = [[]]
+    size = 0
+    for event in events:
+        line = event.to_line()
+        if chunks[-1] and size + len(line) + 1 > DIGEST_CHUNK_CHARS:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(line)
+        size += len(line) + 1
+
+    embeds = []
+    for i, lines in enumerate(chunks):
+        embed = discord.Embed(
+            title=title if i == 0 else None,
+            description="\n".join(lines),
+            color=discord.Color.green() if approved == len(events) else discord.Color.orange()
+        )
+        embeds.append(embed)
+    return embeds
+
+
+class OwnerNotifier:
+    """매장주 알림 큐
+
+    이벤트를 매장주별로 window 초 동안 모아 요약 DM 하나로 보낸다. DM 채널은 캐시해서
+    fetch_user 왕복을 매장주당 한 번으로 줄이고, 전송은 단일 작업자가 순서대로 처리하며
+    rate limit/일시 오류 시 retry_after 또는 지수 백오프만큼 기다린 뒤 재시도한다.
+    """
+
+    def __init__(self, bot, window=5.0, max_retries=5):
+        self.bot = bot
+        self.window = window
+        self.max_retries = max_retries
+        self.buffers = {}   # owner_id → [OwnerEvent]
+        self.channels = {}  # owner_id → DMChannel
+        self.queue = None
+        self._worker = None
+        self._timers = {}
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    def notify(self, owner_id, event):
+        """알림 1건 추가 (즉시 반환)"""
+        buffer = self.buffers.setdefault(owner_id, [])
+        buffer.append(event)
+        if owner_id not in self._timers:
+            self._timers[owner_id] = asyncio.get_running_loop().call_later(
+                self.window, self._release, owner_id
+            )
+
+    def _release(self, owner_id):
+        self._timers.pop(owner_id, None)
+        events = self.buffers.pop(owner_id, None)
+        if events:
+            self.queue.put_nowait((owner_id, events))
+
+    async def _channel(self, owner_id):
+        channel = self.channels.get(owner_id)
+        if channel is None:
+            user = self.bot.get_user(owner_id) or await self.bot.fetch_user(owner_id)
+            channel = self.channels[owner_id] = await user.create_dm()
+        return channel
+
+    async def _run(self):
+        while True:
+            owner_id, events = await self.queue.get()
+            try:
+                await self._deliver(owner_id, events)
+            except Exception as e:
+                print(f"[ERROR] 매장주 {owner_id} 알림 처리 중 오류: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, owner_id, events):
+        if len(events) == 1:
+            embeds = [events[0].to_embed()]
+        else:
+            embeds = build_digest_embeds(events)
+
+        for start in range(0, len(embeds), EMBEDS_PER_MESSAGE):
+            batch = embeds[start:start + EMBEDS_PER_MESSAGE]
+            for attempt in range(self.max_retries):
+                try:
+                    channel = await self._channel(owner_id)
+                    await channel.send(embeds=batch)
+                    break
+                except discord.Forbidden:
+                    # 매장주가 DM 을 막아둔 경우 - 재시도해도 소용없음
+                    print(f"[WARN] 매장주 {owner_id} DM 전송 불가 (DM 차단)")
+                    return
+                except discord.HTTPException as e:
+                    if e.status != 429 and e.status < 500:
+                        print(f"[ERROR] 매장주 {owner_id} 알림 실패: {e}")
+                        return
+                    delay = getattr(e, "retry_after", None) or 2 ** attempt
+                    await asyncio.sleep(delay)
+                except discord.RateLimited as e:
+                    await asyncio.sleep(e.retry_after)
+            else:
+                print(f"[ERROR] 매장주 {owner_id} 알림 {len(events)}건 전송 포기 (재시도 초과)")
+
+    async def close(self):
+        """남은 알림을 즉시 모두 보내고 작업자 종료"""
+        if self.queue is None:
+            return
+        for owner_id, timer in list(self._timers.items()):
+            timer.cancel()
+            self._release(owner_id)
+        await self.queue.join()
+        self._worker.cancel()
@@ -0,0 +1,55 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WriteBehindWriter:
+    """변경 표시만 해두고 debounce 창 동안 모인 변경을 한 번에 저장하는 작업자
+
+    collect 는 이벤트 루프에서 호출되어 현재 상태를 떼어낸 뒤, 실제 직렬화/디스크 쓰기를
+    하는 함수를 돌려준다. 그 함수는 단일 스레드 executor 에서 순서대로 실행되며,
+    실패 시 같은 함수를 다시 실행하므로 여러 번 실행해도 안전해야 한다.
+    """
+
+    def __init__(self, collect, delay=1.0):
+        self.collect = collect
+        self.delay = delay
+        self.dirty = False
+        self._task = None
+        self._lock = asyncio.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="write-behind")
+
+    def mark_dirty(self):
+        """변경 발생 표시 (이미 예약된 저장이 있으면 거기에 합쳐짐)"""
+        self.dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.delay)
+        await self.flush()
+
+    async def flush(self, max_attempts=None):
+        """모인 변경을 지금 저장 (실패하면 같은 작업을 delay 간격으로 재시도)"""
+        async with self._lock:
+            while self.dirty:
+                self.dirty = False
+                job = self.collect()
+                attempt = 0
+                while True:
+                    attempt += 1
+                    try:
+                        await asyncio.get_running_loop().run_in_executor(self._executor, job)
+                        break
+                    except Exception as e:
+                        print(f"[ERROR] 저장 실패 ({attempt}회): {e}")
+                        if max_attempts is not None and attempt >= max_attempts:
+                            return
+                        await asyncio.sleep(self.delay)
+
+    async def close(self):
+        """종료 시 남은 변경을 모두 저장"""
+        # 대기 중인 예약만 취소 (이미 저장 중이면 아래 flush 가 끝날 때까지 기다림)
+        if self._task is not None and not self._task.done() and not self._lock.locked():
+            self._task.cancel()
+        await self.flush(max_attempts=3)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,116 @@
+import asyncio
+import glob
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import qrcode
+except ImportError:  # 선택 의존성 - 없으면 QR 없이 텍스트로만 안내
+    qrcode = None
+
+
+def render_qr(path, payload, style):
+    """QR PNG 생성 (프로세스 풀에서 실행, 임시 파일에 쓴 뒤 교체)"""
+    qr = qrcode.QRCode(
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=style["box_size"], border=style["border"]
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    image = qr.make_image(fill_color=style["fill"], back_color=style["back"])
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        image.save(f, format="PNG")
+    os.replace(tmp_path, path)
+
+
+class QRCache:
+    """매장 코드 QR 이미지 디스크 캐시
+
+    파일 이름은 (코드, 내용, 스타일) 해시로 정해지므로 같은 QR 은 한 번만 그리고
+    재시작 후에도 그대로 재사용한다. 그리기는 프로세스 풀에서 하고, 파일이 max_files 를
+    넘으면 가장 오래 쓰지 않은 것(수정 시각 기준)부터 지운다.
+    """
+
+    def __init__(self, directory, max_files=500, workers=2, style=None):
+        self.directory = directory
+        self.max_files = max_files
+        self.workers = workers
+        self.style = style or {"box_size": 10, "border": 4, "fill": "black", "back": "white"}
+        self.files = OrderedDict()  # 파일 이름 → None (오래 안 쓴 순서)
+        self._inflight = {}         # 파일 경로 → 진행 중인 렌더링 Future
+        self._executor = None
+        self._scan()
+
+    @property
+    def available(self):
+        return qrcode is not None
+
+    def _scan(self):
+        paths = glob.glob(os.path.join(self.directory, "store_*.png"))
+        for path in sorted(paths, key=os.path.getmtime):
+            self.files[os.path.basename(path)] = None
+
+    def path_for(self, code, payload):
+        key = json.dumps([code, payload, self.style], sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.directory, f"store_{code}_{digest}.png")
+
+    def _touch(self, path):
+        name = os.path.basename(path)
+        self.files[name] = None
+        self.files.move_to_end(name)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        while len(self.files) > self.max_files:
+            name, _ = self.files.popitem(last=False)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    async def get(self, code, payload):
+        """QR 이미지 경로 (없으면 그려서 저장), qrcode 미설치 시 None"""
+        if not self.available:
+            return None
+        path = self.path_for(code, payload)
+        if os.path.basename(path) in self.files and os.path.exists(path):
+            self._touch(path)
+            return path
+
+        # 같은 QR 을 동시에 요청하면 한 번만 그림
+        future = self._inflight.get(path)
+        if future is None:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            future = asyncio.get_running_loop().run_in_executor(
+                self._executor, render_qr, path, payload, self.style
+            )
+            self._inflight[path] = future
+            future.add_done_callback(lambda _: self._inflight.pop(path, None))
+        await asyncio.shield(future)
+        self._touch(path)
+        self._evict()
+        return path
+
+    def remove_code(self, code):
+        """매장 삭제 시 해당 코드의 QR 파일 모두 삭제 (예전 형식 store_{code}.png 포함)"""
+        legacy = os.path.join(self.directory, f"store_{code}.png")
+        for path in [legacy, *glob.glob(os.path.join(self.directory, f"store_{code}_*.png"))]:
+            self.files.pop(os.path.basename(path), None)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,524 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from approvals import ApprovalSet, load_approvals, save_approvals, append_approval
+from journal import StoreJournal, write_atomic, OP_CREATE, OP_UPDATE, OP_DELETE, OP_APPROVE
+from persistence import WriteBehindWriter
+
+logger = logging.getLogger(__name__)
+
+# 매장 정보 컬럼 (승인 목록 제외)
+STORE_FIELDS = (
+    "store_name", "min_role_id", "grant_role_id", "passphrase",
+    "owner_id", "guild_id", "created_at", "updated_at", "expires_at",
+)
+
+
+class StoreCodeTaken(Exception):
+    """다른 프로세스가 같은 매장 코드를 먼저 등록함"""
+
+
+class StoreRepository:
+    """매장 저장소 인터페이스 (json / journal / sqlite 백엔드 공통)"""
+
+    def get(self, code):
+        raise NotImplementedError
+
+    def exists(self, code):
+        return self.get(code) is not None
+
+    def count(self):
+        raise NotImplementedError
+
+    def codes(self):
+        """사용 중인 매장 코드 전체"""
+        raise NotImplementedError
+
+    def list_by_owner(self, owner_id):
+        """(코드, 매장) 목록"""
+        raise NotImplementedError
+
+    def create(self, code, store):
+        """매장 등록 (여러 프로세스가 공유하는 백엔드는 이미 있는 코드면 StoreCodeTaken)"""
+        raise NotImplementedError
+
+    def update(self, code, fields):
+        raise NotImplementedError
+
+    def delete(self, code):
+        raise NotImplementedError
+
+    def is_approved(self, code, user_id):
+        raise NotImplementedError
+
+    def approve(self, code, user_id):
+        raise NotImplementedError
+
+    def approved_users(self, code):
+        """승인된 방문자 ID 목록"""
+        raise NotImplementedError
+
+    def expired(self, now):
+        """expires_at 이 now(ISO 문자열) 이전인 매장 코드 목록"""
+        raise NotImplementedError
+
+    # 저장 1회 소요 시간(초)을 받는 콜백 (계측용, 파일로 저장하는 백엔드만 호출)
+    on_saved = None
+
+    def start_write_behind(self, delay):
+        """이벤트 루프 시작 후 호출 - 디스크 쓰기를 루프 밖으로 미룸 (지원하는 백엔드만)"""
+
+    async def flush(self):
+        """미뤄둔 쓰기를 모두 반영 (종료 시 호출)"""
+
+    def close(self):
+        pass
+
+
+class MemoryStoreRepository(StoreRepository):
+    """전체 매장을 메모리에 두는 저장소 (stores.json 또는 journal 로 영속화)
+
+    승인 목록은 stores.json 밖의 매장별 packed 파일(approvals/<코드>.u64)에 두고,
+    처음 조회될 때 ApprovalSet 으로 읽어 들인다.
+    """
+
+    def __init__(self, stores_file, journal=None, approvals_dir=None):
+        self.stores_file = stores_file
+        self.journal = journal
+        self.approvals_dir = approvals_dir or os.path.join(os.path.dirname(stores_file), "approvals")
+        os.makedirs(self.approvals_dir, exist_ok=True)
+        if journal is not None:
+            self.stores = journal.load()
+        elif os.path.exists(stores_file):
+            with open(stores_file, 'r', encoding='utf-8') as f:
+                self.stores = json.load(f)
+        else:
+            self.stores = {}
+
+        self.approvals = {}          # 코드 → ApprovalSet (로드된 매장만)
+        self.dirty_approvals = set()  # 파일 전체를 다시 써야 하는 매장 코드
+
+        # 아직 디스크에 반영되지 않은 변경
+        self.writer = None
+        self.stores_dirty = False
+        self.pending_records = []     # journal 모드 레코드
+        self.pending_file_ops = []    # 승인 파일 작업 (순서대로 실행)
+
+        # 구버전 stores.json 의 approved_users 목록 / 저널 재생분을 승인 파일로 이전
+        migrated = False
+        for code, store in self.stores.items():
+            approved_users = store.pop('approved_users', None)
+            if approved_users:
+                approvals = self._approvals(code)
+                for user_id in approved_users:
+                    approvals.add(user_id)
+                self.dirty_approvals.add(code)
+                migrated = True
+        if migrated and journal is None:
+            self.stores_dirty = True
+            self.collect_writes()()
+
+        # owner_id → 매장 코드 인덱스, 만료 시각이 있는 매장 인덱스
+        self.by_owner = {}
+        self.expiring = {}  # 코드 → expires_at
+        for code, store in self.stores.items():
+            self.by_owner.setdefault(store['owner_id'], set()).add(code)
+            self._index_expiry(code, store)
+
+    def _approvals_path(self, code):
+        return os.path.join(self.approvals_dir, f"{code}.u64")
+
+    def _approvals(self, code):
+        """매장의 승인 집합 (처음 접근 시 파일에서 로드)"""
+        approvals = self.approvals.get(code)
+        if approvals is None:
+            approvals = self.approvals[code] = load_approvals(self._approvals_path(code))
+        return approvals
+
+    def _apply_file_op(self, op, code, arg=None):
+        path = self._approvals_path(code)
+        if op == "append":
+            append_approval(path, arg)
+        elif op == "save":
+            save_approvals(path, arg)
+        elif op == "remove" and os.path.exists(path):
+            os.remove(path)
+
+    def collect_writes(self):
+        """쌓인 변경을 떼어내고, 실제 디스크 쓰기를 하는 함수를 반환"""
+        file_ops, self.pending_file_ops = self.pending_file_ops, []
+        snapshot = None
+
+        if self.journal is None:
+            if self.stores_dirty:
+                snapshot = {code: dict(store) for code, store in self.stores.items()}
+                self.stores_dirty = False
+            for code in self.dirty_approvals:
+                file_ops.append(("save", code, self._approvals(code).copy()))
+            self.dirty_approvals.clear()
+
+            # 삭제된 매장의 승인 파일은 stores.json 에서 빠진 뒤에 지움
+            # (먼저 지우고 죽으면 stores.json 에 남은 매장의 승인 기록이 사라짐)
+            deferred = []
+            if snapshot is not None:
+                deferred = [op for op in file_ops if op[0] == "remove" and op[1] not in snapshot]
+                file_ops = [op for op in file_ops if not (op[0] == "remove" and op[1] not in snapshot)]
+
+            def job():
+                for op in file_ops:
+                    self._apply_file_op(*op)
+                if snapshot is not None:
+                    data = json.dumps(snapshot, ensure_ascii=False, indent=2)
+                    write_atomic(self.stores_file, data.encode('utf-8'))
+                for op in deferred:
+                    self._apply_file_op(*op)
+            return self._observed(job)
+
+        lines, self.pending_records = self.pending_records, []
+        if self.journal.compaction_due(len(lines)):
+            # 압축 시점에만 승인 파일 전체 저장 + 스냅샷 교체
+            snapshot = {code: dict(store) for code, store in self.stores.items()}
+            for code in self.dirty_approvals:
+                if code in self.stores:
+                    file_ops.append(("save", code, self._approvals(code).copy()))
+            self.dirty_approvals.clear()
+
+        def job():
+            self.journal.append_lines(lines)
+            for op in file_ops:
+                self._apply_file_op(*op)
+            if snapshot is not None:
+                self.journal.compact(snapshot)
+        return self._observed(job)
+
+    def _observed(self, job):
+        if self.on_saved is None:
+            return job
+
+        def timed_job():
+            start = time.perf_counter()
+            job()
+            self.on_saved(time.perf_counter() - start)
+        return timed_job
+
+    def _persist(self, op, code, **payload):
+        if self.journal is None:
+            if op != OP_APPROVE:
+                self.stores_dirty = True
+        else:
+            self.pending_records.append(StoreJournal.encode(op, code, **payload))
+
+        if self.writer is not None:
+            self.writer.mark_dirty()
+        else:
+            self.collect_writes()()
+
+    def start_write_behind(self, delay):
+        if delay > 0:
+            self.writer = WriteBehindWriter(self.collect_writes, delay)
+
+    async def flush(self):
+        if self.writer is not None:
+            await self.writer.close()
+            self.writer = None
+
+    def _index_expiry(self, code, store):
+        if store.get('expires_at'):
+            self.expiring[code] = store['expires_at']
+        else:
+            self.expiring.pop(code, None)
+
+    def get(self, code):
+        return self.stores.get(code)
+
+    def exists(self, code):
+        return code in self.stores
+
+    def count(self):
+        return len(self.stores)
+
+    def codes(self):
+        return list(self.stores)
+
+    def list_by_owner(self, owner_id):
+        codes = sorted(self.by_owner.get(owner_id, ()))
+        return [(code, self.stores[code]) for code in codes]
+
+    def create(self, code, store):
+        self.stores[code] = dict(store)
+        self.approvals[code] = ApprovalSet()
+        self.dirty_approvals.discard(code)
+        self.pending_file_ops.append(("remove", code))
+        self.by_owner.setdefault(store['owner_id'], set()).add(code)
+        self._index_expiry(code, store)
+        self._persist(OP_CREATE, code, store=store)
+
+    def update(self, code, fields):
+        self.stores[code].update(fields)
+        self._index_expiry(code, self.stores[code])
+        self._persist(OP_UPDATE, code, fields=fields)
+
+    def delete(self, code):
+        store = self.stores.pop(code)
+        self.by_owner.get(store['owner_id'], set()).discard(code)
+        self.expiring.pop(code, None)
+        self.approvals.pop(code, None)
+        self.dirty_approvals.discard(code)
+        self.pending_file_ops.append(("remove", code))
+        self._persist(OP_DELETE, code)
+
+    def is_approved(self, code, user_id):
+        return user_id in self._approvals(code)
+
+    def approve(self, code, user_id):
+        if not self._approvals(code).add(user_id):
+            return
+        if self.journal is None:
+            # json 모드: 승인 파일에 8바이트만 이어 쓰기 (stores.json 은 건드리지 않음)
+            self.pending_file_ops.append(("append", code, user_id))
+        else:
+            # journal 모드: 저널에 기록하고 승인 파일은 압축 시점에 한꺼번에 저장
+            self.dirty_approvals.add(code)
+        self._persist(OP_APPROVE, code, user_id=user_id)
+
+    def approved_users(self, code):
+        return iter(self._approvals(code))
+
+    def expired(self, now):
+        return sorted(code for code, expires_at in self.expiring.items() if expires_at <= now)
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS owners (
+    owner_id INTEGER PRIMARY KEY,
+    first_seen TEXT
+);
+CREATE TABLE IF NOT EXISTS stores (
+    code TEXT PRIMARY KEY,
+    store_name TEXT NOT NULL,
+    min_role_id INTEGER,
+    grant_role_id INTEGER,
+    passphrase TEXT,
+    owner_id INTEGER NOT NULL REFERENCES owners(owner_id),
+    guild_id INTEGER,
+    created_at TEXT,
+    updated_at TEXT,
+    expires_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_stores_owner ON stores(owner_id);
+CREATE INDEX IF NOT EXISTS idx_stores_guild ON stores(guild_id);
+-- (store_code, user_id) 기본키가 곧 중복 입장 확인용 인덱스
+CREATE TABLE IF NOT EXISTS approvals (
+    store_code TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    approved_at TEXT,
+    PRIMARY KEY (store_code, user_id)
+) WITHOUT ROWID;
+"""
+
+
+class SqliteStoreRepository(StoreRepository):
+    """SQLite(WAL) 저장소 - 매장/승인 기록을 메모리에 올리지 않고 인덱스로 조회"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # 다른 프로세스가 쓰는 중이면 timeout 초까지 기다림
+        self.conn = sqlite3.connect(db_path, isolation_level=None, timeout=5.0)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        # expires_at 컬럼이 없던 기존 DB 업그레이드
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(stores)")}
+        if 'expires_at' not in columns:
+            self.conn.execute("ALTER TABLE stores ADD COLUMN expires_at TEXT")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_stores_expires ON stores(expires_at) WHERE expires_at IS NOT NULL"
+        )
+
+    @contextmanager
+    def transaction(self):
+        """autocommit 연결에서 여러 문장을 하나의 트랜잭션으로 묶기"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _row_to_store(self, row):
+        return {field: row[field] for field in STORE_FIELDS}
+
+    def get(self, code):
+        row = self.conn.execute("SELECT * FROM stores WHERE code = ?", (code,)).fetchone()
+        return self._row_to_store(row) if row else None
+
+    def exists(self, code):
+        return self.conn.execute("SELECT 1 FROM stores WHERE code = ?", (code,)).fetchone() is not None
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM stores").fetchone()[0]
+
+    def codes(self):
+        return [row[0] for row in self.conn.execute("SELECT code FROM stores")]
+
+    def list_by_owner(self, owner_id):
+        rows = self.conn.execute(
+            "SELECT * FROM stores WHERE owner_id = ? ORDER BY code", (owner_id,)
+        ).fetchall()
+        return [(row['code'], self._row_to_store(row)) for row in rows]
+
+    def create(self, code, store):
+        # 여러 프로세스가 같은 DB 를 쓰면 코드 중복은 기본키 충돌로만 확인할 수 있음
+        try:
+            with self.transaction():
+                self._insert_store(code, store)
+        except sqlite3.IntegrityError:
+            if self.exists(code):
+                raise StoreCodeTaken(code)
+            raise
+
+    def _insert_store(self, code, store):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO owners (owner_id, first_seen) VALUES (?, ?)",
+            (store['owner_id'], store.get('created_at')),
+        )
+        self.conn.execute(
+            f"INSERT INTO stores (code, {', '.join(STORE_FIELDS)}) "
+            f"VALUES (?, {', '.join('?' for _ in STORE_FIELDS)})",
+            (code, *(store.get(field) for field in STORE_FIELDS)),
+        )
+
+    def update(self, code, fields):
+        columns = [field for field in fields if field in STORE_FIELDS]
+        if not columns:
+            return
+        self.conn.execute(
+            f"UPDATE stores SET {', '.join(f'{c} = ?' for c in columns)} WHERE code = ?",
+            (*(fields[c] for c in columns), code),
+        )
+
+    def delete(self, code):
+        with self.transaction():
+            self.conn.execute("DELETE FROM approvals WHERE store_code = ?", (code,))
+            self.conn.execute("DELETE FROM stores WHERE code = ?", (code,))
+
+    def is_approved(self, code, user_id):
+        return self.conn.execute(
+            "SELECT 1 FROM approvals WHERE store_code = ? AND user_id = ?", (code, user_id)
+        ).fetchone() is not None
+
+    def approve(self, code, user_id):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO approvals (store_code, user_id, approved_at) VALUES (?, ?, ?)",
+            (code, user_id, datetime.now().isoformat()),
+        )
+
+    def approved_users(self, code):
+        rows = self.conn.execute("SELECT user_id FROM approvals WHERE store_code = ?", (code,))
+        return (row[0] for row in rows)
+
+    def expired(self, now):
+        rows = self.conn.execute(
+            "SELECT code FROM stores WHERE expires_at IS NOT NULL AND expires_at <= ? ORDER BY code", (now,)
+        )
+        return [row[0] for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+def _read_json_source(stores_file, journal_file=None):
+    """stores.json (+ 저널, 승인 파일) 을 읽기만 해서 {코드: (매장, 승인 ID 집합)} 반환"""
+    if journal_file and os.path.exists(journal_file):
+        stores = StoreJournal(stores_file, journal_file).load(read_only=True)
+    elif os.path.exists(stores_file):
+        with open(stores_file, 'r', encoding='utf-8') as f:
+            stores = json.load(f)
+    else:
+        stores = {}
+
+    approvals_dir = os.path.join(os.path.dirname(stores_file), "approvals")
+    source = {}
+    for code, store in stores.items():
+        # 구버전 stores.json 의 approved_users 목록 / 저널 재생분 + 승인 파일
+        approved = set(store.pop('approved_users', None) or ())
+        approved.update(load_approvals(os.path.join(approvals_dir, f"{code}.u64")))
+        source[code] = (store, approved)
+    return source
+
+
+def migrate_json_to_sqlite(stores_file, db_path, journal_file=None):
+    """기존 stores.json (+ 저널, 승인 파일) 을 SQLite DB 로 1회 이전, 이전된 매장 수 반환
+
+    원본 파일은 읽기만 하고, 임시 DB 에 모두 쓴 뒤에만 db_path 로 교체한다
+    (도중에 실패하면 db_path 가 생기지 않으므로 다음 기동 때 다시 이전).
+    """
+    source = _read_json_source(stores_file, journal_file)
+
+    tmp_path = f"{db_path}.tmp"
+    for path in (tmp_path, f"{tmp_path}-wal", f"{tmp_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    try:
+        repo = SqliteStoreRepository(tmp_path)
+        try:
+            with repo.transaction():
+                for code, (store, approved) in source.items():
+                    repo._insert_store(code, store)
+                    repo.conn.executemany(
+                        "INSERT OR IGNORE INTO approvals (store_code, user_id) VALUES (?, ?)",
+                        [(code, user_id) for user_id in approved],
+                    )
+            # WAL 내용을 본 파일에 합쳐서 임시 DB 파일 하나만 옮기면 되도록 함
+            repo.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            repo.close()
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        for path in (tmp_path, f"{tmp_path}-wal", f"{tmp_path}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    return len(source)
+
+
+def open_repository(mode, stores_file, journal_file, db_path, compact_every=500):
+    """STORAGE_MODE 에 맞는 저장소 생성"""
+    if mode == "sqlite":
+        # DB 가 처음 만들어지는 경우 기존 데이터를 자동으로 이전
+        if not os.path.exists(db_path) and (
+            os.path.exists(stores_file) or os.path.exists(journal_file)
+        ):
+            migrated = migrate_json_to_sqlite(stores_file, db_path, journal_file)
+            # 봇 로깅 설정 전(모듈 import 시점)이라 기본 출력되는 warning 으로 남김
+            logger.warning("stores.json → SQLite 이전 완료: %d개 매장 (%s)", migrated, db_path)
+        return SqliteStoreRepository(db_path)
+    if mode == "journal":
+        journal = StoreJournal(stores_file, journal_file, compact_every=compact_every)
+        return MemoryStoreRepository(stores_file, journal)
+    return MemoryStoreRepository(stores_file)
+
+
+if __name__ == "__main__":
+    # 수동 이전: python repository.py [stores.json] [stores.db]
+    import sys
+
+    src = sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", "stores.json")
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.join("data", "stores.db")
+    if os.path.exists(dst):
+        print(f"❌ 이미 존재하는 DB 입니다: {dst}")
+        sys.exit(1)
+    journal_path = os.path.join(os.path.dirname(src), "stores.journal")
+    print(f"✅ {migrate_json_to_sqlite(src, dst, journal_path)}개 매장을 {dst} 로 이전했습니다.")
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import os
+from collections import deque
+
+import discord
+
+from journal import write_atomic
+from notifier import OwnerEvent
+from persistence import WriteBehindWriter
+
+
+class RoleGrant:
+    """대기 중인 역할 부여 1건"""
+
+    __slots__ = ("guild_id", "user_id", "role_id", "store_code", "store_name", "owner_id", "user_name")
+
+    def __init__(self, guild_id, user_id, role_id, store_code, store_name, owner_id, user_name):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.role_id = role_id
+        self.store_code = store_code
+        self.store_name = store_name
+        self.owner_id = owner_id
+        self.user_name = user_name
+
+    def key(self):
+        return (self.guild_id, self.user_id, self.role_id)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class RetryLater(Exception):
+    """지금은 처리할 수 없지만 영구 실패는 아님 (대기 목록에 남겨두고 나중에 다시 시도)"""
+
+
+class RoleGrantWorker:
+    """길드별 역할 부여 큐
+
+    입장 승인 시 바로 add_roles 를 기다리지 않고 큐에 넣는다. 길드마다 작업자 하나가
+    interval 간격으로 처리하고, rate limit/일시 오류는 백오프 후 재시도한다.
+    대기 목록은 파일에 저장되어 재시작 후에도 이어서 처리되며, 실패는 매장주에게 알린다.
+    작업자는 게이트웨이 연결(길드 캐시 준비) 후에 시작하고, 길드를 아직 찾을 수 없으면
+    실패로 처리하지 않고 retry_delay 초 뒤에 다시 시도한다.
+    """
+
+    def __init__(self, bot, path, notifier, interval=0.5, max_retries=5, save_delay=1.0, retry_delay=60.0):
+        self.bot = bot
+        self.path = path
+        self.notifier = notifier
+        self.interval = interval
+        self.max_retries = max_retries
+        self.save_delay = save_delay
+        self.retry_delay = retry_delay
+        self.pending = {}  # key → RoleGrant (중복 요청 방지 + 저장 대상)
+        self.queues = {}   # guild_id → deque
+        self.workers = {}  # guild_id → Task
+        self.retries = {}  # key → 재시도 예약 (TimerHandle)
+        self.writer = None
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return [RoleGrant(**item) for item in json.load(f)]
+        except Exception as e:
+            print(f"[ERROR] 대기 중인 역할 부여 목록 로드 실패: {e}")
+            return []
+
+    def _collect(self):
+        items = [grant.to_dict() for grant in self.pending.values()]
+
+        def job():
+            write_atomic(self.path, json.dumps(items, ensure_ascii=False).encode('utf-8'))
+        return job
+
+    def start(self):
+        """이벤트 루프 시작 후 호출 - 저장된 대기 목록 재개"""
+        self.writer = WriteBehindWriter(self._collect, self.save_delay)
+        restored = self._load()
+        for grant in restored:
+            self._enqueue(grant)
+        if restored:
+            print(f"🎖️ 대기 중이던 역할 부여 {len(restored)}건 재개")
+
+    def submit(self, guild_id, user_id, role_id, store_code, store_name, owner_id, user_name):
+        """역할 부여 요청 (즉시 반환)"""
+        grant = RoleGrant(guild_id, user_id, role_id, store_code, store_name, owner_id, user_name)
+        if grant.key() in self.pending:
+            return
+        self._enqueue(grant)
+        self.writer.mark_dirty()
+
+    def _enqueue(self, grant):
+        self.pending[grant.key()] = grant
+        self._schedule(grant)
+
+    def _schedule(self, grant):
+        self.queues.setdefault(grant.guild_id, deque()).append(grant)
+        worker = self.workers.get(grant.guild_id)
+        if worker is None or worker.done():
+            self.workers[grant.guild_id] = asyncio.get_running_loop().create_task(
+                self._run(grant.guild_id)
+            )
+
+    def pending_count(self, guild_id=None):
+        if guild_id is None:
+            return len(self.pending)
+        return len(self.queues.get(guild_id, ()))
+
+    def _retry_later(self, grant):
+        # 그 사이 완료/취소되지 않았으면 다시 큐에 넣음
+        self.retries.pop(grant.key(), None)
+        if self.pending.get(grant.key()) is grant:
+            self._schedule(grant)
+
+    async def _run(self, guild_id):
+        # setup_hook 은 게이트웨이 연결 전에 실행되므로 길드 캐시가 채워질 때까지 기다림
+        await self.bot.wait_until_ready()
+        queue = self.queues[guild_id]
+        while queue:
+            grant = queue.popleft()
+            try:
+                error = await self._grant(grant)
+            except RetryLater as e:
+                print(f"[WARN] 역할 부여 보류 ({grant.store_name} / {grant.user_name}): {e}, {self.retry_delay:g}초 후 재시도")
+                self.retries[grant.key()] = asyncio.get_running_loop().call_later(
+                    self.retry_delay, self._retry_later, grant
+                )
+                continue
+            except Exception as e:
+                error = str(e)
+            if error:
+                print(f"[ERROR] 역할 부여 실패 ({grant.store_name} / {grant.user_name}): {error}")
+                self.notifier.notify(grant.owner_id, OwnerEvent(
+                    False, grant.store_name, grant.user_name,
+                    [("역할 부여 실패", error)], title="⚠️ 역할 부여 실패"
+                ))
+            self.pending.pop(grant.key(), None)
+            self.writer.mark_dirty()
+            await asyncio.sleep(self.interval)
+
+    async def _grant(self, grant):
+        """역할 부여 시도 - 실패 시 사유 문자열, 성공/이미 보유 시 None
+
+        길드를 찾을 수 없으면 (연결 직후 길드 장애 등) RetryLater 를 던진다.
+        """
+        guild = self.bot.get_guild(grant.guild_id)
+        if guild is None:
+            raise RetryLater("서버를 찾을 수 없음")
+        role = guild.get_role(grant.role_id)
+        if role is None:
+            return "부여할 역할이 삭제됨"
+
+        for attempt in range(self.max_retries):
+            try:
+                member = guild.get_member(grant.user_id) or await guild.fetch_member(grant.user_id)
+                if member.get_role(grant.role_id) is not None:
+                    return None
+                await member.add_roles(role, reason=f"매장 입장 승인: {grant.store_name}")
+                return None
+            except discord.NotFound:
+                return "서버에서 나간 사용자"
+            except discord.Forbidden:
+                return "봇 권한 부족 (역할 순서/권한 확인 필요)"
+            except discord.HTTPException as e:
+                if e.status != 429 and e.status < 500:
+                    return f"디스코드 오류 ({e.status})"
+                await asyncio.sleep(getattr(e, "retry_after", None) or 2 ** attempt)
+            except discord.RateLimited as e:
+                await asyncio.sleep(e.retry_after)
+        return "재시도 횟수 초과"
+
+    async def close(self):
+        """작업자 중지 후 남은 대기 목록 저장 (다음 실행 때 재개)"""
+        for worker in self.workers.values():
+            worker.cancel()
+        for handle in self.retries.values():
+            handle.cancel()
+        if self.writer is not None:
+            self.writer.mark_dirty()
+            await self.writer.close()
@@ -0,0 +1,65 @@
+def role_key(role):
+    """discord.Role 비교 순서와 같은 정렬 키 (위치가 같으면 ID 가 작은 쪽이 위)"""
+    return (role.position, -role.id)
+
+
+def format_roles(member):
+    """@everyone 을 뺀 보유 역할 이름 (없으면 None)"""
+    names = [role.name for role in member.roles if not role.is_default()]
+    return ", ".join(names) if names else None
+
+
+class StoreRoles:
+    """매장 하나의 최소/부여 역할을 미리 찾아둔 결과"""
+
+    __slots__ = ("min_role", "min_key", "grant_role", "ids", "min_missing")
+
+    def __init__(self, min_role, grant_role, ids=(None, None)):
+        self.ids = ids  # 찾을 때 사용한 (최소 역할 ID, 부여 역할 ID)
+        self.min_role = min_role
+        self.min_key = role_key(min_role) if min_role is not None else None
+        self.grant_role = grant_role
+        # 최소 역할이 설정돼 있는데 찾을 수 없음 (삭제됐거나 길드를 볼 수 없음)
+        self.min_missing = ids[0] is not None and min_role is None
+
+    def eligible(self, member):
+        """최소 역할 이상인지 - 멤버 최상위 역할과 한 번만 비교 (최소 역할을 못 찾으면 거부)"""
+        if self.min_missing:
+            return False
+        if self.min_key is None:
+            return True
+        return role_key(member.top_role) >= self.min_key
+
+
+class RoleIndex:
+    """길드별 매장 역할 캐시
+
+    매장마다 최소/부여 역할을 한 번만 찾아두고, 길드 역할이 생성/수정/삭제되면
+    (위치가 바뀔 수 있으므로) 그 길드의 캐시를 통째로 비운다.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.guilds = {}  # guild_id → {매장코드: StoreRoles}
+
+    def resolve(self, code, store, guild=None):
+        ids = (store['min_role_id'], store['grant_role_id'])
+        cached = self.guilds.get(store['guild_id'], {}).get(code)
+        # 다른 프로세스에서 매장이 수정됐을 수 있으므로 역할 ID 가 같을 때만 재사용
+        if cached is not None and cached.ids == ids:
+            return cached
+
+        guild = guild or self.bot.get_guild(store['guild_id'])
+        if guild is None:
+            return StoreRoles(None, None, ids)
+        min_role = guild.get_role(store['min_role_id']) if store['min_role_id'] else None
+        grant_role = guild.get_role(store['grant_role_id']) if store['grant_role_id'] else None
+        resolved = StoreRoles(min_role, grant_role, ids)
+        self.guilds.setdefault(guild.id, {})[code] = resolved
+        return resolved
+
+    def invalidate_store(self, code, guild_id):
+        self.guilds.get(guild_id, {}).pop(code, None)
+
+    def invalidate_guild(self, guild_id):
+        self.guilds.pop(guild_id, None)
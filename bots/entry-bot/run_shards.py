@@ -0,0 +1,111 @@
+"""샤드를 여러 프로세스로 나눠 entry-bot 실행
+
+    python run_shards.py --shards 4 --processes 2
+
+샤드 번호를 프로세스 수만큼 나눠 각 프로세스에 SHARD_COUNT / SHARD_IDS 를 주고 bot.py 를 실행한다.
+매장, 승인 기록, 암구호 대기 상태는 data/ 의 SQLite(WAL) 파일로 공유하므로 STORAGE_MODE 는 sqlite 로 고정된다.
+METRICS_PORT 가 설정돼 있으면 프로세스마다 1씩 늘려서 준다.
+비정상 종료된 프로세스는 restart_delay 초 뒤 다시 띄우고, Ctrl+C / SIGTERM 이면 모두 종료한다.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+BOT_PATH = os.path.join(BOT_DIR, "bot.py")
+
+
+def split_shards(shard_count, processes):
+    """샤드 번호를 프로세스별로 나눔 (연속 구간, 앞 프로세스부터 하나씩 더)"""
+    groups = []
+    start = 0
+    for index in range(processes):
+        size = shard_count // processes + (1 if index < shard_count % processes else 0)
+        groups.append(list(range(start, start + size)))
+        start += size
+    return groups
+
+
+def process_env(shard_count, shard_ids, index):
+    env = dict(os.environ)
+    env["SHARD_COUNT"] = str(shard_count)
+    env["SHARD_IDS"] = ",".join(str(shard_id) for shard_id in shard_ids)
+    env["STORAGE_MODE"] = "sqlite"
+    if env.get("METRICS_PORT"):
+        env["METRICS_PORT"] = str(int(env["METRICS_PORT"]) + index)
+    return env
+
+
+def prepare_database():
+    """첫 실행이면 stores.json → SQLite 이전을 여기서 한 번만 수행 (프로세스들이 동시에 이전하지 않도록)"""
+    sys.path.insert(0, BOT_DIR)
+    from repository import open_repository
+
+    data_dir = os.path.join(BOT_DIR, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    open_repository(
+        "sqlite", os.path.join(data_dir, "stores.json"),
+        os.path.join(data_dir, "stores.journal"), os.path.join(data_dir, "stores.db")
+    ).close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="entry-bot 샤드 프로세스 실행기")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("SHARD_COUNT", "0")) or os.cpu_count(),
+                        help="전체 샤드 수 (기본: SHARD_COUNT 또는 CPU 수)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="프로세스 수 (기본: 샤드 수와 CPU 수 중 작은 값)")
+    parser.add_argument("--restart-delay", type=float, default=5.0, help="비정상 종료 후 재시작 대기(초)")
+    args = parser.parse_args()
+
+    processes = min(args.processes or os.cpu_count(), args.shards)
+    groups = split_shards(args.shards, processes)
+    children = {}  # 프로세스 번호 → Popen
+
+    def spawn(index):
+        shard_ids = groups[index]
+        print(f"🚀 프로세스 {index}: 샤드 {shard_ids[0]}-{shard_ids[-1]} / {args.shards}")
+        children[index] = subprocess.Popen(
+            [sys.executable, BOT_PATH], cwd=BOT_DIR,
+            env=process_env(args.shards, shard_ids, index),
+            # 터미널 Ctrl+C 는 실행기만 받고, 자식에는 아래에서 한 번만 전달
+            start_new_session=True
+        )
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        # bot.run 은 KeyboardInterrupt 로 정상 종료(미뤄둔 저장 반영)하므로 SIGINT 로 전달
+        for child in children.values():
+            if child.poll() is None:
+                child.send_signal(signal.SIGINT)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    prepare_database()
+    for index in range(processes):
+        spawn(index)
+
+    while children:
+        time.sleep(0.5)
+        for index, child in list(children.items()):
+            code = child.poll()
+            if code is None:
+                continue
+            del children[index]
+            if stopping or code == 0:
+                continue
+            print(f"[ERROR] 프로세스 {index} 비정상 종료 (exit {code}), {args.restart_delay:.0f}초 후 재시작")
+            time.sleep(args.restart_delay)
+            if not stopping:
+                spawn(index)
+
+
+if __name__ == "__main__":
+    main()
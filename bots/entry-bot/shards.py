@@ -0,0 +1,162 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import time
+
+MAILBOX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shard_inbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    shard_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_shard_inbox_shard ON shard_inbox(shard_id, id);
+"""
+
+LEASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def shard_of(guild_id, shard_count):
+    """길드가 연결되는 샤드 번호 (디스코드 규칙: (guild_id >> 22) % shard_count)"""
+    return (guild_id >> 22) % shard_count
+
+
+def parse_shard_ids(value):
+    """"0,2,4" 또는 "0-3" 형식의 샤드 번호 목록 (빈 문자열이면 빈 목록)"""
+    shard_ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        shard_ids.extend(range(int(start), int(end or start) + 1))
+    return sorted(set(shard_ids))
+
+
+class ShardMailbox:
+    """샤드 프로세스 간 메시지 전달 (공유 SQLite 테이블)
+
+    post() 는 대상 샤드 번호로 메시지를 넣고, 각 프로세스는 자기 샤드로 온 메시지를
+    poll_interval 마다 꺼내 handler(kind, payload) 로 처리한다. 꺼내기와 삭제는 한 트랜잭션이라
+    같은 메시지가 두 번 처리되지 않는다. ttl 초 동안 아무도 꺼내지 않은 메시지는 버린다.
+    """
+
+    def __init__(self, db_path, shard_ids, handler, poll_interval=0.25, ttl=600.0, batch=100):
+        self.shard_ids = list(shard_ids)
+        self.handler = handler
+        self.poll_interval = poll_interval
+        self.ttl = ttl
+        self.batch = batch
+        self.conn = sqlite3.connect(db_path, isolation_level=None, timeout=5.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(MAILBOX_SCHEMA)
+        self._task = None
+
+    def post(self, shard_id, kind, payload):
+        self.conn.execute(
+            "INSERT INTO shard_inbox (shard_id, kind, payload, created_at) VALUES (?, ?, ?, ?)",
+            (shard_id, kind, json.dumps(payload, ensure_ascii=False), time.time()),
+        )
+
+    def take(self):
+        """내 샤드로 온 메시지를 꺼내고 삭제 [(kind, payload), ...]"""
+        marks = ", ".join("?" for _ in self.shard_ids)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute(
+                f"SELECT id, kind, payload, created_at FROM shard_inbox WHERE shard_id IN ({marks}) "
+                f"ORDER BY id LIMIT ?",
+                (*self.shard_ids, self.batch),
+            ).fetchall()
+            if rows:
+                self.conn.execute(
+                    f"DELETE FROM shard_inbox WHERE id IN ({', '.join('?' for _ in rows)})",
+                    [row[0] for row in rows],
+                )
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        cutoff = time.time() - self.ttl
+        return [(kind, json.loads(payload)) for _, kind, payload, created_at in rows if created_at > cutoff]
+
+    async def _run(self):
+        while True:
+            try:
+                messages = self.take()
+            except sqlite3.Error as e:
+                print(f"[ERROR] 샤드 메시지 조회 실패: {e}")
+                messages = []
+            for kind, payload in messages:
+                try:
+                    await self.handler(kind, payload)
+                except Exception as e:
+                    print(f"[ERROR] 샤드 메시지 처리 실패 ({kind}): {e}")
+            # 한 번에 다 못 꺼냈으면 바로 이어서 처리
+            if len(messages) < self.batch:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.conn.close()
+
+
+class Lease:
+    """여러 프로세스 중 한 곳만 맡아야 하는 작업의 임대 (공유 SQLite 한 줄)
+
+    acquire() 는 아무도 갖고 있지 않거나, 내가 갖고 있거나, 보유자가 ttl 안에 갱신하지 않았으면
+    임대를 (다시) 잡고 True 를 반환한다. 보유 프로세스가 죽으면 ttl 뒤에 다른 프로세스가 이어받는다.
+    """
+
+    def __init__(self, db_path, name, ttl=180.0, holder=None):
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}"
+        self.conn = sqlite3.connect(db_path, isolation_level=None, timeout=5.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(LEASE_SCHEMA)
+
+    def acquire(self, now=None):
+        now = time.time() if now is None else now
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT holder, expires_at FROM leases WHERE name = ?", (self.name,)
+            ).fetchone()
+            held = row is None or row[0] == self.holder or row[1] <= now
+            if held:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                    (self.name, self.holder, now + self.ttl),
+                )
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return held
+
+    def release(self):
+        self.conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder))
+
+    def close(self):
+        try:
+            self.release()
+        except sqlite3.Error as e:
+            print(f"[ERROR] 임대 반납 실패 ({self.name}): {e}")
+        self.conn.close()
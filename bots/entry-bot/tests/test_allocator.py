@@ -0,0 +1,78 @@
+import pytest
+
+from allocator import CodeAllocator, CodeSpaceExhausted, format_code
+
+
+def test_format_code():
+    assert format_code(1, 2) == "01"
+    assert format_code(100, 3) == "100"
+
+
+def test_two_digit_codes_are_used_first():
+    allocator = CodeAllocator(max_digits=3)
+    codes = [allocator.allocate() for _ in range(99)]
+    assert sorted(codes) == [format_code(n, 2) for n in range(1, 100)]
+    assert "00" not in codes
+    # 2자리가 다 차면 100~999
+    code = allocator.allocate()
+    assert len(code) == 3 and 100 <= int(code) <= 999
+
+
+def test_skips_codes_already_in_use():
+    used = [format_code(n, 2) for n in range(1, 99)]
+    allocator = CodeAllocator(used, max_digits=2)
+    assert allocator.allocate() == "99"
+
+
+def test_exhaustion_raises():
+    allocator = CodeAllocator([format_code(n, 2) for n in range(1, 100)], max_digits=2)
+    with pytest.raises(CodeSpaceExhausted):
+        allocator.allocate()
+
+
+def test_released_code_is_reused_last_in_its_tier():
+    allocator = CodeAllocator(max_digits=2)
+    first = allocator.allocate()
+    allocator.release(first)
+    codes = [allocator.allocate() for _ in range(99)]
+    assert codes[-1] == first
+    with pytest.raises(CodeSpaceExhausted):
+        allocator.allocate()
+
+
+def test_release_after_exhaustion_makes_code_available():
+    allocator = CodeAllocator([format_code(n, 2) for n in range(1, 100)], max_digits=2)
+    with pytest.raises(CodeSpaceExhausted):
+        allocator.allocate()
+    allocator.release("42")
+    assert allocator.allocate() == "42"
+
+
+def test_release_ignores_unknown_and_foreign_codes():
+    allocator = CodeAllocator(["ABC"], max_digits=2)
+    code = allocator.allocate()
+    pool_size = len(allocator.pools[2])
+    # 발급하지 않은 코드 반납은 무시
+    allocator.release("00")
+    allocator.release(format_code(int(code) % 99 + 1, 2))
+    assert len(allocator.pools[2]) == pool_size
+    # 형식이 다른 코드는 사용 중 표시만 풀고 free list 에는 넣지 않음
+    allocator.release("ABC")
+    assert "ABC" not in allocator.used
+    assert len(allocator.pools[2]) == pool_size
+
+
+def test_reserve_prevents_allocation():
+    allocator = CodeAllocator([format_code(n, 2) for n in range(1, 99)], max_digits=2)
+    allocator.allocate()  # 풀 생성
+    allocator.release("05")
+    allocator.reserve("05")
+    with pytest.raises(CodeSpaceExhausted):
+        allocator.allocate()
+
+
+def test_reset_rebuilds_from_shared_codes():
+    allocator = CodeAllocator(max_digits=2)
+    allocator.allocate()
+    allocator.reset([format_code(n, 2) for n in range(2, 100)])
+    assert allocator.allocate() == "01"
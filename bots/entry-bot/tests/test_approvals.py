@@ -0,0 +1,74 @@
+import random
+
+from approvals import ApprovalSet, load_approvals, save_approvals, append_approval
+
+
+def snowflakes(count, seed=1):
+    rng = random.Random(seed)
+    # 디스코드 스노플레이크처럼 상위 비트는 시각, 하위 22비트는 워커/순번
+    return [(1 << 40 | rng.getrandbits(36)) << 22 | rng.getrandbits(12) for _ in range(count)]
+
+
+def test_add_and_contains():
+    approvals = ApprovalSet()
+    assert 42 not in approvals
+    assert approvals.add(42)
+    assert not approvals.add(42)
+    assert 42 in approvals
+    assert len(approvals) == 1
+
+
+def test_grows_and_keeps_every_id():
+    ids = snowflakes(5000)
+    approvals = ApprovalSet(ids)
+    assert len(approvals) == len(set(ids))
+    assert all(user_id in approvals for user_id in ids)
+    assert sorted(approvals) == sorted(set(ids))
+    # 적재율 0.7 이하 유지
+    assert len(approvals) * 10 <= len(approvals._table) * 7
+
+
+def test_colliding_ids_are_probed():
+    # 빈 테이블에서 같은 칸으로 가는 ID 들 (선형 탐사로 다음 칸에 들어가야 함)
+    approvals = ApprovalSet()
+    slot = approvals._index(1)
+    ids = [user_id for user_id in range(1, 10000) if approvals._index(user_id) == slot][:5]
+    assert len(ids) == 5
+    for user_id in ids:
+        assert approvals.add(user_id)
+    assert all(user_id in approvals for user_id in ids)
+    missing = next(user_id for user_id in range(10000, 20000) if approvals._index(user_id) == slot)
+    assert missing not in approvals
+
+
+def test_copy_is_independent():
+    approvals = ApprovalSet([1, 2, 3])
+    clone = approvals.copy()
+    approvals.add(4)
+    assert 4 not in clone
+    assert sorted(clone) == [1, 2, 3]
+
+
+def test_bytes_round_trip_sorted():
+    ids = snowflakes(100, seed=2)
+    approvals = ApprovalSet(ids)
+    data = approvals.to_bytes()
+    assert len(data) == 8 * len(set(ids))
+    assert sorted(ApprovalSet.from_bytes(data)) == sorted(set(ids))
+
+
+def test_from_bytes_ignores_partial_record():
+    data = ApprovalSet([7, 8]).to_bytes()
+    assert sorted(ApprovalSet.from_bytes(data + b"\x01\x02\x03")) == [7, 8]
+
+
+def test_file_append_and_save(tmp_path):
+    path = str(tmp_path / "01.u64")
+    assert len(load_approvals(path)) == 0
+    append_approval(path, 5)
+    append_approval(path, 3)
+    approvals = load_approvals(path)
+    assert sorted(approvals) == [3, 5]
+    approvals.add(9)
+    save_approvals(path, approvals)
+    assert sorted(load_approvals(path)) == [3, 5, 9]
@@ -0,0 +1,103 @@
+from challenges import ChallengeStore, TimingWheel
+
+
+def test_wheel_expires_within_one_tick():
+    wheel = TimingWheel(tick=1.0, slots=8)
+    wheel.advance(100.0)
+    wheel.schedule("a", "A", 103.5)
+    wheel.schedule("b", "B", 105.0)
+    assert wheel.advance(103.0) == []
+    assert wheel.advance(103.6) == []
+    # 만료 시각 다음 tick 에서 정리 (한 바퀴 늦어지지 않음)
+    assert wheel.advance(104.0) == ["A"]
+    assert wheel.advance(104.9) == []
+    assert wheel.advance(105.0) == ["B"]
+
+
+def test_wheel_mid_tick_expiry_after_tick_was_processed():
+    # tick 103 을 처리한 직후 같은 tick 안에서 만료되는 항목도 다음 tick 에 정리
+    wheel = TimingWheel(tick=1.0, slots=8)
+    wheel.advance(103.1)
+    wheel.schedule("a", "A", 103.5)
+    assert [wheel.advance(now) for now in (103.9, 104.0)] == [[], ["A"]]
+
+
+def test_wheel_keeps_entries_beyond_one_turn():
+    wheel = TimingWheel(tick=1.0, slots=8)
+    wheel.advance(0.0)
+    wheel.schedule("far", "FAR", 20.0)  # 슬롯 4, 두 바퀴 뒤
+    for now in range(1, 20):
+        assert wheel.advance(float(now)) == []
+    assert wheel.advance(20.0) == ["FAR"]
+
+
+def test_wheel_catches_up_after_long_pause():
+    wheel = TimingWheel(tick=1.0, slots=8)
+    wheel.advance(0.0)
+    for i in range(1, 6):
+        wheel.schedule(i, i, float(i))
+    # 여러 바퀴 동안 멈춰 있어도 한 번에 모두 만료
+    assert sorted(wheel.advance(1000.0)) == [1, 2, 3, 4, 5]
+
+
+def test_wheel_first_advance_sees_entries_scheduled_earlier():
+    wheel = TimingWheel(tick=1.0, slots=8)
+    wheel.schedule("a", "A", 2.0)
+    assert wheel.advance(5.0) == ["A"]
+
+
+def test_wheel_past_due_entry_goes_to_next_tick():
+    wheel = TimingWheel(tick=1.0, slots=8)
+    wheel.advance(10.0)
+    wheel.schedule("late", "LATE", 3.0)
+    assert wheel.advance(11.0) == ["LATE"]
+
+
+def test_wheel_cancel():
+    wheel = TimingWheel(tick=1.0, slots=8)
+    wheel.advance(0.0)
+    slot = wheel.schedule("a", "A", 2.0)
+    wheel.cancel("a", slot)
+    assert wheel.advance(3.0) == []
+
+
+def test_store_expire_and_reschedule(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("challenges.time.time", lambda: now[0])
+    store = ChallengeStore(ttl=10.0, tick=1.0)
+    store.expire()
+    store.add(1, "01", True, ["역할"])
+    store.add(1, "02", True, [])
+    assert [c.store_code for c in store.for_user(1)] == ["01", "02"]
+
+    now[0] = 1005.0
+    store.add(1, "01", True, [])  # 다시 등록하면 만료 시각이 늦춰짐
+    now[0] = 1010.5
+    assert store.expire() == 1
+    assert store.get(1, "02") is None
+    assert store.get(1, "01") is not None
+
+    now[0] = 1015.5
+    assert store.expire() == 1
+    assert len(store) == 0
+    assert store.by_user == {}
+
+
+def test_store_get_hides_expired_before_sweep(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("challenges.time.time", lambda: now[0])
+    store = ChallengeStore(ttl=5.0)
+    store.add(1, "01", True, [])
+    now[0] = 6.0
+    assert store.get(1, "01") is None
+    assert store.for_user(1) == []
+
+
+def test_store_evicts_oldest_over_limit():
+    store = ChallengeStore(ttl=60.0, max_entries=2)
+    store.add(1, "01", True, [])
+    store.add(2, "01", True, [])
+    store.add(3, "01", True, [])
+    assert store.get(1, "01") is None
+    assert len(store) == 2
+    assert 1 not in store.by_user
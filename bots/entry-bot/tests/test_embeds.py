@@ -0,0 +1,55 @@
+import discord
+
+from embeds import EmbedTemplates
+
+
+def store(updated_at=None):
+    return {'guild_id': 1, 'created_at': "2024-01-01T00:00:00", 'updated_at': updated_at}
+
+
+def build():
+    embed = discord.Embed(title="✅ 입장 승인", description="매장", color=discord.Color.green())
+    embed.add_field(name="매장", value="테스트", inline=False)
+    return embed
+
+
+def test_template_is_a_full_embed():
+    templates = EmbedTemplates()
+    embed = templates.get("01", store(), "approved", build)
+    assert isinstance(embed, discord.Embed)
+    assert embed.color == discord.Color.green()
+    assert embed.to_dict() == build().to_dict()
+    assert len(embed) == len(build())
+    assert embed.copy().to_dict() == embed.to_dict()
+
+
+def test_added_fields_do_not_leak_into_template():
+    templates = EmbedTemplates()
+    first = templates.get("01", store(), "approved", build)
+    first.add_field(name="방문자", value="A")
+    first.color = discord.Color.red()
+    second = templates.get("01", store(), "approved", build)
+    assert [field.name for field in second.fields] == ["매장"]
+    assert second.color == discord.Color.green()
+
+
+def test_build_once_until_store_changes():
+    templates = EmbedTemplates()
+    calls = []
+
+    def counting_build():
+        calls.append(1)
+        return build()
+
+    for _ in range(3):
+        templates.get("01", store(), "approved", counting_build)
+    assert len(calls) == 1
+    # 다른 프로세스가 매장을 고친 경우 (updated_at 변경)
+    templates.get("01", store("2024-01-02T00:00:00"), "approved", counting_build)
+    assert len(calls) == 2
+    templates.invalidate_store("01", 1)
+    templates.get("01", store("2024-01-02T00:00:00"), "approved", counting_build)
+    assert len(calls) == 3
+    templates.invalidate_guild(1)
+    templates.get("01", store("2024-01-02T00:00:00"), "approved", counting_build)
+    assert len(calls) == 4
@@ -0,0 +1,110 @@
+import json
+
+from journal import StoreJournal, OP_CREATE, OP_UPDATE, OP_DELETE, OP_APPROVE
+
+STORE = {"store_name": "매장", "owner_id": 1, "guild_id": 2}
+
+
+def make_journal(tmp_path, compact_every=500):
+    return StoreJournal(str(tmp_path / "stores.json"), str(tmp_path / "stores.journal"), compact_every)
+
+
+def test_replay_applies_records_in_order(tmp_path):
+    journal = make_journal(tmp_path)
+    assert journal.load() == {}
+    journal.append_lines([
+        StoreJournal.encode(OP_CREATE, "01", store=STORE),
+        StoreJournal.encode(OP_UPDATE, "01", fields={"store_name": "새 이름"}),
+        StoreJournal.encode(OP_APPROVE, "01", user_id=10),
+        StoreJournal.encode(OP_APPROVE, "01", user_id=10),
+        StoreJournal.encode(OP_CREATE, "02", store=STORE),
+        StoreJournal.encode(OP_DELETE, "02"),
+    ])
+    journal.close()
+
+    reloaded = make_journal(tmp_path)
+    stores = reloaded.load()
+    reloaded.close()
+    assert list(stores) == ["01"]
+    assert stores["01"]["store_name"] == "새 이름"
+    assert stores["01"]["approved_users"] == [10]
+    assert reloaded.pending == 6
+
+
+def test_torn_tail_is_truncated_and_ignored(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.load()
+    journal.append_lines([StoreJournal.encode(OP_CREATE, "01", store=STORE)])
+    journal.close()
+    path = tmp_path / "stores.journal"
+    good = path.read_bytes()
+    path.write_bytes(good + b'{"op":"approve","code":"01","us')
+
+    reloaded = make_journal(tmp_path)
+    stores = reloaded.load()
+    assert list(stores) == ["01"]
+    assert path.read_bytes() == good
+    # 잘라낸 뒤에 이어 쓴 레코드는 다음 재생에서 정상적으로 읽힘
+    reloaded.append_lines([StoreJournal.encode(OP_APPROVE, "01", user_id=7)])
+    reloaded.close()
+    again = make_journal(tmp_path)
+    assert again.load()["01"]["approved_users"] == [7]
+    again.close()
+
+
+def test_corrupt_line_stops_replay(tmp_path):
+    path = tmp_path / "stores.journal"
+    path.write_bytes(
+        StoreJournal.encode(OP_CREATE, "01", store=STORE)
+        + b"not json\n"
+        + StoreJournal.encode(OP_CREATE, "02", store=STORE)
+    )
+    journal = make_journal(tmp_path)
+    assert list(journal.load()) == ["01"]
+    journal.close()
+
+
+def test_read_only_load_leaves_files_untouched(tmp_path):
+    path = tmp_path / "stores.journal"
+    data = StoreJournal.encode(OP_CREATE, "01", store=STORE) + b'{"op":'
+    path.write_bytes(data)
+    journal = make_journal(tmp_path)
+    assert list(journal.load(read_only=True)) == ["01"]
+    journal.close()
+    assert path.read_bytes() == data
+
+
+def test_compaction_writes_snapshot_and_empties_journal(tmp_path):
+    journal = make_journal(tmp_path, compact_every=2)
+    journal.load()
+    lines = [StoreJournal.encode(OP_CREATE, "01", store=STORE), StoreJournal.encode(OP_APPROVE, "01", user_id=5)]
+    assert journal.compaction_due(len(lines))
+    journal.append_lines(lines)
+    journal.compact({"01": dict(STORE, approved_users=[5])})
+    assert journal.pending == 0
+    assert not journal.compaction_due()
+    journal.append_lines([StoreJournal.encode(OP_UPDATE, "01", fields={"store_name": "압축 후"})])
+    journal.close()
+
+    assert json.loads((tmp_path / "stores.json").read_text(encoding="utf-8"))["01"]["approved_users"] == [5]
+    reloaded = make_journal(tmp_path)
+    stores = reloaded.load()
+    reloaded.close()
+    assert stores["01"]["store_name"] == "압축 후"
+    assert reloaded.pending == 1
+
+
+def test_replay_is_idempotent_after_crash_during_compaction(tmp_path):
+    # 스냅샷은 교체됐지만 저널을 비우기 전에 죽은 경우: 같은 레코드를 다시 재생해도 결과가 같아야 함
+    journal = make_journal(tmp_path)
+    journal.load()
+    lines = [StoreJournal.encode(OP_CREATE, "01", store=STORE), StoreJournal.encode(OP_APPROVE, "01", user_id=5)]
+    journal.append_lines(lines)
+    journal.close()
+    (tmp_path / "stores.json").write_text(
+        json.dumps({"01": dict(STORE, approved_users=[5])}), encoding="utf-8"
+    )
+    reloaded = make_journal(tmp_path)
+    stores = reloaded.load()
+    reloaded.close()
+    assert stores["01"]["approved_users"] == [5]
@@ -0,0 +1,100 @@
+import asyncio
+
+import discord
+
+from notifier import (
+    DIGEST_CHUNK_CHARS, EMBEDS_PER_MESSAGE, OwnerEvent, OwnerNotifier, build_digest_embeds,
+)
+
+
+def event(i, approved=True):
+    return OwnerEvent(approved, f"매장{i}", f"방문자{i}", [("사유", "역할 미달" if not approved else "암구호")])
+
+
+def test_single_event_embed_skips_empty_fields():
+    embed = OwnerEvent(True, "매장", "방문자", [
+        ("승인 경로", "암구호"), ("보유 역할", lambda: None), ("역할 부여", lambda: "부여 대기 중"),
+    ]).to_embed()
+    assert embed.title == "✅ 입장 승인"
+    assert [field.name for field in embed.fields] == ["승인 경로", "역할 부여"]
+    assert OwnerEvent(False, "매장", "방문자", title="⚠️ 역할 부여 실패").to_embed().title == "⚠️ 역할 부여 실패"
+
+
+def test_digest_counts_and_keeps_order():
+    events = [event(1), event(2, approved=False), event(3)]
+    embeds = build_digest_embeds(events)
+    assert len(embeds) == 1
+    assert embeds[0].title == "📋 입장 알림 3건 (승인 2 / 거부 1)"
+    assert embeds[0].description.splitlines() == [e.to_line() for e in events]
+    assert embeds[0].color == discord.Color.orange()
+    assert build_digest_embeds([event(1), event(2)])[0].color == discord.Color.green()
+
+
+def test_digest_splits_within_discord_limits():
+    events = [event(i, approved=i % 3 != 0) for i in range(400)]
+    embeds = build_digest_embeds(events)
+    assert len(embeds) > 1
+    # 제목은 첫 embed 에만, 각 설명은 조각 크기 이하
+    assert embeds[0].title and all(embed.title is None for embed in embeds[1:])
+    assert all(len(embed.description) <= DIGEST_CHUNK_CHARS for embed in embeds)
+    # 줄이 잘리거나 빠지지 않음
+    lines = [line for embed in embeds for line in embed.description.splitlines()]
+    assert lines == [e.to_line() for e in events]
+    # 메시지 하나(embed EMBEDS_PER_MESSAGE 개)의 글자 수 합계가 6000 이하
+    for start in range(0, len(embeds), EMBEDS_PER_MESSAGE):
+        assert sum(len(embed) for embed in embeds[start:start + EMBEDS_PER_MESSAGE]) <= 6000
+
+
+def test_long_line_gets_its_own_chunk():
+    long_event = OwnerEvent(True, "가" * (DIGEST_CHUNK_CHARS + 10), "방문자")
+    embeds = build_digest_embeds([event(1), long_event, event(2)])
+    assert [len(embed.description.splitlines()) for embed in embeds] == [1, 1, 1]
+
+
+class FakeChannel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, embeds):
+        self.sent.append(embeds)
+
+
+class FakeUser:
+    def __init__(self, channel):
+        self.channel = channel
+
+    async def create_dm(self):
+        return self.channel
+
+
+class FakeBot:
+    def __init__(self):
+        self.channel = FakeChannel()
+        self.fetches = 0
+
+    def get_user(self, user_id):
+        return None
+
+    async def fetch_user(self, user_id):
+        self.fetches += 1
+        return FakeUser(self.channel)
+
+
+def test_events_within_window_become_one_digest():
+    async def scenario():
+        bot = FakeBot()
+        notifier = OwnerNotifier(bot, window=0.05)
+        notifier.start()
+        for i in range(5):
+            notifier.notify(1, event(i))
+        await asyncio.sleep(0.2)
+        notifier.notify(1, event(9))
+        await notifier.close()
+        return bot
+
+    bot = asyncio.run(scenario())
+    assert len(bot.channel.sent) == 2
+    assert bot.channel.sent[0][0].title.startswith("📋 입장 알림 5건")
+    assert bot.channel.sent[1][0].title == "✅ 입장 승인"
+    # DM 채널은 한 번만 조회
+    assert bot.fetches == 1
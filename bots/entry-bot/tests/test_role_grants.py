@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+from role_grants import RoleGrant, RoleGrantWorker
+
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+
+
+class FakeMember:
+    def __init__(self):
+        self.roles = {}
+
+    def get_role(self, role_id):
+        return self.roles.get(role_id)
+
+    async def add_roles(self, role, reason=None):
+        self.roles[role.id] = role
+
+
+class FakeGuild:
+    def __init__(self, guild_id, role_id, member_id):
+        self.id = guild_id
+        self.role = FakeRole(role_id)
+        self.member = FakeMember()
+        self.member_id = member_id
+
+    def get_role(self, role_id):
+        return self.role if role_id == self.role.id else None
+
+    def get_member(self, user_id):
+        return self.member if user_id == self.member_id else None
+
+
+class FakeBot:
+    """게이트웨이 연결 전에는 길드 캐시가 비어 있는 봇"""
+
+    def __init__(self):
+        self.guilds = {}
+        self.ready = asyncio.Event()
+
+    def get_guild(self, guild_id):
+        return self.guilds.get(guild_id)
+
+    async def wait_until_ready(self):
+        await self.ready.wait()
+
+
+class FakeNotifier:
+    def __init__(self):
+        self.events = []
+
+    def notify(self, owner_id, event):
+        self.events.append((owner_id, event))
+
+
+def grant(guild_id=1, user_id=10, role_id=100):
+    return RoleGrant(guild_id, user_id, role_id, "01", "매장", 5, "방문자")
+
+
+def test_restored_grants_wait_for_ready(tmp_path):
+    path = tmp_path / "pending_grants.json"
+    path.write_text(json.dumps([grant().to_dict()]), encoding="utf-8")
+
+    async def scenario():
+        bot, notifier = FakeBot(), FakeNotifier()
+        worker = RoleGrantWorker(bot, str(path), notifier, interval=0, save_delay=0)
+        # setup_hook 시점: 길드 캐시가 비어 있어도 실패 처리하지 않음
+        worker.start()
+        await asyncio.sleep(0.01)
+        assert worker.pending_count() == 1 and notifier.events == []
+
+        guild = bot.guilds[1] = FakeGuild(1, 100, 10)
+        bot.ready.set()
+        await asyncio.sleep(0.01)
+        await worker.close()
+        return worker, notifier, guild
+
+    worker, notifier, guild = asyncio.run(scenario())
+    assert worker.pending_count() == 0
+    assert notifier.events == []
+    assert guild.member.get_role(100) is guild.role
+    assert json.loads(path.read_text(encoding="utf-8")) == []
+
+
+def test_missing_guild_keeps_grant_pending(tmp_path):
+    path = tmp_path / "pending_grants.json"
+
+    async def scenario():
+        bot, notifier = FakeBot(), FakeNotifier()
+        bot.ready.set()
+        worker = RoleGrantWorker(bot, str(path), notifier, interval=0, save_delay=0, retry_delay=0.05)
+        worker.start()
+        worker.submit(1, 10, 100, "01", "매장", 5, "방문자")
+        await asyncio.sleep(0.01)
+        # 길드를 못 찾아도 매장주에게 실패 알림을 보내지 않고 대기 목록에 남김
+        assert worker.pending_count() == 1 and notifier.events == []
+
+        # 길드가 다시 보이면 재시도에서 부여
+        guild = bot.guilds[1] = FakeGuild(1, 100, 10)
+        await asyncio.sleep(0.1)
+        await worker.close()
+        return worker, notifier, guild
+
+    worker, notifier, guild = asyncio.run(scenario())
+    assert worker.pending_count() == 0 and notifier.events == []
+    assert guild.member.get_role(100) is guild.role
+
+
+def test_missing_guild_is_saved_for_next_run(tmp_path):
+    path = tmp_path / "pending_grants.json"
+
+    async def scenario():
+        bot = FakeBot()
+        bot.ready.set()
+        worker = RoleGrantWorker(bot, str(path), FakeNotifier(), interval=0, save_delay=0, retry_delay=60)
+        worker.start()
+        worker.submit(1, 10, 100, "01", "매장", 5, "방문자")
+        await asyncio.sleep(0.01)
+        await worker.close()
+
+    asyncio.run(scenario())
+    assert [item["user_id"] for item in json.loads(path.read_text(encoding="utf-8"))] == [10]
+
+
+def test_deleted_role_is_reported_to_owner(tmp_path):
+    async def scenario():
+        bot, notifier = FakeBot(), FakeNotifier()
+        bot.ready.set()
+        bot.guilds[1] = FakeGuild(1, 999, 10)
+        worker = RoleGrantWorker(bot, str(tmp_path / "pending_grants.json"), notifier, interval=0, save_delay=0)
+        worker.start()
+        worker.submit(1, 10, 100, "01", "매장", 5, "방문자")
+        await asyncio.sleep(0.01)
+        await worker.close()
+        return worker, notifier
+
+    worker, notifier = asyncio.run(scenario())
+    assert worker.pending_count() == 0
+    assert [owner_id for owner_id, _ in notifier.events] == [5]
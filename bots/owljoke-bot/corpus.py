@@ -0,0 +1,134 @@
+"""농담 묶음 파일 (jokes.pack)
+
+UTF-8 로 인코딩한 농담을 이어 붙인 blob 과 고정폭(8바이트) 오프셋 배열로 된 파일을 mmap 으로 연다.
+/joke 는 고른 농담 하나만 디코딩하므로 농담 수가 많아도 기동 시간과 메모리가 거의 늘지 않고,
+여러 봇 프로세스가 같은 페이지 캐시를 공유한다.
+
+    헤더 (40바이트): 매직, 버전, 농담 수, 원본 jokes.json 크기, 원본 수정 시각(ns)
+    오프셋 배열: (농담 수 + 1) 개의 uint64 - i 번째 농담은 blob[off[i]:off[i+1]]
+    blob
+
+    python corpus.py    # jokes.json (+ 추가 로그) → jokes.pack 변환 (봇 중지 후)
+"""
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+MAGIC = b"OWLJPACK"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQ")  # 매직, 버전, 예약, 농담 수, 원본 크기, 원본 수정 시각
+OFFSET = struct.Struct("<QQ")
+
+
+def source_signature(path):
+    """묶음 파일이 어떤 jokes.json 에서 만들어졌는지 확인하는 값 (크기, 수정 시각)"""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class PackedCorpus:
+    """mmap 으로 연 농담 묶음 파일 (읽기 전용 시퀀스)"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, size, mtime_ns = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"농담 묶음 파일 형식이 아닙니다: {path}")
+        self.count = count
+        self.source = (size, mtime_ns)
+        self._offsets = HEADER.size
+        self._blob = HEADER.size + 8 * (count + 1)
+
+    def __len__(self):
+        return self.count
+
+    def raw(self, index):
+        """농담 하나의 UTF-8 bytes"""
+        start, end = OFFSET.unpack_from(self._mm, self._offsets + 8 * index)
+        return self._mm[self._blob + start:self._blob + end]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("농담 번호 범위 초과")
+        return self.raw(index).decode("utf-8")
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.raw(index).decode("utf-8")
+
+    def close(self):
+        self._mm.close()
+
+
+class JokeCorpus:
+    """농담 목록 (jokes.json 목록 또는 묶음 파일 + 이후 추가된 농담)"""
+
+    def __init__(self, base, added=()):
+        self.base = base
+        self.added = list(added)
+
+    def __len__(self):
+        return len(self.base) + len(self.added)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if index < len(self.base):
+            return self.base[index]
+        return self.added[index - len(self.base)]
+
+    def __iter__(self):
+        yield from self.base
+        yield from self.added
+
+    def append(self, joke):
+        self.added.append(joke)
+
+
+def write_pack(path, jokes, source=(0, 0)):
+    """농담을 차례로 읽으며 묶음 파일 생성 (임시 파일에 쓴 뒤 교체), 농담 수 반환"""
+    directory = os.path.dirname(os.path.abspath(path))
+    offsets = array("Q", [0])
+    # 농담 수를 미리 모르므로 blob 은 임시 파일에 먼저 쓰고 마지막에 이어 붙임
+    with tempfile.TemporaryFile(dir=directory) as blob:
+        for joke in jokes:
+            offsets.append(offsets[-1] + blob.write(joke.encode("utf-8")))
+        if sys.byteorder != "little":
+            offsets.byteswap()
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(offsets) - 1, *source))
+            offsets.tofile(f)
+            blob.seek(0)
+            while True:
+                chunk = blob.read(1 << 20)
+                if not chunk:
+                    break
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(offsets) - 1
+
+
+if __name__ == "__main__":
+    from joke_store import JokeStore
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    store = JokeStore(
+        os.path.join(base_dir, "jokes.json"), os.path.join(base_dir, "jokes.jsonl"),
+        pack_path=os.path.join(base_dir, "jokes.pack")
+    )
+    corpus = store.load()
+    # 추가 로그까지 합쳐서 jokes.json 과 jokes.pack 을 함께 다시 씀
+    store.rewrite(corpus)
+    print(f"✅ 농담 {len(corpus)}개를 jokes.pack 으로 변환했습니다.")
@@ -0,0 +1,159 @@
+"""농담 중복 검사 인덱스
+
+- 정확한 중복: 정규화한 문자열(NFC, 소문자, 공백/문장부호/기호 제거)을 키로 한 dict - O(1)
+- 비슷한 농담: 정규화 문자열의 글자 n-gram 으로 MinHash 서명을 만들고 LSH 밴드로 후보를 찾은 뒤
+  실제 자카드 유사도로 확인
+
+    python dedup.py                 # jokes.json 안의 중복/유사 농담 보고
+    python dedup.py new.txt ...     # 파일(한 줄에 하나 또는 JSON 목록)의 농담을 중복 없이 jokes.json 에 추가 (봇 중지 후)
+"""
+import hashlib
+import json
+import os
+import struct
+import sys
+import unicodedata
+
+NGRAM = 2          # 한글은 음절 2-gram 이면 띄어쓰기/조사 차이 정도는 대부분 겹침
+NUM_PERM = 32      # MinHash 서명 길이
+BANDS = 8          # LSH 밴드 수 (밴드당 4칸) - 유사도 약 0.6 이상이면 대부분 후보로 잡힘
+ROWS = NUM_PERM // BANDS
+
+_UNPACK = struct.Struct(f"<{NUM_PERM}I").unpack
+
+
+def normalize(text):
+    """비교용 문자열 (NFC, 소문자, 공백/문장부호/기호 제거)"""
+    text = unicodedata.normalize("NFC", text).casefold()
+    folded = "".join(
+        ch for ch in text
+        if not ch.isspace() and unicodedata.category(ch)[0] not in "PSZC"
+    )
+    # 문장부호/이모지로만 된 농담은 원문 그대로 비교
+    return folded or text.strip()
+
+
+def shingles(key):
+    if len(key) <= NGRAM:
+        return {key}
+    return {key[i:i + NGRAM] for i in range(len(key) - NGRAM + 1)}
+
+
+def signature(grams):
+    """MinHash 서명 - n-gram 마다 해시 NUM_PERM 개를 한 번에 뽑아 칸별 최솟값"""
+    rows = [_UNPACK(hashlib.shake_128(gram.encode("utf-8")).digest(NUM_PERM * 4)) for gram in grams]
+    return tuple(map(min, zip(*rows)))
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b)
+
+
+class JokeIndex:
+    """농담 중복/유사 검사 인덱스
+
+    농담 원문/정규화 문자열은 들고 있지 않고, 정규화 문자열의 해시와 LSH 버킷(농담 번호)만 보관한다.
+    확인할 때 필요한 원문은 jokes(목록 또는 JokeCorpus)에서 번호로 꺼낸다.
+    jokes 에 농담을 추가한 뒤 update() 를 부르면 새 농담만 색인한다.
+    """
+
+    def __init__(self, jokes, threshold=0.8):
+        self.jokes = jokes
+        self.threshold = threshold
+        self.count = 0                             # 색인한 농담 수
+        self.exact = {}                            # 정규화 문자열 해시 → 농담 번호
+        self.bands = [{} for _ in range(BANDS)]    # 밴드별 서명 조각 → [농담 번호]
+        self.update()
+
+    def __len__(self):
+        return self.count
+
+    @staticmethod
+    def _band_keys(sig):
+        return [sig[band * ROWS:(band + 1) * ROWS] for band in range(BANDS)]
+
+    @staticmethod
+    def _exact_key(key):
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+
+    def update(self):
+        """jokes 에 새로 추가된 농담 색인"""
+        while self.count < len(self.jokes):
+            number = self.count
+            key = normalize(self.jokes[number])
+            self.exact.setdefault(self._exact_key(key), number)
+            for buckets, band_key in zip(self.bands, self._band_keys(signature(shingles(key)))):
+                buckets.setdefault(band_key, []).append(number)
+            self.count += 1
+
+    def find_duplicate(self, joke):
+        """(기존 농담, 유사도) - 같으면 1.0, 비슷한 농담이 없으면 None"""
+        key = normalize(joke)
+        number = self.exact.get(self._exact_key(key))
+        # 해시 충돌일 수 있으므로 원문으로 한 번 더 확인
+        if number is not None and normalize(self.jokes[number]) == key:
+            return self.jokes[number], 1.0
+
+        grams = shingles(key)
+        candidates = set()
+        for buckets, band_key in zip(self.bands, self._band_keys(signature(grams))):
+            candidates.update(buckets.get(band_key, ()))
+        best = None
+        for number in candidates:
+            existing = self.jokes[number]
+            score = jaccard(grams, shingles(normalize(existing)))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (existing, score)
+        return best
+
+
+def read_jokes(path):
+    """JSON 목록 또는 한 줄에 하나씩 적은 텍스트 파일"""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        items = json.loads(text)
+    except ValueError:
+        items = text.splitlines()
+    return [item.strip() for item in items if isinstance(item, str) and len(item.strip()) >= 3]
+
+
+if __name__ == "__main__":
+    from joke_store import JokeStore
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    pack_path = os.path.join(base_dir, "jokes.pack")
+    store = JokeStore(
+        os.path.join(base_dir, "jokes.json"), os.path.join(base_dir, "jokes.jsonl"),
+        pack_path=pack_path if os.path.exists(pack_path) else None
+    )
+    threshold = float(os.getenv("JOKE_SIMILARITY", "0.8"))
+    jokes = store.load()
+
+    if len(sys.argv) == 1:
+        seen = []
+        index = JokeIndex(seen, threshold=threshold)
+        found = 0
+        for joke in jokes:
+            duplicate = index.find_duplicate(joke)
+            if duplicate:
+                found += 1
+                print(f"[{duplicate[1]:.0%}] {joke}\n       ↳ {duplicate[0]}")
+            seen.append(joke)
+            index.update()
+        print(f"✅ 농담 {len(jokes)}개 중 중복/유사 {found}개")
+        sys.exit(0)
+
+    index = JokeIndex(jokes, threshold=threshold)
+    added = skipped = 0
+    for path in sys.argv[1:]:
+        for joke in read_jokes(path):
+            if index.find_duplicate(joke):
+                skipped += 1
+                continue
+            jokes.append(joke)
+            index.update()
+            added += 1
+    # 추가 로그까지 합쳐서 jokes.json (묶음 파일을 쓰는 중이면 jokes.pack 도) 으로 저장
+    store.rewrite(jokes)
+    print(f"✅ {added}개 추가, 중복/유사 {skipped}개 제외 (전체 {len(jokes)}개)")
@@ -0,0 +1,239 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from append_log import replay_log
+from corpus import PackedCorpus, JokeCorpus, source_signature, write_pack
+
+
+def write_json_list(path, items):
+    """json.dump(items, indent=2) 와 같은 형식으로 한 항목씩 써서 교체 (전체를 메모리에 만들지 않음)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        empty = True
+        for item in items:
+            f.write("\n  " if empty else ",\n  ")
+            f.write(json.dumps(item, ensure_ascii=False))
+            empty = False
+        f.write("]" if empty else "\n]")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JokeStore:
+    """jokes.json 스냅샷 + append-only 추가 로그(JSON Lines)
+
+    농담 1개 추가는 로그에 한 줄을 붙이고 fsync 하는 것뿐이라 전체 농담 수와 무관하다.
+    로그가 compact_every 줄을 넘으면 백그라운드에서 jokes.json 을 (기존과 같은 형식으로) 다시 쓰고
+    로그를 비운다. pack_path 가 주어지면 jokes.pack(묶음 파일)도 함께 다시 쓰고, 기동 시에는
+    jokes.json 대신 묶음 파일을 mmap 으로 연다 (jokes.json 이 묶음 파일보다 새것이면 jokes.json 사용).
+    파일 작업은 모두 단일 스레드 executor 에서 순서대로 실행되며, 그 스레드가 들고 있는
+    _base(스냅샷) + _added(로그) 가 디스크에 확정된 농담 목록이다.
+
+    봇 밖에서 jokes.json 을 고치면 reload() (또는 다음 압축) 가 크기/수정 시각으로 알아채고
+    새 스냅샷 위에 아직 로그에만 있는 농담을 다시 얹는다. 새 파일이 깨져 있으면 이전 스냅샷을 유지한다.
+    """
+
+    def __init__(self, snapshot_path, log_path, compact_every=200, pack_path=None):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path
+        self.compact_every = compact_every
+        self.pack_path = pack_path
+        self.on_saved = None         # (대상, 소요 초) 콜백 - 계측용
+        self._base = []              # 스냅샷 (목록 또는 PackedCorpus)
+        self._added = []             # 로그에만 있는 농담
+        self._pending = 0            # 로그에 쌓인 줄 수
+        self._snapshot_ok = False    # 스냅샷을 제대로 읽었을 때만 압축으로 덮어씀
+        self._signature = None       # 마지막으로 읽은/쓴 jokes.json 의 (크기, 수정 시각)
+        self._failed = None          # 읽기에 실패한 jokes.json 의 (크기, 수정 시각) - 바뀔 때까지 다시 읽지 않음
+        self._changed = False        # reload() 가 아직 돌려주지 않은 스냅샷 변경이 있음
+        self._compacting = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="joke-store")
+
+    def _read_log(self):
+        """로그의 (농담 번호, 농담) 목록 - 깨진 꼬리는 잘라냄"""
+        records = []
+        replay_log(self.log_path, lambda record: records.append((record.get("n"), record["joke"])), name="농담 로그")
+        return records
+
+    def _current_signature(self):
+        return source_signature(self.snapshot_path) if os.path.exists(self.snapshot_path) else None
+
+    def _read_snapshot(self, repack=False):
+        """스냅샷 목록 (또는 PackedCorpus) - repack 이면 오래된 묶음 파일을 jokes.json 으로 다시 만듦"""
+        signature = self._current_signature()
+        if self.pack_path and os.path.exists(self.pack_path):
+            pack = PackedCorpus(self.pack_path)
+            if signature is None or pack.source == signature:
+                return pack
+            pack.close()
+            if not repack:
+                print("[WARN] jokes.json 이 jokes.pack 보다 새것이라 jokes.json 을 읽습니다 (python corpus.py 로 다시 변환)")
+        if signature is None:
+            return []
+        with open(self.snapshot_path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if not isinstance(snapshot, list):
+            raise ValueError("jokes.json 형식이 목록이 아닙니다")
+        if not all(isinstance(joke, str) for joke in snapshot):
+            raise ValueError("jokes.json 에 문자열이 아닌 항목이 있습니다")
+        # 편집기가 아직 쓰는 중이었으면 다음에 다시 읽음
+        if self._current_signature() != signature:
+            raise ValueError("jokes.json 을 읽는 동안 파일이 바뀌었습니다")
+        if repack and self.pack_path:
+            write_pack(self.pack_path, snapshot, signature)
+            return PackedCorpus(self.pack_path)
+        return snapshot
+
+    def load(self):
+        """스냅샷 로드 후 로그 재생 → JokeCorpus (스냅샷이 깨졌으면 예외 - 로그는 그대로 둠)"""
+        records = self._read_log()
+        self._pending = len(records)
+        # 스냅샷을 못 읽어도 이후 추가는 로그에 이어서 기록
+        self._base = []
+        self._added = [joke for _, joke in records]
+
+        self._signature = self._current_signature()
+        base = self._read_snapshot()
+        # 압축 도중 죽었으면 이미 스냅샷에 들어간 농담(번호가 스냅샷 길이보다 작음)이 로그에 남아 있을 수 있음
+        self._base = base
+        self._added = [joke for number, joke in records if number is None or number >= len(base)]
+        self._snapshot_ok = True
+        self._changed = False
+        return JokeCorpus(base, self._added)
+
+    def _renumber_log(self):
+        """로그의 농담 번호를 현재 스냅샷 기준으로 다시 매김 (임시 파일에 쓴 뒤 교체)"""
+        tmp_path = f"{self.log_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            for i, joke in enumerate(self._added):
+                record = {"op": "add", "n": len(self._base) + i, "joke": joke}
+                f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.log_path)
+
+    def _refresh(self):
+        """봇 밖에서 jokes.json 이 바뀌었으면 다시 읽음 (실패하면 예외 - 이전 스냅샷 유지)"""
+        signature = self._current_signature()
+        # 파일이 없어진 경우(편집기가 지우고 다시 쓰는 중 포함)는 무시
+        if signature is None or signature == self._signature or signature == self._failed:
+            return
+        try:
+            base = self._read_snapshot(repack=True)
+        except Exception:
+            self._failed = signature
+            raise
+        if not self._snapshot_ok:
+            # 기동 때 스냅샷을 못 읽었으면 로그 번호가 유효하므로 load() 와 같이 걸러냄
+            self._added = [
+                joke for number, joke in self._read_log()
+                if number is None or number >= len(base)
+            ]
+        self._base = base
+        self._signature = signature
+        self._failed = None
+        self._snapshot_ok = True
+        self._changed = True
+        # 아직 합치지 않은 농담은 새 스냅샷 뒤에 이어지도록 번호를 다시 매김
+        if os.path.exists(self.log_path):
+            self._renumber_log()
+
+    def _reload_job(self):
+        self._refresh()
+        if not self._changed:
+            return None
+        self._changed = False
+        return JokeCorpus(self._base, self._added)
+
+    async def reload(self):
+        """jokes.json 이 바뀌었으면 새 JokeCorpus, 아니면 None (새 파일이 깨졌으면 예외)"""
+        return await self._timed("jokes_reload", self._reload_job)
+
+    def _timed(self, target, job):
+        loop = asyncio.get_running_loop()
+
+        def run():
+            started = time.monotonic()
+            result = job()
+            if self.on_saved is not None:
+                loop.call_soon_threadsafe(self.on_saved, target, time.monotonic() - started)
+            return result
+        return loop.run_in_executor(self._executor, run)
+
+    async def add(self, joke):
+        """농담 1개를 로그에 추가하고 디스크 확정까지 대기 (실패하면 예외, 아무것도 추가되지 않음)"""
+        def job():
+            # 농담 번호를 함께 기록해서 압축 도중 죽은 경우 중복 재생을 막음
+            number = len(self._base) + len(self._added)
+            line = json.dumps({"op": "add", "n": number, "joke": joke}, ensure_ascii=False).encode("utf-8") + b"\n"
+            # 버퍼 없이 열어서 실패한 쓰기가 close 때 다시 쓰이지 않도록 함
+            with open(self.log_path, "ab", buffering=0) as f:
+                start = f.tell()
+                try:
+                    if f.write(line) != len(line):
+                        raise OSError("농담 로그에 일부만 기록됨")
+                    os.fsync(f.fileno())
+                except BaseException:
+                    # 일부만 쓰였으면 잘라내서 다음 추가가 깨진 줄 뒤에 붙지 않도록 함
+                    f.truncate(start)
+                    raise
+            self._added.append(joke)
+
+        await self._timed("jokes", job)
+        self._pending += 1
+        if self._pending >= self.compact_every and self._compacting is None and self._snapshot_ok:
+            self._compacting = asyncio.get_running_loop().create_task(self.compact())
+
+    def rewrite(self, jokes):
+        """jokes.json (과 jokes.pack) 을 jokes 로 교체하고 로그 비우기 (블로킹)"""
+        write_json_list(self.snapshot_path, jokes)
+        # 직접 쓴 jokes.json 은 다시 읽지 않도록 크기/수정 시각을 기억해 둠
+        self._signature = source_signature(self.snapshot_path)
+        if self.pack_path:
+            # 묶음 파일에는 방금 쓴 jokes.json 의 크기/수정 시각을 기록해 둠
+            write_pack(self.pack_path, jokes, self._signature)
+        # 스냅샷 교체 후 로그 비우기 (중간에 죽어도 load 가 번호로 중복을 걸러냄)
+        with open(self.log_path, "wb") as f:
+            os.fsync(f.fileno())
+
+    def _compact_job(self):
+        # 봇 밖에서 고친 jokes.json 을 덮어쓰지 않도록 먼저 다시 읽음
+        try:
+            self._refresh()
+        except Exception as e:
+            print(f"[WARN] 바뀐 jokes.json 을 읽지 못해 압축을 건너뜁니다 (추가된 농담은 로그에 보관): {e}")
+            return False
+        if not self._snapshot_ok:
+            print("[WARN] jokes.json 을 읽지 못해 압축을 건너뜁니다 (추가된 농담은 로그에 보관)")
+            return False
+        self.rewrite(JokeCorpus(self._base, self._added))
+        # 이전 스냅샷 객체는 봇이 아직 쓰고 있을 수 있으므로 닫지 않고 새로 엶
+        if self.pack_path:
+            self._base = PackedCorpus(self.pack_path)
+        else:
+            self._base = list(self._base) + self._added
+        self._added = []
+        return True
+
+    async def compact(self):
+        """jokes.json 으로 내보내고 로그 비우기 (추가 작업과 같은 스레드에서 순서대로 실행)"""
+        try:
+            pending = self._pending
+            if await self._timed("jokes_compact", self._compact_job):
+                self._pending -= pending
+        except Exception as e:
+            print(f"[ERROR] 농담 압축 실패: {e}")
+        finally:
+            self._compacting = None
+
+    async def close(self):
+        if self._compacting is not None:
+            await self._compacting
+        if self._pending:
+            await self.compact()
+        self._executor.shutdown(wait=True)
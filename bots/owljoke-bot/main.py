@@ -1,10 +1,19 @@
 import os
-import json
+import sys
 import random
+import asyncio
 import discord
 from discord import app_commands
 from dotenv import load_dotenv
 
+# 두 봇이 함께 쓰는 모듈 (bots/common)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from metrics import metrics
+from command_sync import sync_commands
+from dedup import JokeIndex
+from joke_store import JokeStore
+from sampler import ShuffleSampler
+
 # 환경변수 로드
 load_dotenv()
 
@@ -12,66 +21,192 @@ load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 ALLOWED_USER_ID = int(os.getenv("ALLOWED_USER_ID", "0"))
 GUILD_ID = os.getenv("GUILD_ID")  # 선택사항 (빠른 테스트용)
+# 슬래시 명령어 동기화: auto (명령어가 바뀐 경우만) / force (매번) / off
+COMMAND_SYNC = os.getenv("COMMAND_SYNC", "auto")
+# 이 유사도(글자 2-gram 자카드) 이상이면 같은 농담으로 보고 추가 거부
+JOKE_SIMILARITY = float(os.getenv("JOKE_SIMILARITY", "0.8"))
+# 추가 로그가 이 줄 수를 넘으면 jokes.json 으로 다시 내보내고 로그 비우기
+JOKE_COMPACT_EVERY = int(os.getenv("JOKE_COMPACT_EVERY", "200"))
+# 1 이면 jokes.pack (mmap 묶음 파일) 사용 - 농담이 아주 많을 때 기동 시간/메모리 절약 (python corpus.py 로 생성)
+JOKES_PACK = os.getenv("JOKES_PACK", "0") == "1"
+# jokes.json 변경 확인 간격(초) - 바뀌면 재시작 없이 다시 읽음 (0 이면 끔)
+JOKES_RELOAD_INTERVAL = float(os.getenv("JOKES_RELOAD_INTERVAL", "5"))
+# /joke 가 전체를 한 번씩 다 보여주기 전에는 같은 농담을 다시 꺼내지 않는 범위: guild / channel / user / off
+JOKE_SHUFFLE = os.getenv("JOKE_SHUFFLE", "guild")
+# 기억해 둘 범위 수 (넘으면 오래 안 쓴 범위부터 버림)
+JOKE_SHUFFLE_MAX_SCOPES = int(os.getenv("JOKE_SHUFFLE_MAX_SCOPES", "10000"))
+# 셔플 상태 저장 파일 (선택 - 설정하면 재시작 후에도 이어서 뽑음)
+JOKE_SHUFFLE_FILE = os.getenv("JOKE_SHUFFLE_FILE")
 
 # 파일 경로
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 JOKES_PATH = os.path.join(BASE_DIR, "jokes.json")
+COMMAND_SYNC_PATH = os.path.join(BASE_DIR, "command_sync.json")
+JOKES_LOG_PATH = os.path.join(BASE_DIR, "jokes.jsonl")  # /add_joke 로 추가된 농담 (압축 전)
+JOKES_PACK_PATH = os.path.join(BASE_DIR, "jokes.pack")
+
+# 농담 저장소 (jokes.json 또는 jokes.pack + 추가 로그)
+JOKE_STORE = JokeStore(
+    JOKES_PATH, JOKES_LOG_PATH, compact_every=JOKE_COMPACT_EVERY,
+    pack_path=JOKES_PACK_PATH if JOKES_PACK else None
+)
+JOKE_STORE.on_saved = lambda target, seconds: metrics.observe("bot_save_seconds", seconds, target=target)
+
+# 범위별 셔플 백
+SAMPLER = None
+if JOKE_SHUFFLE != "off":
+    SAMPLER = ShuffleSampler(max_scopes=JOKE_SHUFFLE_MAX_SCOPES, path=JOKE_SHUFFLE_FILE)
+    SAMPLER.load()
 
 
 def load_jokes():
-    """jokes.json에서 농담 로드"""
+    """jokes.json (또는 jokes.pack) + 추가 로그에서 농담 로드"""
     try:
-        with open(JOKES_PATH, "r", encoding="utf-8") as f:
-            jokes = json.load(f)
-        if isinstance(jokes, list) and jokes:
+        jokes = JOKE_STORE.load()
+        if jokes:
             return jokes
     except Exception as e:
+        metrics.inc("bot_errors_total", where="load_jokes")
         print(f"[ERROR] Failed to load jokes: {e}")
     return ["농담을 불러올 수 없습니다 😢"]
 
 
-def save_jokes(jokes):
-    """농담을 jokes.json에 저장"""
-    try:
-        with open(JOKES_PATH, "w", encoding="utf-8") as f:
-            json.dump(jokes, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        print(f"[ERROR] Failed to save jokes: {e}")
-        return False
+async def watch_jokes():
+    """jokes.json 이 바뀌면 이벤트 루프 밖에서 읽고 검사한 뒤 농담 목록을 통째로 교체"""
+    global JOKES
+    while True:
+        await asyncio.sleep(JOKES_RELOAD_INTERVAL)
+        try:
+            # /add_joke 와 겹치지 않도록 잠금 (/joke 는 잠금 없이 계속 이전/새 목록을 읽음)
+            async with JOKES_LOCK:
+                jokes = await JOKE_STORE.reload()
+                if jokes is None:
+                    continue
+                if not len(jokes):
+                    print("[WARN] jokes.json 이 비어 있어 기존 농담을 유지합니다.")
+                    continue
+                JOKES = jokes
+                # 중복 검사 인덱스도 새 목록으로 미리 다시 만듦 (/add_joke 가 기다리지 않도록)
+                build_joke_index()
+            print(f"[OK] jokes.json 다시 읽음: {len(jokes)}개")
+        except Exception as e:
+            metrics.inc("bot_errors_total", where="reload_jokes")
+            print(f"[ERROR] jokes.json 다시 읽기 실패 (기존 농담 유지): {e}")
+
+
+class OwlJokeBot(discord.Client):
+    reloader = None
+
+    async def setup_hook(self):
+        # 계측 (METRICS_PORT / METRICS_FILE 이 설정된 경우 노출)
+        metrics.set_gauge("owljoke_jokes", lambda: len(JOKES))
+        if SAMPLER is not None:
+            metrics.set_gauge("owljoke_shuffle_scopes", lambda: len(SAMPLER))
+            SAMPLER.start()
+        await metrics.start_from_env(self)
+
+        # 중복 검사 인덱스는 기동 직후 이벤트 루프 밖에서 미리 만듦
+        build_joke_index()
+        if JOKES_RELOAD_INTERVAL > 0:
+            self.reloader = asyncio.get_running_loop().create_task(watch_jokes())
+
+        # 슬래시 명령어 동기화 (프로세스당 한 번, 명령어가 바뀐 경우만)
+        try:
+            if GUILD_ID:
+                guild = discord.Object(id=int(GUILD_ID))
+                tree.copy_global_to(guild=guild)
+                if await sync_commands(tree, COMMAND_SYNC_PATH, guild=guild, mode=COMMAND_SYNC):
+                    print(f"[OK] Guild {GUILD_ID} 동기화 완료.")
+            elif await sync_commands(tree, COMMAND_SYNC_PATH, mode=COMMAND_SYNC):
+                print("[OK] 글로벌 동기화 완료.")
+        except Exception as e:
+            metrics.inc("bot_errors_total", where="sync")
+            print(f"[ERROR] Sync failed: {e}")
+
+    def dispatch(self, event_name, /, *args, **kwargs):
+        metrics.inc("bot_gateway_events_total", event=event_name)
+        super().dispatch(event_name, *args, **kwargs)
+
+    async def close(self):
+        if self.reloader is not None:
+            self.reloader.cancel()
+            self.reloader = None
+        if SAMPLER is not None:
+            await SAMPLER.close()
+        await metrics.close()
+        await super().close()
+        # 남은 추가 로그를 jokes.json 으로 내보내기
+        await JOKE_STORE.close()
 
 
 # 봇 설정
 JOKES = load_jokes()
+JOKE_INDEX_TASK = None  # 중복/유사 농담 검사 인덱스 (setup_hook 과 다시 읽은 뒤에 만듦)
+JOKES_LOCK = asyncio.Lock()  # /add_joke 와 jokes.json 다시 읽기를 한 번에 하나씩
 intents = discord.Intents.default()
-bot = discord.Client(intents=intents)
+bot = OwlJokeBot(intents=intents)
 tree = app_commands.CommandTree(bot)
 
 
+@tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    """명령어 처리 중 예외 (오류 수 집계 후 로그)"""
+    command = interaction.command.name if interaction.command else "unknown"
+    metrics.inc("bot_errors_total", where=f"command:{command}")
+    print(f"[ERROR] /{command} failed: {error!r}")
+
+
 @bot.event
 async def on_ready():
-    """봇 시작 시 슬래시 명령어 동기화"""
-    try:
-        if GUILD_ID:
-            guild = discord.Object(id=int(GUILD_ID))
-            tree.copy_global_to(guild=guild)
-            await tree.sync(guild=guild)
-            print(f"[OK] Guild {GUILD_ID} 동기화 완료. 봇: {bot.user}")
-        else:
-            await tree.sync()
-            print(f"[OK] 글로벌 동기화 완료. 봇: {bot.user}")
-    except Exception as e:
-        print(f"[ERROR] Sync failed: {e}")
+    """봇 준비 완료 (재연결 시에도 호출되므로 동기화는 setup_hook 에서 처리)"""
+    print(f"[OK] 준비 완료. 봇: {bot.user}")
 
 
 @tree.command(name="joke", description="랜덤 농담을 들려줍니다 🦉")
+@metrics.timed("bot_command_seconds", command="joke")
 async def joke(interaction: discord.Interaction):
     """랜덤 농담 출력"""
-    await interaction.response.send_message(f"{random.choice(JOKES)} 🦉")
+    await interaction.response.send_message(f"{pick_joke(interaction)} 🦉")
+
+
+def pick_joke(interaction):
+    """범위(길드/채널/유저)별로 한 바퀴 돌 때까지 겹치지 않게 뽑기"""
+    if SAMPLER is None:
+        return random.choice(JOKES)
+    if JOKE_SHUFFLE == "user":
+        scope = f"user:{interaction.user.id}"
+    elif JOKE_SHUFFLE == "guild" and interaction.guild_id:
+        scope = f"guild:{interaction.guild_id}"
+    else:
+        # DM 은 채널 단위
+        scope = f"channel:{interaction.channel_id}"
+    return JOKES[SAMPLER.pick(scope, len(JOKES))]
+
+
+def build_joke_index():
+    """현재 농담 목록으로 중복 검사 인덱스를 이벤트 루프 밖에서 만들기 시작"""
+    global JOKE_INDEX_TASK
+    JOKE_INDEX_TASK = asyncio.create_task(asyncio.to_thread(JokeIndex, JOKES, JOKE_SIMILARITY))
+
+
+async def joke_index():
+    """중복 검사 인덱스 (만드는 중이면 기다림, 이전에 실패했으면 다시 만듦)"""
+    if JOKE_INDEX_TASK is None or (JOKE_INDEX_TASK.done() and JOKE_INDEX_TASK.exception()):
+        build_joke_index()
+    return await JOKE_INDEX_TASK
+
+
+async def reply(interaction, content, ephemeral=False):
+    """보류(defer)된 요청이면 followup, 아니면 첫 응답으로 전송"""
+    if interaction.response.is_done():
+        await interaction.followup.send(content, ephemeral=ephemeral)
+    else:
+        await interaction.response.send_message(content, ephemeral=ephemeral)
 
 
 @tree.command(name="add_joke", description="새로운 농담을 추가합니다 (관리자 전용)")
 @app_commands.describe(joke="추가할 농담 내용")
+@metrics.timed("bot_command_seconds", command="add_joke")
 async def add_joke(interaction: discord.Interaction, joke: str):
     """농담 추가 (관리자 전용)"""
     # 권한 체크
@@ -86,19 +221,44 @@ async def add_joke(interaction: discord.Interaction, joke: str):
         await interaction.response.send_message("❌ 최소 3글자 이상 입력해주세요.", ephemeral=True)
         return
     
-    if joke in JOKES:
-        await interaction.response.send_message("❌ 이미 존재하는 농담입니다!", ephemeral=True)
+    # 인덱스를 아직 만드는 중이거나 다시 읽는 중이면 응답을 보류 (농담이 많으면 몇 초 걸림)
+    # 보류 메시지를 고쳐 쓰는 첫 followup 이 오류 안내일 수 있으므로 본인에게만 보이게 보류
+    if JOKE_INDEX_TASK is None or not JOKE_INDEX_TASK.done() or JOKES_LOCK.locked():
+        await interaction.response.defer(ephemeral=True, thinking=True)
+    async with JOKES_LOCK:
+        await add_to_jokes(interaction, joke)
+
+
+async def add_to_jokes(interaction, joke):
+    """중복 검사 후 추가 로그에 기록하고 목록에 반영 (JOKES_LOCK 안에서 호출)"""
+    index = await joke_index()
+
+    # 띄어쓰기/문장부호만 다르거나 거의 같은 농담도 중복으로 처리
+    duplicate = index.find_duplicate(joke)
+    if duplicate:
+        existing, similarity = duplicate
+        if similarity == 1.0:
+            await reply(interaction, "❌ 이미 존재하는 농담입니다!", ephemeral=True)
+        else:
+            await reply(
+                interaction,
+                f"❌ 비슷한 농담이 이미 있습니다! (유사도 {similarity:.0%})\n**기존 농담:** {existing}",
+                ephemeral=True
+            )
+        return
+
+    # 추가 로그에 기록 (디스크에 확정된 뒤에만 목록에 반영)
+    try:
+        await JOKE_STORE.add(joke)
+    except Exception as e:
+        metrics.inc("bot_errors_total", where="save_jokes")
+        print(f"[ERROR] Failed to save joke: {e}")
+        await reply(interaction, "❌ 저장 실패. 다시 시도해주세요.", ephemeral=True)
         return
 
-    # 농담 추가 및 저장
     JOKES.append(joke)
-    if save_jokes(JOKES):
-        await interaction.response.send_message(
-            f"✅ 추가 완료!\n**농담:** {joke}\n**전체:** {len(JOKES)}개"
-        )
-    else:
-        JOKES.pop()
-        await interaction.response.send_message("❌ 저장 실패. 다시 시도해주세요.", ephemeral=True)
+    index.update()
+    await reply(interaction, f"✅ 추가 완료!\n**농담:** {joke}\n**전체:** {len(JOKES)}개")
 
 
 if __name__ == "__main__":
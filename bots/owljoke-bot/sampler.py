@@ -0,0 +1,118 @@
+"""겹치지 않는 농담 뽑기 (셔플 백)
+
+범위(길드/채널/유저)마다 농담 번호의 무작위 순열을 하나 정해 두고 앞에서부터 차례로 꺼낸다.
+순열은 목록으로 만들지 않고 시드로 정해지는 Feistel 순열로 계산하므로 범위마다
+(시드, 커서, 농담 수) 세 숫자만 보관하면 된다. 한 바퀴를 다 돌면 새 시드로 다시 섞는다.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+from collections import OrderedDict
+
+ROUNDS = 4  # Feistel 라운드 수
+
+
+class Permutation:
+    """0 ~ size-1 의 순열 (시드로 정해짐) - permutation[i] 는 i 번째로 꺼낼 번호"""
+
+    def __init__(self, size, seed):
+        self.size = size
+        bits = max(2, (size - 1).bit_length())
+        self.half = (bits + 1) // 2
+        self.mask = (1 << self.half) - 1
+        self.key = seed.to_bytes(8, "little")
+
+    def _round(self, round_, value):
+        digest = hashlib.blake2b(value.to_bytes(8, "little") + bytes((round_,)), digest_size=8, key=self.key).digest()
+        return int.from_bytes(digest, "little") & self.mask
+
+    def __getitem__(self, index):
+        # 2^(2*half) 크기의 Feistel 순열을 돌리고, 범위를 벗어나면 한 번 더 돌림 (cycle walking - 평균 4번 이내)
+        while True:
+            left, right = index >> self.half, index & self.mask
+            for round_ in range(ROUNDS):
+                left, right = right, left ^ self._round(round_, right)
+            index = (left << self.half) | right
+            if index < self.size:
+                return index
+
+
+class ShuffleSampler:
+    """범위별 셔플 백 (오래 안 쓴 범위부터 max_scopes 개를 넘으면 버림)
+
+    농담 수가 늘면 지금 바퀴는 그대로 돌고 새 농담은 다음 바퀴부터 나온다.
+    농담 수가 줄면(jokes.json 을 다시 읽은 경우) 그 범위는 새로 섞는다.
+    path 가 주어지면 load()/save() 로 재시작 후에도 이어서 뽑는다.
+    """
+
+    def __init__(self, max_scopes=10000, path=None):
+        self.max_scopes = max_scopes
+        self.path = path
+        self.scopes = OrderedDict()  # 범위 → [시드, 커서, 농담 수]
+        self._dirty = False
+        self._task = None
+
+    def __len__(self):
+        return len(self.scopes)
+
+    def pick(self, scope, size):
+        """scope 에서 다음에 보여줄 농담 번호 (0 ~ size-1)"""
+        state = self.scopes.get(scope)
+        if state is None or state[1] >= state[2] or state[2] > size:
+            state = self.scopes[scope] = [random.getrandbits(64), 0, size]
+            if len(self.scopes) > self.max_scopes:
+                self.scopes.popitem(last=False)
+        self.scopes.move_to_end(scope)
+        seed, cursor, bag_size = state
+        state[1] = cursor + 1
+        self._dirty = True
+        return Permutation(bag_size, seed)[cursor]
+
+    def load(self):
+        """저장된 범위 상태 읽기 (없거나 깨졌으면 빈 상태로 시작)"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # 오래 안 쓴 범위부터 저장되어 있음
+            for scope, seed, cursor, size in data["scopes"][-self.max_scopes:]:
+                self.scopes[scope] = [seed, cursor, size]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.scopes.clear()
+            print(f"[WARN] 셔플 상태를 읽지 못해 새로 시작합니다: {e}")
+
+    def _write(self, rows):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"scopes": rows}, f)
+        os.replace(tmp_path, self.path)
+
+    async def save(self):
+        """바뀐 게 있으면 파일로 저장 (쓰기는 이벤트 루프 밖에서)"""
+        if not self.path or not self._dirty:
+            return
+        rows = [[scope, *state] for scope, state in self.scopes.items()]
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self._write, rows)
+        except OSError as e:
+            self._dirty = True
+            print(f"[ERROR] 셔플 상태 저장 실패: {e}")
+
+    async def _run(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            await self.save()
+
+    def start(self, interval=60):
+        if self.path:
+            self._task = asyncio.get_running_loop().create_task(self._run(interval))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.save()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 봇 모듈은 bots/owljoke-bot 에 평평하게 있으므로 경로에 추가
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# 두 봇이 함께 쓰는 모듈 (bots/common)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
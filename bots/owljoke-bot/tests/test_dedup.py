@@ -0,0 +1,75 @@
+from dedup import JokeIndex, jaccard, normalize, read_jokes, shingles, signature, NUM_PERM
+
+
+def test_normalize_ignores_spacing_case_and_punctuation():
+    assert normalize("아재  개그?! 🦉") == normalize("아재개그")
+    assert normalize("Owl Joke") == normalize("owljoke")
+    # NFD 로 들어온 한글도 같은 키
+    assert normalize("가") == normalize("가")
+
+
+def test_normalize_keeps_symbol_only_text():
+    assert normalize("?!?") == "?!?"
+
+
+def test_shingles_and_jaccard():
+    assert shingles("가") == {"가"}
+    assert shingles("가나다") == {"가나", "나다"}
+    assert jaccard({"a", "b"}, {"b", "c"}) == 1 / 3
+
+
+def test_signature_is_deterministic():
+    grams = shingles("딸기가 회사에서 잘리면? 딸기시럽")
+    assert signature(grams) == signature(set(grams))
+    assert len(signature(grams)) == NUM_PERM
+
+
+def test_exact_duplicate_after_normalization():
+    jokes = ["굶는 사람이 많은 나라는? 헝가리", "세상에서 가장 뜨거운 과일은? 천도복숭아"]
+    index = JokeIndex(jokes)
+    assert index.find_duplicate("굶는사람이 많은나라는 헝가리!!") == (jokes[0], 1.0)
+
+
+def test_near_duplicate_found_and_distinct_joke_passes():
+    jokes = [
+        "왕이 넘어지면 뭐라고 할까? 킹콩",
+        "세상에서 가장 뜨거운 과일은? 천도복숭아",
+    ]
+    index = JokeIndex(jokes, threshold=0.6)
+    existing, score = index.find_duplicate("왕이 넘어지면 뭐라고 하게? 킹콩")
+    assert existing == jokes[0]
+    assert 0.6 <= score < 1.0
+    assert index.find_duplicate("소가 웃으면? 우하하") is None
+
+
+def test_threshold_rejects_weak_matches():
+    jokes = ["왕이 넘어지면 뭐라고 할까? 킹콩"]
+    assert JokeIndex(jokes, threshold=0.99).find_duplicate("왕이 넘어지면 뭐라고 하게? 킹콩") is None
+
+
+def test_update_indexes_appended_jokes_only_once():
+    jokes = ["첫 번째 농담입니다"]
+    index = JokeIndex(jokes)
+    jokes.append("두 번째 농담입니다 하하")
+    assert len(index) == 1
+    index.update()
+    index.update()
+    assert len(index) == 2
+    assert index.find_duplicate("두번째 농담입니다, 하하") == (jokes[1], 1.0)
+
+
+def test_hash_collision_is_verified_against_text():
+    jokes = ["원래 농담"]
+    index = JokeIndex(jokes)
+    # 다른 농담의 해시를 같은 번호로 가리키게 해도 원문 확인에서 걸러짐
+    index.exact[index._exact_key(normalize("전혀 다른 문장"))] = 0
+    assert index.find_duplicate("전혀 다른 문장") is None
+
+
+def test_read_jokes_accepts_json_or_lines(tmp_path):
+    json_file = tmp_path / "new.json"
+    json_file.write_text('["  하나 농담  ", "no", 3, "둘 농담"]', encoding="utf-8")
+    assert read_jokes(str(json_file)) == ["하나 농담", "둘 농담"]
+    text_file = tmp_path / "new.txt"
+    text_file.write_text("셋 농담\n\n넷 농담\n", encoding="utf-8")
+    assert read_jokes(str(text_file)) == ["셋 농담", "넷 농담"]
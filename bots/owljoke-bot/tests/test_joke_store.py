@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+from joke_store import JokeStore, write_json_list
+
+
+def make_store(tmp_path, compact_every=200):
+    return JokeStore(str(tmp_path / "jokes.json"), str(tmp_path / "jokes.jsonl"), compact_every=compact_every)
+
+
+def log_records(tmp_path):
+    return [json.loads(line) for line in (tmp_path / "jokes.jsonl").read_bytes().splitlines()]
+
+
+def add_all(store, jokes):
+    async def scenario():
+        for joke in jokes:
+            await store.add(joke)
+    asyncio.run(scenario())
+
+
+def test_added_jokes_survive_restart(tmp_path):
+    write_json_list(str(tmp_path / "jokes.json"), ["하나", "둘"])
+    store = make_store(tmp_path)
+    assert list(store.load()) == ["하나", "둘"]
+    add_all(store, ["셋", "넷"])
+    store._executor.shutdown()
+    assert [record["n"] for record in log_records(tmp_path)] == [2, 3]
+
+    assert list(make_store(tmp_path).load()) == ["하나", "둘", "셋", "넷"]
+
+
+def test_compaction_interrupted_before_log_truncate(tmp_path):
+    write_json_list(str(tmp_path / "jokes.json"), ["하나", "둘"])
+    store = make_store(tmp_path)
+    store.load()
+    add_all(store, ["셋", "넷"])
+    store._executor.shutdown()
+    # 압축이 jokes.json 을 다 쓰고 로그를 비우기 전에 죽은 상태
+    write_json_list(str(tmp_path / "jokes.json"), ["하나", "둘", "셋", "넷"])
+
+    reloaded = make_store(tmp_path)
+    # 이미 스냅샷에 들어간 농담(번호 < 스냅샷 길이)은 다시 얹지 않음
+    assert list(reloaded.load()) == ["하나", "둘", "셋", "넷"]
+    add_all(reloaded, ["다섯"])
+    assert log_records(tmp_path)[-1]["n"] == 4
+    asyncio.run(reloaded.close())
+    assert json.loads((tmp_path / "jokes.json").read_text(encoding="utf-8")) == ["하나", "둘", "셋", "넷", "다섯"]
+    assert (tmp_path / "jokes.jsonl").read_bytes() == b""
+
+
+def test_external_edit_keeps_pending_log_entries(tmp_path):
+    write_json_list(str(tmp_path / "jokes.json"), ["하나", "둘"])
+    store = make_store(tmp_path)
+    store.load()
+    add_all(store, ["추가"])
+    # 봇 밖에서 jokes.json 을 고침 (농담 수가 늘어 로그 번호와 겹침)
+    write_json_list(str(tmp_path / "jokes.json"), ["가", "나", "다", "라"])
+
+    corpus = asyncio.run(store.reload())
+    assert list(corpus) == ["가", "나", "다", "라", "추가"]
+    # 로그에만 있는 농담은 새 스냅샷 뒤 번호로 다시 매김
+    assert [(record["n"], record["joke"]) for record in log_records(tmp_path)] == [(4, "추가")]
+    store._executor.shutdown()
+
+    # 재시작해도 로그의 농담을 잃지 않음
+    reloaded = make_store(tmp_path)
+    assert list(reloaded.load()) == ["가", "나", "다", "라", "추가"]
+    asyncio.run(reloaded.close())
+    assert json.loads((tmp_path / "jokes.json").read_text(encoding="utf-8")) == ["가", "나", "다", "라", "추가"]
+
+
+def test_compaction_does_not_overwrite_external_edit(tmp_path):
+    write_json_list(str(tmp_path / "jokes.json"), ["하나"])
+    store = make_store(tmp_path, compact_every=2)
+    store.load()
+
+    async def scenario():
+        await store.add("둘")
+        write_json_list(str(tmp_path / "jokes.json"), ["하나", "고친 농담"])
+        # 두 번째 추가에서 압축 시작 - 먼저 바뀐 jokes.json 을 다시 읽음
+        await store.add("셋")
+        await store.close()
+    asyncio.run(scenario())
+
+    assert json.loads((tmp_path / "jokes.json").read_text(encoding="utf-8")) == ["하나", "고친 농담", "둘", "셋"]
+    assert (tmp_path / "jokes.jsonl").read_bytes() == b""
+
+
+def test_torn_last_line_is_truncated(tmp_path):
+    write_json_list(str(tmp_path / "jokes.json"), ["하나"])
+    store = make_store(tmp_path)
+    store.load()
+    add_all(store, ["둘"])
+    store._executor.shutdown()
+    path = tmp_path / "jokes.jsonl"
+    good = path.read_bytes()
+    path.write_bytes(good + '{"op": "add", "n": 2, "joke": "쓰다 만'.encode("utf-8"))
+
+    reloaded = make_store(tmp_path)
+    assert list(reloaded.load()) == ["하나", "둘"]
+    assert path.read_bytes() == good
+    # 잘라낸 뒤 추가한 농담은 깨진 줄 뒤에 붙지 않고 다음 기동 때 정상적으로 읽힘
+    add_all(reloaded, ["셋"])
+    reloaded._executor.shutdown()
+    assert list(make_store(tmp_path).load()) == ["하나", "둘", "셋"]
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+
+from sampler import Permutation, ShuffleSampler
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 16, 17, 100, 1027, 4096])
+def test_permutation_is_a_bijection(size):
+    permutation = Permutation(size, seed=12345)
+    assert sorted(permutation[i] for i in range(size)) == list(range(size))
+
+
+def test_permutation_depends_on_seed():
+    first = [Permutation(1000, 1)[i] for i in range(20)]
+    second = [Permutation(1000, 2)[i] for i in range(20)]
+    assert first != second
+    assert first == [Permutation(1000, 1)[i] for i in range(20)]
+
+
+def test_permutation_large_domain_stays_in_range():
+    permutation = Permutation(10 ** 9 + 7, seed=99)
+    values = {permutation[i] for i in range(1000)}
+    assert len(values) == 1000
+    assert all(0 <= value < 10 ** 9 + 7 for value in values)
+
+
+def test_bag_has_no_repeats_until_exhausted():
+    sampler = ShuffleSampler()
+    size = 257
+    first_round = [sampler.pick("guild:1", size) for _ in range(size)]
+    assert sorted(first_round) == list(range(size))
+    second_round = [sampler.pick("guild:1", size) for _ in range(size)]
+    assert sorted(second_round) == list(range(size))
+
+
+def test_scopes_are_independent():
+    sampler = ShuffleSampler()
+    a = [sampler.pick("guild:1", 50) for _ in range(50)]
+    b = [sampler.pick("guild:2", 50) for _ in range(25)]
+    assert sorted(a) == list(range(50))
+    assert len(set(b)) == 25
+
+
+def test_growth_finishes_current_bag_then_includes_new_jokes():
+    sampler = ShuffleSampler()
+    picks = [sampler.pick("s", 10) for _ in range(5)]
+    picks += [sampler.pick("s", 12) for _ in range(5)]
+    assert sorted(picks) == list(range(10))
+    next_round = [sampler.pick("s", 12) for _ in range(12)]
+    assert sorted(next_round) == list(range(12))
+
+
+def test_shrink_reshuffles_within_new_size():
+    sampler = ShuffleSampler()
+    for _ in range(3):
+        sampler.pick("s", 100)
+    picks = [sampler.pick("s", 10) for _ in range(10)]
+    assert sorted(picks) == list(range(10))
+
+
+def test_lru_eviction_keeps_recent_scopes():
+    sampler = ShuffleSampler(max_scopes=2)
+    sampler.pick("a", 10)
+    sampler.pick("b", 10)
+    sampler.pick("a", 10)
+    sampler.pick("c", 10)
+    assert list(sampler.scopes) == ["a", "c"]
+    assert len(sampler) == 2
+
+
+def test_state_round_trip_continues_bag(tmp_path):
+    path = str(tmp_path / "shuffle.json")
+    sampler = ShuffleSampler(path=path)
+    first = [sampler.pick("guild:1", 30) for _ in range(10)]
+    asyncio.run(sampler.save())
+
+    restored = ShuffleSampler(path=path)
+    restored.load()
+    rest = [restored.pick("guild:1", 30) for _ in range(20)]
+    assert sorted(first + rest) == list(range(30))
+
+
+def test_load_keeps_most_recent_scopes_within_limit(tmp_path):
+    path = tmp_path / "shuffle.json"
+    path.write_text(json.dumps({"scopes": [["old", 1, 0, 5], ["mid", 2, 0, 5], ["new", 3, 0, 5]]}))
+    sampler = ShuffleSampler(max_scopes=2, path=str(path))
+    sampler.load()
+    assert list(sampler.scopes) == ["mid", "new"]
+
+
+def test_corrupt_state_starts_empty(tmp_path):
+    path = tmp_path / "shuffle.json"
+    path.write_text("{not json")
+    sampler = ShuffleSampler(path=str(path))
+    sampler.load()
+    assert len(sampler) == 0